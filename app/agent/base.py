@@ -2,12 +2,20 @@ from abc import ABC, abstractmethod
 from contextlib import asynccontextmanager
 from typing import List, Optional
 
-from pydantic import BaseModel, Field, model_validator
+from pydantic import BaseModel, Field, PrivateAttr, model_validator
 
+from app.budget import active_budget
+from app.checkpoint import active_checkpoint
+from app.config import config
+from app.exceptions import BudgetExceeded
 from app.llm import LLM
 from app.logger import logger
+from app.loop_detection import LoopDetector
+from app.memory_archive import MessageArchive
+from app.profiler import span
 from app.sandbox.client import SANDBOX_CLIENT
 from app.schema import ROLE_TYPE, AgentState, Memory, Message
+from app.usage import UsageLedger
 
 
 class BaseAgent(BaseModel, ABC):
@@ -32,6 +40,9 @@ class BaseAgent(BaseModel, ABC):
     # Dependencies
     llm: LLM = Field(default_factory=LLM, description="Language model instance")
     memory: Memory = Field(default_factory=Memory, description="Agent's memory store")
+    archive: Optional[MessageArchive] = Field(
+        None, description="On-disk log of messages evicted from memory"
+    )
     state: AgentState = Field(
         default=AgentState.IDLE, description="Current agent state"
     )
@@ -41,6 +52,33 @@ class BaseAgent(BaseModel, ABC):
     current_step: int = Field(default=0, description="Current step in execution")
 
     duplicate_threshold: int = 2
+    max_loop_period: int = Field(
+        default=4, description="Longest cycle of turns detected as a loop"
+    )
+    max_stuck_redirects: Optional[int] = Field(
+        default=None,
+        description="Loops redirected with a prompt before the run is stopped (None to never stop)",
+    )
+
+    max_input_tokens: Optional[int] = Field(
+        default=None,
+        description="Input tokens one run may use across all LLMs (None for unlimited)",
+    )
+    usage: Optional[UsageLedger] = Field(
+        None, description="Token usage of the current or last run"
+    )
+
+    keep_resources: bool = Field(
+        default=False,
+        description="Keep tool and sandbox resources alive after a run, for reuse",
+    )
+
+    _initial_next_step_prompt: Optional[str] = PrivateAttr(default=None)
+    _loop_detector: Optional[LoopDetector] = PrivateAttr(default=None)
+    # Memory messages already indexed by the loop detector
+    _loop_observed: int = PrivateAttr(default=0)
+    _stuck_reason: Optional[str] = PrivateAttr(default=None)
+    _stuck_count: int = PrivateAttr(default=0)
 
     class Config:
         arbitrary_types_allowed = True
@@ -53,6 +91,19 @@ class BaseAgent(BaseModel, ABC):
             self.llm = LLM(config_name=self.name.lower())
         if not isinstance(self.memory, Memory):
             self.memory = Memory()
+        if self.memory.token_counter is None:
+            self.memory.token_counter = self.llm.count_message
+        if self.memory.token_budget is None:
+            self.memory.token_budget = self.llm.context_budget
+        if config.image and self.memory.max_images is None:
+            self.memory.max_images = config.image.max_images_in_memory
+        if config.image and self.memory.max_image_bytes is None:
+            self.memory.max_image_bytes = config.image.max_image_bytes_in_memory
+        if self.archive is None and self.memory.on_evict is None:
+            self.archive = MessageArchive.for_agent(self.name.lower())
+        if self.archive is not None and self.memory.on_evict is None:
+            self.memory.on_evict = self.archive.append
+        self._initial_next_step_prompt = self.next_step_prompt
         return self
 
     @asynccontextmanager
@@ -116,6 +167,9 @@ class BaseAgent(BaseModel, ABC):
     async def run(self, request: Optional[str] = None) -> str:
         """Execute the agent's main loop asynchronously.
 
+        The run stops before its next step once the active RunBudget, if
+        any, has run out, or during a step whose LLM call it cancelled.
+
         Args:
             request: Optional initial user request to process.
 
@@ -131,28 +185,67 @@ class BaseAgent(BaseModel, ABC):
         if request:
             self.update_memory("user", request)
 
+        self._stuck_count = 0
+        budget = active_budget()
         results: List[str] = []
-        async with self.state_context(AgentState.RUNNING):
+        # Shared LLM instances charge this run's own ledger
+        self.usage = UsageLedger(self.name, self.max_input_tokens)
+        async with self.state_context(AgentState.RUNNING), self.usage:
             while (
                 self.current_step < self.max_steps and self.state != AgentState.FINISHED
             ):
-                self.current_step += 1
-                logger.info(f"Executing step {self.current_step}/{self.max_steps}")
-                step_result = await self.step()
+                try:
+                    if budget is not None:
+                        budget.check()
+                    self.current_step += 1
+                    logger.info(f"Executing step {self.current_step}/{self.max_steps}")
+                    with span("step", "agent", agent=self.name, step=self.current_step):
+                        step_result = await self.step()
+                except BudgetExceeded as e:
+                    logger.warning(f"Stopping {self.name}: run budget exhausted ({e})")
+                    results.append(f"Terminated: Run budget exhausted ({e})")
+                    break
 
                 # Check for stuck state
-                if self.is_stuck():
-                    self.handle_stuck_state()
+                stopped = self.is_stuck() and self.handle_stuck_state()
+
+                checkpoint = active_checkpoint()
+                if checkpoint is not None:
+                    checkpoint.step_completed()
 
                 results.append(f"Step {self.current_step}: {step_result}")
+                if stopped:
+                    results.append(f"Terminated: loop detected ({self._stuck_reason})")
 
             if self.current_step >= self.max_steps:
                 self.current_step = 0
                 self.state = AgentState.IDLE
                 results.append(f"Terminated: Reached max steps ({self.max_steps})")
-        await SANDBOX_CLIENT.cleanup()
+        if not self.keep_resources:
+            await SANDBOX_CLIENT.cleanup()
         return "\n".join(results) if results else "No steps executed"
 
+    async def reset(self) -> None:
+        """Forget the previous run so the agent can take a new request
+
+        Memory settings, the LLM and tool resources are kept; a new archive
+        is started for the next run's evicted messages.
+        """
+        self.memory.clear()
+        self.state = AgentState.IDLE
+        self.current_step = 0
+        self.usage = None
+        self.next_step_prompt = self._initial_next_step_prompt
+        self._loop_detector = None
+        self._stuck_count = 0
+        if self.archive is not None and self.memory.on_evict == self.archive.append:
+            self.archive = MessageArchive.for_agent(self.name.lower())
+            self.memory.on_evict = self.archive.append if self.archive else None
+
+    async def is_healthy(self) -> bool:
+        """Whether the agent can take a new run"""
+        return self.state == AgentState.IDLE
+
     @abstractmethod
     async def step(self) -> str:
         """Execute a single step in the agent's workflow.
@@ -160,30 +253,56 @@ class BaseAgent(BaseModel, ABC):
         Must be implemented by subclasses to define specific behavior.
         """
 
-    def handle_stuck_state(self):
-        """Handle stuck state by adding a prompt to change strategy"""
+    def handle_stuck_state(self) -> bool:
+        """Handle stuck state by adding a prompt to change strategy, or stop the run
+
+        Returns:
+            bool: Whether the run was stopped
+        """
+        self._stuck_count += 1
+        if (
+            self.max_stuck_redirects is not None
+            and self._stuck_count > self.max_stuck_redirects
+        ):
+            logger.warning(
+                f"Agent still stuck ({self._stuck_reason}) after "
+                f"{self.max_stuck_redirects} redirects, stopping the run"
+            )
+            self.state = AgentState.FINISHED
+            return True
+
         stuck_prompt = "\
         Observed duplicate responses. Consider new strategies and avoid repeating ineffective paths already attempted."
         self.next_step_prompt = f"{stuck_prompt}\n{self.next_step_prompt}"
-        logger.warning(f"Agent detected stuck state. Added prompt: {stuck_prompt}")
+        # Give the new strategy a chance before reporting the same cycle again
+        if self._loop_detector is not None:
+            self._loop_detector.forget_recent()
+        logger.warning(
+            f"Agent detected stuck state ({self._stuck_reason}). Added prompt: {stuck_prompt}"
+        )
+        return False
 
     def is_stuck(self) -> bool:
-        """Check if the agent is stuck in a loop by detecting duplicate content"""
-        if len(self.memory.messages) < 2:
-            return False
+        """Check if the agent is stuck in a loop of duplicate responses or tool calls
 
-        last_message = self.memory.messages[-1]
-        if not last_message.content:
+        Only messages added since the previous check are indexed, so the cost
+        per step does not grow with the history.
+        """
+        if self._loop_detector is None or self.memory.appended < self._loop_observed:
+            # First check, or memory was replaced
+            self._loop_detector = LoopDetector(
+                self.duplicate_threshold, self.max_loop_period
+            )
+            self._loop_observed = 0
+
+        new = self.memory.appended - self._loop_observed
+        self._loop_observed = self.memory.appended
+        if not new:
             return False
-
-        # Count identical content occurrences
-        duplicate_count = sum(
-            1
-            for msg in reversed(self.memory.messages[:-1])
-            if msg.role == "assistant" and msg.content == last_message.content
+        self._stuck_reason = self._loop_detector.observe_all(
+            self.memory.messages[-new:]
         )
-
-        return duplicate_count >= self.duplicate_threshold
+        return self._stuck_reason is not None
 
     @property
     def messages(self) -> List[Message]:
@@ -194,3 +313,4 @@ class BaseAgent(BaseModel, ABC):
     def messages(self, value: List[Message]):
         """Set the list of messages in the agent's memory."""
         self.memory.messages = value
+        self.memory.recount_tokens()
@@ -4,7 +4,9 @@ from typing import TYPE_CHECKING, Optional
 from pydantic import Field, model_validator
 
 from app.agent.toolcall import ToolCallAgent
+from app.cassette import execute_tool
 from app.logger import logger
+from app.profiler import span
 from app.prompt.browser import NEXT_STEP_PROMPT, SYSTEM_PROMPT
 from app.schema import Message, ToolChoice
 from app.tool import BrowserUseTool, Terminate, ToolCollection
@@ -26,7 +28,12 @@ class BrowserContextHelper:
             logger.warning("BrowserUseTool not found or doesn't have get_current_state")
             return None
         try:
-            result = await browser_tool.get_current_state()
+            with span("browser.state", "browser"):
+                result = await execute_tool(
+                    f"{browser_tool.name}.get_current_state",
+                    None,
+                    browser_tool.get_current_state,
+                )
             if result.error:
                 logger.debug(f"Browser state error: {result.error}")
                 return None
@@ -73,6 +80,10 @@ class BrowserContextHelper:
             results_placeholder=results_info,
         )
 
+    def reset(self) -> None:
+        """Drop the screenshot not yet added to memory"""
+        self._current_base64_image = None
+
     async def cleanup_browser(self):
         browser_tool = self.agent.available_tools.get_tool(BrowserUseTool().name)
         if browser_tool and hasattr(browser_tool, "cleanup"):
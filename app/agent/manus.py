@@ -137,6 +137,29 @@ class Manus(ToolCallAgent):
             await self.disconnect_mcp_server()
             self._initialized = False
 
+    async def reset(self) -> None:
+        """Also drop the browser session, undo history and pending screenshot
+
+        A pooled agent serves unrelated requests, so none of the previous
+        caller's browser state or file edits may carry over.
+        """
+        await super().reset()
+        browser_tool = self.available_tools.get_tool(BrowserUseTool().name)
+        if isinstance(browser_tool, BrowserUseTool):
+            await browser_tool.reset_context()
+        editor = self.available_tools.get_tool(StrReplaceEditor().name)
+        if isinstance(editor, StrReplaceEditor):
+            editor.clear_history()
+        if self.browser_context_helper:
+            self.browser_context_helper.reset()
+
+    async def is_healthy(self) -> bool:
+        """Idle, with a live session for every connected MCP server"""
+        return await super().is_healthy() and all(
+            server_id in self.mcp_clients.sessions
+            for server_id in self.connected_servers
+        )
+
     async def think(self) -> bool:
         """Process current state and decide next actions with appropriate context."""
         if not self._initialized:
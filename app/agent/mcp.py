@@ -112,6 +112,8 @@ class MCPAgent(ToolCallAgent):
 
         # Update stored schemas
         self.tool_schemas = current_tools
+        if added_tools or removed_tools or changed_tools:
+            self.mcp_clients.invalidate_params()
 
         # Log and notify about changes
         if added_tools:
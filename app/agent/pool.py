@@ -0,0 +1,255 @@
+"""Pool of pre-initialized agents leased for one run at a time."""
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    Generic,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from app.agent.base import BaseAgent
+from app.config import AgentPoolSettings, config
+from app.logger import logger
+
+
+AgentT = TypeVar("AgentT", bound=BaseAgent)
+
+
+class AgentPool(Generic[AgentT]):
+    """Warm agents leased per request, e.g. `AgentPool(Manus.create)`.
+
+    Agents are built by `factory` and marked `keep_resources`, so their
+    browser, MCP connections and sandbox stay up between runs. A returned
+    agent is reset (memory, state, step count) and kept for the next lease
+    if it is still healthy; one whose run raised, or that fails its health
+    check, is cleaned up instead. `min_size` agents are kept initialized,
+    agents above it are closed after `idle_timeout` seconds unused, and at
+    most `max_size` exist at once.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Awaitable[AgentT]],
+        min_size: int = 1,
+        max_size: int = 4,
+        idle_timeout: float = 300.0,
+        acquire_timeout: Optional[float] = 60.0,
+    ):
+        if max_size < 1 or not 0 <= min_size <= max_size:
+            raise ValueError(
+                f"Invalid agent pool sizes: min {min_size}, max {max_size}"
+            )
+        self.factory = factory
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.acquire_timeout = acquire_timeout
+
+        # Idle agents with the time they were returned, oldest first
+        self._idle: Deque[Tuple[AgentT, float]] = deque()
+        # Agents alive or being created, leased or not
+        self._size = 0
+        self._available = asyncio.Condition()
+        self._maintenance: Optional[asyncio.Task] = None
+        self._closed = False
+
+        self.created = 0
+        self.leases = 0
+        self.discarded = 0
+
+    @classmethod
+    def from_settings(
+        cls,
+        factory: Callable[[], Awaitable[AgentT]],
+        settings: Optional[AgentPoolSettings] = None,
+    ) -> "AgentPool[AgentT]":
+        settings = settings or config.agent_pool or AgentPoolSettings()
+        return cls(
+            factory,
+            min_size=settings.min_size,
+            max_size=settings.max_size,
+            idle_timeout=settings.idle_timeout,
+            acquire_timeout=settings.acquire_timeout,
+        )
+
+    async def start(self) -> None:
+        """Warm up `min_size` agents and start idle eviction and health checks"""
+        self._closed = False
+        await self._fill()
+        if self._maintenance is None:
+            self._maintenance = asyncio.create_task(self._maintain())
+
+    async def close(self) -> None:
+        """Clean up idle agents; leased agents are cleaned up when returned"""
+        self._closed = True
+        if self._maintenance is not None:
+            self._maintenance.cancel()
+            self._maintenance = None
+        async with self._available:
+            idle = [agent for agent, _ in self._idle]
+            self._idle.clear()
+        for agent in idle:
+            await self._discard(agent)
+
+    async def _create(self) -> AgentT:
+        agent = await self.factory()
+        agent.keep_resources = True
+        self.created += 1
+        return agent
+
+    async def _discard(self, agent: AgentT) -> None:
+        self.discarded += 1
+        cleanup = getattr(agent, "cleanup", None)
+        if cleanup is not None:
+            try:
+                await cleanup()
+            except Exception as e:
+                logger.warning(f"Cleaning up pooled agent {agent.name} failed: {e}")
+        async with self._available:
+            self._size -= 1
+            self._available.notify()
+
+    async def _fill(self) -> None:
+        """Create agents until `min_size` are alive"""
+        async with self._available:
+            missing = max(0, self.min_size - self._size)
+            self._size += missing
+        if not missing:
+            return
+        results = await asyncio.gather(
+            *(self._create() for _ in range(missing)), return_exceptions=True
+        )
+        async with self._available:
+            for result in results:
+                if isinstance(result, BaseException):
+                    self._size -= 1
+                    logger.error(f"Failed to warm up a pooled agent: {result}")
+                else:
+                    self._idle.append((result, time.monotonic()))
+            self._available.notify_all()
+
+    async def _maintain(self) -> None:
+        """Periodically evict expired and unhealthy idle agents, then top up"""
+        interval = max(1.0, min(self.idle_timeout / 2, 30.0))
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self._evict_idle()
+                await self._fill()
+            except Exception as e:
+                logger.error(f"Agent pool maintenance failed: {e}")
+
+    async def _evict_idle(self) -> None:
+        now = time.monotonic()
+        evicted: List[AgentT] = []
+        async with self._available:
+            while (
+                self._idle
+                and self._size - len(evicted) > self.min_size
+                and now - self._idle[0][1] > self.idle_timeout
+            ):
+                evicted.append(self._idle.popleft()[0])
+            # Health checks run on every idle agent left
+            idle = list(self._idle)
+        for agent, _ in idle:
+            if await agent.is_healthy():
+                continue
+            async with self._available:
+                # It may have been leased while being checked
+                entry = next((e for e in self._idle if e[0] is agent), None)
+                if entry is None:
+                    continue
+                self._idle.remove(entry)
+            evicted.append(agent)
+        for agent in evicted:
+            await self._discard(agent)
+
+    async def acquire(self) -> AgentT:
+        """Take a healthy agent, creating one below `max_size` or waiting for a return
+
+        Raises:
+            asyncio.TimeoutError: If no agent is free within `acquire_timeout`
+        """
+        if self._closed:
+            raise RuntimeError("Agent pool is closed")
+        agent = await asyncio.wait_for(self._acquire(), self.acquire_timeout)
+        self.leases += 1
+        return agent
+
+    async def _acquire(self) -> AgentT:
+        while True:
+            async with self._available:
+                while not self._idle and self._size >= self.max_size:
+                    await self._available.wait()
+                if self._idle:
+                    # Most recently returned first, so the oldest expire
+                    agent, returned_at = self._idle.pop()
+                else:
+                    self._size += 1
+                    agent = None
+
+            if agent is None:
+                try:
+                    return await self._create()
+                except BaseException:
+                    async with self._available:
+                        self._size -= 1
+                        self._available.notify()
+                    raise
+
+            try:
+                healthy = await agent.is_healthy()
+            except asyncio.CancelledError:
+                async with self._available:
+                    self._idle.append((agent, returned_at))
+                raise
+            if healthy:
+                return agent
+            await self._discard(agent)
+
+    async def release(self, agent: AgentT, failed: bool = False) -> None:
+        """Return a leased agent, resetting it for the next lease"""
+        if not failed:
+            try:
+                await agent.reset()
+                failed = not await agent.is_healthy()
+            except Exception as e:
+                logger.warning(f"Resetting pooled agent {agent.name} failed: {e}")
+                failed = True
+        if failed or self._closed:
+            await self._discard(agent)
+            return
+        async with self._available:
+            self._idle.append((agent, time.monotonic()))
+            self._available.notify()
+
+    @asynccontextmanager
+    async def lease(self) -> AsyncIterator[AgentT]:
+        """Lease an agent for the duration of the block"""
+        agent = await self.acquire()
+        try:
+            yield agent
+        except BaseException:
+            await self.release(agent, failed=True)
+            raise
+        await self.release(agent)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": self._size,
+            "idle": len(self._idle),
+            "leased": self._size - len(self._idle),
+            "created": self.created,
+            "leases": self.leases,
+            "discarded": self.discarded,
+        }
@@ -5,6 +5,7 @@ from pydantic import Field
 
 from app.agent.base import BaseAgent
 from app.llm import LLM
+from app.profiler import span
 from app.schema import AgentState, Memory
 
 
@@ -32,7 +33,9 @@ class ReActAgent(BaseAgent, ABC):
 
     async def step(self) -> str:
         """Execute a single step: think and act."""
-        should_act = await self.think()
+        with span("think", "agent"):
+            should_act = await self.think()
         if not should_act:
             return "Thinking complete - no action needed"
-        return await self.act()
+        with span("act", "agent"):
+            return await self.act()
@@ -1,12 +1,17 @@
 import asyncio
 import json
-from typing import Any, List, Optional, Union
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple, Union
 
-from pydantic import Field
+from openai.types.chat import ChatCompletionMessage
+from pydantic import Field, PrivateAttr
 
 from app.agent.react import ReActAgent
-from app.exceptions import TokenLimitExceeded
+from app.budget import active_budget, budgeted
+from app.exceptions import BudgetExceeded, TokenLimitExceeded
 from app.logger import logger
+from app.profiler import span
 from app.prompt.toolcall import NEXT_STEP_PROMPT, SYSTEM_PROMPT
 from app.schema import TOOL_CHOICE_TYPE, AgentState, Message, ToolCall, ToolChoice
 from app.tool import CreateChatCompletion, Terminate, ToolCollection
@@ -14,6 +19,9 @@ from app.tool import CreateChatCompletion, Terminate, ToolCollection
 
 TOOL_CALL_REQUIRED = "Tool calls required but none provided"
 
+# Image produced by the tool call running in the current task
+_tool_image: ContextVar[Optional[str]] = ContextVar("tool_image", default=None)
+
 
 class ToolCallAgent(ReActAgent):
     """Base agent class for handling tool/function calls with enhanced abstraction"""
@@ -31,7 +39,18 @@ class ToolCallAgent(ReActAgent):
     special_tool_names: List[str] = Field(default_factory=lambda: [Terminate().name])
 
     tool_calls: List[ToolCall] = Field(default_factory=list)
-    _current_base64_image: Optional[str] = None
+
+    # Stream tool calls and start executing them before the completion ends
+    stream_tool_calls: bool = False
+    _pending_tools: Dict[str, asyncio.Task] = PrivateAttr(default_factory=dict)
+
+    # Concurrency-safe tool calls of one step run in parallel, up to this many
+    max_parallel_tools: int = 4
+    _tool_slots: Optional[asyncio.Semaphore] = PrivateAttr(default=None)
+    _resource_locks: Dict[str, asyncio.Lock] = PrivateAttr(default_factory=dict)
+    # Last call that had to run alone, and the calls started after it
+    _tool_barrier: Optional[asyncio.Task] = PrivateAttr(default=None)
+    _tool_tasks: List[asyncio.Task] = PrivateAttr(default_factory=list)
 
     max_steps: int = 30
     max_observe: Optional[Union[int, bool]] = None
@@ -40,38 +59,67 @@ class ToolCallAgent(ReActAgent):
         """Process current state and decide next actions using tools"""
         if self.next_step_prompt:
             user_msg = Message.user_message(self.next_step_prompt)
-            self.messages += [user_msg]
+            self.memory.add_message(user_msg)
 
         try:
             # Get response with tool options
-            response = await self.llm.ask_tool(
-                messages=self.messages,
-                system_msgs=(
-                    [Message.system_message(self.system_prompt)]
-                    if self.system_prompt
-                    else None
-                ),
-                tools=self.available_tools.to_params(),
-                tool_choice=self.tool_choices,
-            )
+            if self.stream_tool_calls:
+                response = await self._stream_tool_calls()
+            else:
+                response = await self.llm.ask_tool(**self._tool_request())
         except ValueError:
+            self._cancel_pending_tools()
             raise
         except Exception as e:
-            # Check if this is a RetryError containing TokenLimitExceeded
-            if hasattr(e, "__cause__") and isinstance(e.__cause__, TokenLimitExceeded):
-                token_limit_error = e.__cause__
-                logger.error(
-                    f"🚨 Token limit error (from RetryError): {token_limit_error}"
-                )
-                self.memory.add_message(
-                    Message.assistant_message(
-                        f"Maximum token limit reached, cannot continue execution: {str(token_limit_error)}"
-                    )
-                )
-                self.state = AgentState.FINISHED
+            self._cancel_pending_tools()
+            if self._handle_token_limit(e):
                 return False
             raise
 
+        should_act = self._process_response(response)
+        if not should_act:
+            self._cancel_pending_tools()
+        return should_act
+
+    def _tool_request(self) -> dict:
+        """Build the arguments of the LLM tool request for the current step"""
+        system_msgs = (
+            [Message.system_message(self.system_prompt)] if self.system_prompt else None
+        )
+        tools_tokens = self.available_tools.params_tokens(self.llm.count_tool_tokens)
+        input_tokens = None
+        if self.memory.token_counter == self.llm.count_message:
+            # Memory keeps a running total, so the history is not counted again
+            input_tokens = self.llm.count_prompt_tokens(
+                self.memory.token_count, system_msgs, tools_tokens
+            )
+        return dict(
+            messages=self.messages,
+            system_msgs=system_msgs,
+            tools=self.available_tools.to_params(),
+            tools_tokens=tools_tokens,
+            input_tokens=input_tokens,
+            tool_choice=self.tool_choices,
+        )
+
+    def _handle_token_limit(self, error: Exception) -> bool:
+        """Finish the run if the error is or wraps TokenLimitExceeded"""
+        token_limit_error = (
+            error if isinstance(error, TokenLimitExceeded) else error.__cause__
+        )
+        if isinstance(token_limit_error, TokenLimitExceeded):
+            logger.error(f"🚨 Token limit error: {token_limit_error}")
+            self.memory.add_message(
+                Message.assistant_message(
+                    f"Maximum token limit reached, cannot continue execution: {str(token_limit_error)}"
+                )
+            )
+            self.state = AgentState.FINISHED
+            return True
+        return False
+
+    def _process_response(self, response: Any) -> bool:
+        """Record the LLM response in memory and decide whether to act"""
         self.tool_calls = tool_calls = (
             response.tool_calls if response and response.tool_calls else []
         )
@@ -128,6 +176,96 @@ class ToolCallAgent(ReActAgent):
             )
             return False
 
+    @budgeted
+    async def _stream_tool_calls(self) -> ChatCompletionMessage:
+        """Stream the LLM response, starting each tool as soon as its call is complete
+
+        The first call no longer waits for the whole completion. Calls are
+        scheduled as in `act()`, which collects their results. The whole
+        stream, not only opening it, runs under the active budget.
+        """
+        stream = await self.llm.ask_tool_stream(
+            **self._tool_request(), stop_tool_names=self.special_tool_names
+        )
+        async for command in stream:
+            if self.tool_choices == ToolChoice.NONE:
+                continue
+            self._pending_tools[command.id] = self._start_tool(command)
+        return stream.message
+
+    def _cancel_pending_tools(self) -> None:
+        """Cancel streamed tool calls that will not be acted on"""
+        for task in self._pending_tools.values():
+            task.cancel()
+        self._pending_tools.clear()
+        self._tool_barrier = None
+        self._tool_tasks = []
+
+    def _tool_resource(self, command: ToolCall) -> Tuple[bool, Optional[str]]:
+        """Whether a call may run concurrently, and the resource it holds exclusively"""
+        tool = self.available_tools.get_tool(command.function.name)
+        if tool is None or not tool.concurrency_safe:
+            return False, None
+        try:
+            args = json.loads(command.function.arguments or "{}")
+        except json.JSONDecodeError:
+            return True, None
+        return True, tool.resource_key(**args) if isinstance(args, dict) else None
+
+    def _start_tool(self, command: ToolCall) -> asyncio.Task:
+        """Schedule a tool call after the calls it must not overlap with
+
+        Concurrency-safe calls run in parallel, at most `max_parallel_tools`
+        at a time, with calls on the same exclusive resource in call order.
+        Any other call waits for every earlier call and runs alone.
+        """
+        concurrency_safe, resource = self._tool_resource(command)
+        if concurrency_safe:
+            task = asyncio.create_task(
+                self._run_parallel(self._tool_barrier, resource, command)
+            )
+            self._tool_tasks.append(task)
+        else:
+            earlier = [self._tool_barrier, *self._tool_tasks]
+            task = asyncio.create_task(self._run_alone(earlier, command))
+            self._tool_barrier, self._tool_tasks = task, []
+        return task
+
+    async def _run_parallel(
+        self,
+        barrier: Optional[asyncio.Task],
+        resource: Optional[str],
+        command: ToolCall,
+    ) -> Tuple[str, Optional[str]]:
+        if barrier is not None:
+            await asyncio.wait([barrier])
+        if self._tool_slots is None:
+            self._tool_slots = asyncio.Semaphore(max(1, self.max_parallel_tools))
+        # Lock before taking a slot so waiting on a resource holds no slot
+        lock = (
+            self._resource_locks.setdefault(resource, asyncio.Lock())
+            if resource
+            else nullcontext()
+        )
+        async with lock, self._tool_slots:
+            return await self._execute_with_image(command)
+
+    async def _run_alone(
+        self, earlier: List[Optional[asyncio.Task]], command: ToolCall
+    ) -> Tuple[str, Optional[str]]:
+        earlier = [task for task in earlier if task is not None]
+        if earlier:
+            await asyncio.wait(earlier)
+        return await self._execute_with_image(command)
+
+    async def _execute_with_image(self, command: ToolCall) -> Tuple[str, Optional[str]]:
+        """Execute a tool call and return its observation and captured image"""
+        # Each call runs in its own task, so the captured image is per call
+        _tool_image.set(None)
+        result = await self.execute_tool(command)
+        # Images come prepared for the model by the tool that captured them
+        return result, _tool_image.get()
+
     async def act(self) -> str:
         """Execute tool calls and handle their results"""
         if not self.tool_calls:
@@ -137,12 +275,17 @@ class ToolCallAgent(ReActAgent):
             # Return last message content if no tool calls
             return self.messages[-1].content or "No content or commands to execute"
 
-        results = []
-        for command in self.tool_calls:
-            # Reset base64_image for each tool call
-            self._current_base64_image = None
+        # Tool calls may already be running when streamed from the LLM
+        tasks = [
+            self._pending_tools.pop(command.id, None) or self._start_tool(command)
+            for command in self.tool_calls
+        ]
+        self._tool_barrier, self._tool_tasks = None, []
 
-            result = await self.execute_tool(command)
+        results = []
+        # Results are added to memory in call order, whatever order they finish in
+        for command, task in zip(self.tool_calls, tasks):
+            result, base64_image = await task
 
             if self.max_observe:
                 result = result[: self.max_observe]
@@ -156,7 +299,7 @@ class ToolCallAgent(ReActAgent):
                 content=result,
                 tool_call_id=command.id,
                 name=command.function.name,
-                base64_image=self._current_base64_image,
+                base64_image=base64_image,
             )
             self.memory.add_message(tool_msg)
             results.append(result)
@@ -178,7 +321,12 @@ class ToolCallAgent(ReActAgent):
 
             # Execute the tool
             logger.info(f"🔧 Activating tool: '{name}'...")
-            result = await self.available_tools.execute(name=name, tool_input=args)
+            budget = active_budget()
+            if budget is not None:
+                budget.charge_tool_call()
+            with span(f"tool.{name}", "tool"):
+                execution = self.available_tools.execute(name=name, tool_input=args)
+                result = await (budget.guard(execution) if budget else execution)
 
             # Handle special tools
             await self._handle_special_tool(name=name, result=result)
@@ -186,7 +334,7 @@ class ToolCallAgent(ReActAgent):
             # Check if result is a ToolResult with base64_image
             if hasattr(result, "base64_image") and result.base64_image:
                 # Store the base64_image for later use in tool_message
-                self._current_base64_image = result.base64_image
+                _tool_image.set(result.base64_image)
 
             # Format result for display (standard case)
             observation = (
@@ -202,6 +350,9 @@ class ToolCallAgent(ReActAgent):
                 f"📝 Oops! The arguments for '{name}' don't make sense - invalid JSON, arguments:{command.function.arguments}"
             )
             return f"Error: {error_msg}"
+        except BudgetExceeded as e:
+            logger.warning(f"🛑 Tool '{name}' stopped: run budget exhausted ({e})")
+            return f"Error: Tool '{name}' stopped, run budget exhausted: {e}"
         except Exception as e:
             error_msg = f"⚠️ Tool '{name}' encountered a problem: {str(e)}"
             logger.exception(error_msg)
@@ -242,9 +393,15 @@ class ToolCallAgent(ReActAgent):
                     )
         logger.info(f"✨ Cleanup complete for agent '{self.name}'.")
 
+    async def reset(self) -> None:
+        await super().reset()
+        self.tool_calls = []
+        self._cancel_pending_tools()
+
     async def run(self, request: Optional[str] = None) -> str:
-        """Run the agent with cleanup when done."""
+        """Run the agent with cleanup when done, unless resources are kept warm."""
         try:
             return await super().run(request)
         finally:
-            await self.cleanup()
+            if not self.keep_resources:
+                await self.cleanup()
@@ -1,12 +1,17 @@
 from fastapi import FastAPI, Request, HTTPException
 from pydantic import BaseModel
 from typing import Optional, Dict, Any
+import asyncio
 import logging
 import os
 import re
 
 # Import orchestrateur (adapté à ton arborescence)
 from config.multi_agent_orchestrator import run_orchestration
+from app.http_pool import close_http_client, pool_stats
+from app.agent.manus import Manus
+from app.agent.pool import AgentPool
+from app.budget import RunBudget
 
 app = FastAPI(
     title="OpenManus Multi-Agent API",
@@ -17,6 +22,9 @@ app = FastAPI(
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Agents Manus préinitialisés (navigateur, MCP, sandbox), prêtés à chaque requête
+manus_pool = AgentPool.from_settings(Manus.create)
+
 # --- Masquage des clés API ---
 def mask_api_keys(text: str) -> str:
     api_keys = [
@@ -46,6 +54,13 @@ class OrchestrationResponse(BaseModel):
 class SimpleTaskRequest(BaseModel):
     task: str
 
+class ManusTaskRequest(BaseModel):
+    task: str
+    # Limites de l'exécution, par défaut celles de la section [budget]
+    deadline: Optional[float] = None
+    max_tokens: Optional[int] = None
+    max_tool_calls: Optional[int] = None
+
 # --- Endpoints ---
 
 @app.get("/")
@@ -56,6 +71,7 @@ def root():
         "endpoints": {
             "orchestration": "/run",
             "simple": "/run/simple",
+            "manus": "/run/manus",
             "health": "/health"
         }
     }
@@ -65,9 +81,20 @@ def health_check():
     return {
         "status": "healthy",
         "agents": ["Claude", "GPT", "Gemini"],
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "http_pool": pool_stats(),
+        "agent_pool": manus_pool.stats()
     }
 
+@app.on_event("startup")
+async def start_agent_pool():
+    await manus_pool.start()
+
+@app.on_event("shutdown")
+async def shutdown_http_pool():
+    await manus_pool.close()
+    await close_http_client()
+
 @app.post("/run", response_model=OrchestrationResponse)
 async def run_orchestration_endpoint(request: OrchestrationRequest):
     try:
@@ -116,6 +143,30 @@ async def simple_orchestration(request: SimpleTaskRequest):
         error_message = mask_api_keys(str(e))
         raise HTTPException(status_code=500, detail=error_message)
 
+@app.post("/run/manus")
+async def run_manus(request: ManusTaskRequest):
+    """
+    Exécute une tâche avec un agent Manus prêté par le pool, dans les limites de son budget
+    """
+    try:
+        async with manus_pool.lease() as agent:
+            budget = RunBudget.from_settings(
+                deadline=request.deadline,
+                max_tokens=request.max_tokens,
+                max_tool_calls=request.max_tool_calls,
+            )
+            with budget:
+                result = await agent.run(request.task)
+            # Relevé de tokens de cette exécution seule, avant la remise au pool
+            usage = agent.usage.summary()
+        return {"result": mask_api_keys(result), "budget": budget.stats(), "usage": usage}
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="Aucun agent Manus disponible")
+    except Exception as e:
+        error_message = mask_api_keys(str(e))
+        logger.error(f"Erreur lors de l'exécution Manus: {error_message}")
+        raise HTTPException(status_code=500, detail=error_message)
+
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
     logger.info(f"Requête reçue: {request.method} {request.url}")
@@ -1,11 +1,16 @@
+import asyncio
+import functools
 import json
 import sys
+import threading
 import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Literal, Optional
+from typing import Any, Dict, List, Literal, Optional
 
 import boto3
+from openai.types.chat import ChatCompletionChunk
 
 
 # Global variables to track the current tool use ID across function calls
@@ -34,13 +39,31 @@ class OpenAIResponse:
         return data
 
 
+# Bedrock stop reasons mapped to OpenAI finish reasons
+FINISH_REASONS = {
+    "end_turn": "stop",
+    "stop_sequence": "stop",
+    "tool_use": "tool_calls",
+    "max_tokens": "length",
+    "guardrail_intervened": "content_filter",
+    "content_filtered": "content_filter",
+}
+
+# OpenAI tool_choice values mapped to Bedrock toolChoice
+TOOL_CHOICES = {"auto": {"auto": {}}, "required": {"any": {}}}
+
+
 # Main client class for interacting with Amazon Bedrock
 class BedrockClient:
-    def __init__(self):
+    def __init__(self, max_workers: int = 8):
         # Initialize Bedrock client, you need to configure AWS env first
         try:
             self.client = boto3.client("bedrock-runtime")
-            self.chat = Chat(self.client)
+            # boto3 is synchronous; calls run on this bounded pool off the event loop
+            self.executor = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="bedrock"
+            )
+            self.chat = Chat(self.client, self.executor)
         except Exception as e:
             print(f"Error initializing Bedrock client: {e}")
             sys.exit(1)
@@ -48,14 +71,180 @@ class BedrockClient:
 
 # Chat interface class
 class Chat:
-    def __init__(self, client):
-        self.completions = ChatCompletions(client)
+    def __init__(self, client, executor: Optional[ThreadPoolExecutor] = None):
+        self.completions = ChatCompletions(client, executor)
+
+
+class BedrockStream:
+    """Async iterator of OpenAI-style chunks from a Bedrock converse stream.
+
+    A worker thread drains the blocking boto3 event stream into an asyncio
+    queue, so the event loop only wakes up when an event has arrived.
+    """
+
+    _DONE = object()
+
+    def __init__(self, events: Any, model: str, executor: ThreadPoolExecutor):
+        self.id = f"chatcmpl-{uuid.uuid4()}"
+        self.model = model
+        self._events = events
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._closed = threading.Event()
+        self._tool_indices: Dict[int, int] = {}
+        self._finish_reason: Optional[str] = None
+        loop = asyncio.get_running_loop()
+        self._pump = loop.run_in_executor(executor, self._drain, loop)
+
+    def _drain(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Read events on a worker thread and hand them to the event loop"""
+        try:
+            for event in self._events:
+                if self._closed.is_set():
+                    break
+                loop.call_soon_threadsafe(self._queue.put_nowait, event)
+        except Exception as e:
+            loop.call_soon_threadsafe(self._queue.put_nowait, e)
+        finally:
+            loop.call_soon_threadsafe(self._queue.put_nowait, self._DONE)
+
+    def _chunk(self, delta: dict, finish_reason: Optional[str] = None, usage=None):
+        return ChatCompletionChunk.model_validate(
+            {
+                "id": self.id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": self.model,
+                "choices": [
+                    {"index": 0, "delta": delta, "finish_reason": finish_reason}
+                ],
+                "usage": usage,
+            }
+        )
+
+    def _convert(self, event: dict) -> Optional[ChatCompletionChunk]:
+        """Convert one Bedrock stream event to a chunk, or None if it carries no delta"""
+        if "messageStart" in event:
+            return self._chunk({"role": event["messageStart"].get("role")})
+
+        if "contentBlockStart" in event:
+            start = event["contentBlockStart"]
+            tool_use = start.get("start", {}).get("toolUse")
+            if not tool_use:
+                return None
+            # OpenAI numbers tool calls, Bedrock numbers every content block
+            index = len(self._tool_indices)
+            self._tool_indices[start["contentBlockIndex"]] = index
+            global CURRENT_TOOLUSE_ID
+            CURRENT_TOOLUSE_ID = tool_use["toolUseId"]
+            return self._chunk(
+                {
+                    "tool_calls": [
+                        {
+                            "index": index,
+                            "id": tool_use["toolUseId"],
+                            "type": "function",
+                            "function": {"name": tool_use["name"], "arguments": ""},
+                        }
+                    ]
+                }
+            )
+
+        if "contentBlockDelta" in event:
+            block = event["contentBlockDelta"]
+            delta = block.get("delta", {})
+            if "text" in delta:
+                return self._chunk({"content": delta["text"]})
+            if "toolUse" in delta:
+                index = self._tool_indices.get(block["contentBlockIndex"], 0)
+                return self._chunk(
+                    {
+                        "tool_calls": [
+                            {
+                                "index": index,
+                                "function": {"arguments": delta["toolUse"]["input"]},
+                            }
+                        ]
+                    }
+                )
+            return None
+
+        if "messageStop" in event:
+            stop_reason = event["messageStop"].get("stopReason", "end_turn")
+            self._finish_reason = FINISH_REASONS.get(stop_reason, "stop")
+            return None
+
+        if "metadata" in event:
+            usage = event["metadata"].get("usage", {})
+            # Finish and usage arrive in separate events; report them together
+            return self._chunk(
+                {},
+                finish_reason=self._finish_reason or "stop",
+                usage={
+                    "prompt_tokens": usage.get("inputTokens", 0),
+                    "completion_tokens": usage.get("outputTokens", 0),
+                    "total_tokens": usage.get("totalTokens", 0),
+                },
+            )
+        return None
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> ChatCompletionChunk:
+        while True:
+            event = await self._queue.get()
+            if event is self._DONE:
+                raise StopAsyncIteration
+            if isinstance(event, Exception):
+                raise event
+            chunk = self._convert(event)
+            if chunk is not None:
+                return chunk
+
+    async def close(self) -> None:
+        """Stop reading the stream and release the worker thread"""
+        self._closed.set()
+        close = getattr(self._events, "close", None)
+        if close is not None:
+            close()
 
 
 # Core class handling chat completions functionality
 class ChatCompletions:
-    def __init__(self, client):
+    def __init__(self, client, executor: Optional[ThreadPoolExecutor] = None):
         self.client = client
+        self.executor = executor
+
+    async def _run(self, fn, **kwargs) -> Any:
+        """Run a blocking boto3 call on the executor without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, functools.partial(fn, **kwargs)
+        )
+
+    @staticmethod
+    def _converse_request(
+        model: str,
+        system_prompt: List[dict],
+        bedrock_messages: List[dict],
+        max_tokens: int,
+        temperature: float,
+        tools: Optional[List[dict]],
+        tool_choice: str,
+    ) -> dict:
+        """Build converse / converse_stream keyword arguments"""
+        request = {
+            "modelId": model,
+            "system": system_prompt,
+            "messages": bedrock_messages,
+            "inferenceConfig": {"temperature": temperature, "maxTokens": max_tokens},
+        }
+        # boto3 rejects toolConfig=None, so only send it with tools
+        if tools and tool_choice != "none":
+            request["toolConfig"] = {"tools": tools}
+            if tool_choice in TOOL_CHOICES:
+                request["toolConfig"]["toolChoice"] = TOOL_CHOICES[tool_choice]
+        return request
 
     def _convert_openai_tools_to_bedrock_format(self, tools):
         # Convert OpenAI function calling format to Bedrock tool format
@@ -85,6 +274,7 @@ class ChatCompletions:
 
     def _convert_openai_messages_to_bedrock_format(self, messages):
         # Convert OpenAI message format to Bedrock message format
+        global CURRENT_TOOLUSE_ID
         bedrock_messages = []
         system_prompt = []
         for message in messages:
@@ -97,36 +287,43 @@ class ChatCompletions:
                 }
                 bedrock_messages.append(bedrock_message)
             elif message.get("role") == "assistant":
-                bedrock_message = {
-                    "role": "assistant",
-                    "content": [{"text": message.get("content")}],
-                }
-                openai_tool_calls = message.get("tool_calls", [])
-                if openai_tool_calls:
-                    bedrock_tool_use = {
-                        "toolUseId": openai_tool_calls[0]["id"],
-                        "name": openai_tool_calls[0]["function"]["name"],
-                        "input": json.loads(
-                            openai_tool_calls[0]["function"]["arguments"]
-                        ),
-                    }
-                    bedrock_message["content"].append({"toolUse": bedrock_tool_use})
-                    global CURRENT_TOOLUSE_ID
-                    CURRENT_TOOLUSE_ID = openai_tool_calls[0]["id"]
-                bedrock_messages.append(bedrock_message)
-            elif message.get("role") == "tool":
-                bedrock_message = {
-                    "role": "user",
-                    "content": [
+                bedrock_message = {"role": "assistant", "content": []}
+                if message.get("content"):
+                    bedrock_message["content"].append({"text": message["content"]})
+                # Every tool call of the turn becomes its own toolUse block
+                for tool_call in message.get("tool_calls") or []:
+                    bedrock_message["content"].append(
                         {
-                            "toolResult": {
-                                "toolUseId": CURRENT_TOOLUSE_ID,
-                                "content": [{"text": message.get("content")}],
+                            "toolUse": {
+                                "toolUseId": tool_call["id"],
+                                "name": tool_call["function"]["name"],
+                                "input": json.loads(
+                                    tool_call["function"]["arguments"] or "{}"
+                                ),
                             }
                         }
-                    ],
-                }
+                    )
+                    CURRENT_TOOLUSE_ID = tool_call["id"]
+                if not bedrock_message["content"]:
+                    bedrock_message["content"].append({"text": "."})
                 bedrock_messages.append(bedrock_message)
+            elif message.get("role") == "tool":
+                tool_result = {
+                    "toolResult": {
+                        "toolUseId": message.get("tool_call_id") or CURRENT_TOOLUSE_ID,
+                        "content": [{"text": message.get("content")}],
+                    }
+                }
+                # Results of one turn's tool calls go back in a single user message
+                previous = bedrock_messages[-1] if bedrock_messages else None
+                if (
+                    previous
+                    and previous["role"] == "user"
+                    and all("toolResult" in item for item in previous["content"])
+                ):
+                    previous["content"].append(tool_result)
+                else:
+                    bedrock_messages.append({"role": "user", "content": [tool_result]})
             else:
                 raise ValueError(f"Invalid role: {message.get('role')}")
         return system_prompt, bedrock_messages
@@ -166,7 +363,9 @@ class ChatCompletions:
             "system_fingerprint": None,
             "choices": [
                 {
-                    "finish_reason": bedrock_response.get("stopReason", "end_turn"),
+                    "finish_reason": FINISH_REASONS.get(
+                        bedrock_response.get("stopReason", "end_turn"), "stop"
+                    ),
                     "index": 0,
                     "message": {
                         "content": content,
@@ -207,12 +406,17 @@ class ChatCompletions:
             system_prompt,
             bedrock_messages,
         ) = self._convert_openai_messages_to_bedrock_format(messages)
-        response = self.client.converse(
-            modelId=model,
-            system=system_prompt,
-            messages=bedrock_messages,
-            inferenceConfig={"temperature": temperature, "maxTokens": max_tokens},
-            toolConfig={"tools": tools} if tools else None,
+        response = await self._run(
+            self.client.converse,
+            **self._converse_request(
+                model,
+                system_prompt,
+                bedrock_messages,
+                max_tokens,
+                temperature,
+                tools,
+                tool_choice,
+            ),
         )
         openai_response = self._convert_bedrock_response_to_openai_format(response)
         return openai_response
@@ -226,76 +430,25 @@ class ChatCompletions:
         tools: Optional[List[dict]] = None,
         tool_choice: Literal["none", "auto", "required"] = "auto",
         **kwargs,
-    ) -> OpenAIResponse:
+    ) -> BedrockStream:
         # Streaming invocation of Bedrock model
         (
             system_prompt,
             bedrock_messages,
         ) = self._convert_openai_messages_to_bedrock_format(messages)
-        response = self.client.converse_stream(
-            modelId=model,
-            system=system_prompt,
-            messages=bedrock_messages,
-            inferenceConfig={"temperature": temperature, "maxTokens": max_tokens},
-            toolConfig={"tools": tools} if tools else None,
-        )
-
-        # Initialize response structure
-        bedrock_response = {
-            "output": {"message": {"role": "", "content": []}},
-            "stopReason": "",
-            "usage": {},
-            "metrics": {},
-        }
-        bedrock_response_text = ""
-        bedrock_response_tool_input = ""
-
-        # Process streaming response
-        stream = response.get("stream")
-        if stream:
-            for event in stream:
-                if event.get("messageStart", {}).get("role"):
-                    bedrock_response["output"]["message"]["role"] = event[
-                        "messageStart"
-                    ]["role"]
-                if event.get("contentBlockDelta", {}).get("delta", {}).get("text"):
-                    bedrock_response_text += event["contentBlockDelta"]["delta"]["text"]
-                    print(
-                        event["contentBlockDelta"]["delta"]["text"], end="", flush=True
-                    )
-                if event.get("contentBlockStop", {}).get("contentBlockIndex") == 0:
-                    bedrock_response["output"]["message"]["content"].append(
-                        {"text": bedrock_response_text}
-                    )
-                if event.get("contentBlockStart", {}).get("start", {}).get("toolUse"):
-                    bedrock_tool_use = event["contentBlockStart"]["start"]["toolUse"]
-                    tool_use = {
-                        "toolUseId": bedrock_tool_use["toolUseId"],
-                        "name": bedrock_tool_use["name"],
-                    }
-                    bedrock_response["output"]["message"]["content"].append(
-                        {"toolUse": tool_use}
-                    )
-                    global CURRENT_TOOLUSE_ID
-                    CURRENT_TOOLUSE_ID = bedrock_tool_use["toolUseId"]
-                if event.get("contentBlockDelta", {}).get("delta", {}).get("toolUse"):
-                    bedrock_response_tool_input += event["contentBlockDelta"]["delta"][
-                        "toolUse"
-                    ]["input"]
-                    print(
-                        event["contentBlockDelta"]["delta"]["toolUse"]["input"],
-                        end="",
-                        flush=True,
-                    )
-                if event.get("contentBlockStop", {}).get("contentBlockIndex") == 1:
-                    bedrock_response["output"]["message"]["content"][1]["toolUse"][
-                        "input"
-                    ] = json.loads(bedrock_response_tool_input)
-        print()
-        openai_response = self._convert_bedrock_response_to_openai_format(
-            bedrock_response
+        response = await self._run(
+            self.client.converse_stream,
+            **self._converse_request(
+                model,
+                system_prompt,
+                bedrock_messages,
+                max_tokens,
+                temperature,
+                tools,
+                tool_choice,
+            ),
         )
-        return openai_response
+        return BedrockStream(response.get("stream") or [], model, self.executor)
 
     def create(
         self,
@@ -0,0 +1,179 @@
+"""Per-run limits on wall-clock time, tokens and tool calls."""
+import asyncio
+import functools
+import time
+from contextvars import ContextVar, Token
+from typing import Any, Awaitable, Dict, Optional, TypeVar
+
+from app.config import BudgetSettings, config
+from app.exceptions import BudgetExceeded
+from app.logger import logger
+
+
+T = TypeVar("T")
+
+_active: ContextVar[Optional["RunBudget"]] = ContextVar("run_budget", default=None)
+
+
+def active_budget() -> Optional["RunBudget"]:
+    """Budget of the current run, if any"""
+    return _active.get()
+
+
+class RunBudget:
+    """Limits of one agent or planning flow run.
+
+    While active (`with RunBudget(deadline=600, max_tokens=200_000): ...`)
+    every LLM request and tool call of the run, including those of the
+    agents a flow hands steps to, is charged to the budget and runs under
+    its deadline. Once the deadline passes or the tokens are used up, the
+    calls still in flight are cancelled and raise `BudgetExceeded`; once
+    any limit runs out later calls are refused, and agent runs and flows
+    stop at their next step. The call that used up the budget keeps its
+    result.
+    """
+
+    def __init__(
+        self,
+        deadline: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        max_tool_calls: Optional[int] = None,
+    ):
+        self.deadline = deadline
+        self.max_tokens = max_tokens
+        self.max_tool_calls = max_tool_calls
+        self.tokens = 0
+        self.tool_calls = 0
+        self.started = time.monotonic()
+        self._exceeded: Optional[str] = None
+        # Deadline scope of each task with a guarded call in flight
+        self._scopes: Dict[asyncio.Task, asyncio.Timeout] = {}
+        self._token: Optional[Token] = None
+
+    @classmethod
+    def from_settings(
+        cls, settings: Optional[BudgetSettings] = None, **limits: Any
+    ) -> "RunBudget":
+        """Budget with the configured limits, overridden by any limit not None"""
+        settings = settings or config.budget or BudgetSettings()
+        defaults = settings.model_dump()
+        defaults.update({k: v for k, v in limits.items() if v is not None})
+        return cls(**defaults)
+
+    def remaining_time(self) -> Optional[float]:
+        """Seconds left until the deadline, None without one"""
+        if self.deadline is None:
+            return None
+        return self.deadline - (time.monotonic() - self.started)
+
+    @property
+    def exceeded(self) -> Optional[str]:
+        """Why the budget ran out, or None while it lasts"""
+        if self._exceeded is None:
+            remaining = self.remaining_time()
+            if remaining is not None and remaining <= 0:
+                self._exhaust(self._deadline_reason())
+        return self._exceeded
+
+    def _deadline_reason(self) -> str:
+        return f"deadline of {self.deadline:g}s reached"
+
+    def check(self) -> None:
+        """Raise BudgetExceeded once the budget has run out"""
+        if self.exceeded is not None:
+            raise BudgetExceeded(self.exceeded)
+
+    def charge_tokens(self, tokens: int) -> None:
+        """Count tokens used by a completed LLM request"""
+        self.tokens += tokens
+        if self.max_tokens is not None and self.tokens > self.max_tokens:
+            self._exhaust(f"token budget of {self.max_tokens} used up")
+
+    def charge_tool_call(self) -> None:
+        """Count a tool call about to start, refusing it past the limit"""
+        self.check()
+        if self.max_tool_calls is not None and self.tool_calls >= self.max_tool_calls:
+            # Calls already started stay within the limit and may finish
+            self._exhaust(
+                f"tool call budget of {self.max_tool_calls} used up", cancel=False
+            )
+            raise BudgetExceeded(self._exceeded)
+        self.tool_calls += 1
+
+    def _exhaust(self, reason: str, cancel: bool = True) -> None:
+        """Record why the budget ran out and cancel the other calls in flight"""
+        if self._exceeded is not None:
+            return
+        self._exceeded = reason
+        logger.warning(f"Run budget exhausted: {reason}")
+        if not cancel or not self._scopes:
+            return
+        # The call that used up the budget keeps its result
+        current = asyncio.current_task()
+        now = asyncio.get_running_loop().time()
+        for task, scope in list(self._scopes.items()):
+            if task is not current and not scope.expired():
+                scope.reschedule(now)
+
+    async def guard(self, awaitable: Awaitable[T]) -> T:
+        """Await a call under the deadline, cancelled if the budget runs out"""
+        task = asyncio.current_task()
+        if task in self._scopes:
+            # Already guarded further up in this task
+            return await awaitable
+        try:
+            self.check()
+        except BudgetExceeded:
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()
+            raise
+        remaining = self.remaining_time()
+        when = None
+        if remaining is not None:
+            when = asyncio.get_running_loop().time() + remaining
+        scope = asyncio.timeout_at(when)
+        try:
+            async with scope:
+                self._scopes[task] = scope
+                try:
+                    return await awaitable
+                finally:
+                    del self._scopes[task]
+        except TimeoutError:
+            if not scope.expired():
+                # Raised by the call itself
+                raise
+            if self._exceeded is None:
+                self._exhaust(self._deadline_reason())
+            raise BudgetExceeded(self._exceeded) from None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "elapsed": time.monotonic() - self.started,
+            "deadline": self.deadline,
+            "tokens": self.tokens,
+            "max_tokens": self.max_tokens,
+            "tool_calls": self.tool_calls,
+            "max_tool_calls": self.max_tool_calls,
+            "exceeded": self._exceeded,
+        }
+
+    def __enter__(self) -> "RunBudget":
+        self._token = _active.set(self)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        _active.reset(self._token)
+
+
+def budgeted(fn):
+    """Decorate a coroutine function so each call runs under the active budget"""
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        budget = _active.get()
+        if budget is None:
+            return await fn(*args, **kwargs)
+        return await budget.guard(fn(*args, **kwargs))
+
+    return wrapper
@@ -0,0 +1,270 @@
+"""Record and replay of LLM responses and tool results for offline agent runs."""
+import gzip
+import hashlib
+import json
+import time
+from collections import defaultdict, deque
+from contextlib import nullcontext
+from contextvars import ContextVar, Token
+from pathlib import Path
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    ContextManager,
+    Deque,
+    Dict,
+    List,
+    Optional,
+    Union,
+)
+
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+from pydantic import BaseModel
+
+from app.exceptions import CassetteMiss
+from app.llm_cache import request_key
+from app.logger import logger
+
+
+CASSETTE_VERSION = 1
+
+_active: ContextVar[Optional["Cassette"]] = ContextVar("cassette", default=None)
+
+
+def active_cassette() -> Optional["Cassette"]:
+    """Cassette recording or replaying the current run, if any"""
+    return _active.get()
+
+
+def tool_key(name: str, tool_input: Optional[Dict[str, Any]]) -> str:
+    """Canonical hash of a tool invocation"""
+    canonical = json.dumps(
+        [name, tool_input or {}], sort_keys=True, ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class _RecordingStream:
+    """Pass a response stream through while keeping its chunks for the cassette"""
+
+    def __init__(self, stream: Any, on_done: Callable[[List[dict]], None]):
+        self._stream = stream
+        self._on_done = on_done
+        self._chunks: List[dict] = []
+
+    def _done(self) -> None:
+        if self._on_done is not None:
+            on_done, self._on_done = self._on_done, None
+            on_done(self._chunks)
+
+    async def __aiter__(self):
+        try:
+            async for chunk in self._stream:
+                self._chunks.append(chunk.model_dump(mode="json"))
+                yield chunk
+        finally:
+            self._done()
+
+    async def close(self) -> None:
+        self._done()
+        close = getattr(self._stream, "close", None)
+        if close is not None:
+            await close()
+
+
+class _ReplayStream:
+    """Serve recorded chunks as a response stream"""
+
+    def __init__(self, chunks: List[dict]):
+        self._chunks = chunks
+
+    async def __aiter__(self):
+        for chunk in self._chunks:
+            yield ChatCompletionChunk.model_validate(chunk)
+
+    async def close(self) -> None:
+        pass
+
+
+class Cassette:
+    """Trajectory of LLM responses and tool results in a gzip-compressed JSONL file.
+
+    In record mode every LLM request and tool execution made while the
+    cassette is active is performed normally and its result appended to the
+    file. In replay mode nothing is sent or executed: results are served
+    from the file by request key, in recorded order when the same request
+    was made more than once, and an unrecorded request raises CassetteMiss.
+    Ids the run makes up, such as plan ids, come from `next_id` so they are
+    the same when replayed.
+
+    Activate a cassette for a run with `with Cassette(path, "replay"): ...`.
+    """
+
+    RECORD = "record"
+    REPLAY = "replay"
+
+    def __init__(self, path: Union[str, Path], mode: str = REPLAY):
+        if mode not in (self.RECORD, self.REPLAY):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = Path(path)
+        self.mode = mode
+        self.recorded = 0
+        self.replayed = 0
+        self._file = None
+        self._entries: Dict[tuple, Deque[dict]] = defaultdict(deque)
+        self._ids: Dict[str, int] = defaultdict(int)
+        self._token: Optional[Token] = None
+
+        if mode == self.REPLAY:
+            self._load()
+        else:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = gzip.open(self.path, "wt", encoding="utf-8")
+            self._write(
+                {"kind": "meta", "version": CASSETTE_VERSION, "created": time.time()}
+            )
+
+    def _load(self) -> None:
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            for line in f:
+                entry = json.loads(line)
+                if entry["kind"] == "meta":
+                    if entry.get("version") != CASSETTE_VERSION:
+                        raise ValueError(
+                            f"Unsupported cassette version {entry.get('version')} in {self.path}"
+                        )
+                    continue
+                self._entries[(entry["kind"], entry["key"])].append(entry)
+
+    def _write(self, entry: dict) -> None:
+        self._file.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+        if entry["kind"] != "meta":
+            self.recorded += 1
+
+    def _next(self, kind: str, key: str, description: str) -> dict:
+        entries = self._entries.get((kind, key))
+        if not entries:
+            raise CassetteMiss(
+                f"No recorded {kind} result for {description} ({key[:12]}) in {self.path}"
+            )
+        self.replayed += 1
+        return entries.popleft()
+
+    def next_id(self, prefix: str) -> str:
+        """Id numbered in order of creation, identical in record and replay"""
+        self._ids[prefix] += 1
+        return f"{prefix}_{self._ids[prefix]}"
+
+    @property
+    def remaining(self) -> int:
+        """Recorded results not served yet"""
+        return sum(len(entries) for entries in self._entries.values())
+
+    async def llm_request(
+        self, params: dict, stream: bool, send: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Record or replay one completion request made through `send`"""
+        # request_key ignores the stream flag, but streams are recorded as chunks
+        key = request_key(params) + (":stream" if stream else "")
+        if self.mode == self.REPLAY:
+            entry = self._next("llm", key, f"{params.get('model')} request")
+            if stream:
+                return _ReplayStream(entry["chunks"])
+            return ChatCompletion.model_validate(entry["response"])
+
+        response = await send()
+        if stream:
+            return _RecordingStream(
+                response,
+                lambda chunks: self._write(
+                    {"kind": "llm", "key": key, "stream": True, "chunks": chunks}
+                ),
+            )
+        self._write(
+            {"kind": "llm", "key": key, "response": response.model_dump(mode="json")}
+        )
+        return response
+
+    async def tool_result(
+        self,
+        name: str,
+        tool_input: Optional[Dict[str, Any]],
+        execute: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """Record or replay one tool execution performed by `execute`"""
+        key = tool_key(name, tool_input)
+        if self.mode == self.REPLAY:
+            return self._load_result(self._next("tool", key, f"tool {name}")["result"])
+
+        result = await execute()
+        self._write(
+            {
+                "kind": "tool",
+                "key": key,
+                "name": name,
+                "result": self._dump_result(result),
+            }
+        )
+        return result
+
+    @staticmethod
+    def _dump_result(result: Any) -> dict:
+        if isinstance(result, BaseModel):
+            return {"type": type(result).__name__, "fields": result.model_dump()}
+        return {"value": result}
+
+    @staticmethod
+    def _load_result(data: dict) -> Any:
+        if "fields" not in data:
+            return data["value"]
+        # Imported here as the tools package depends on the LLM module
+        from app.tool.base import CLIResult, ToolFailure, ToolResult
+
+        result_types = {
+            cls.__name__: cls for cls in (ToolResult, CLIResult, ToolFailure)
+        }
+        return result_types.get(data["type"], ToolResult)(**data["fields"])
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            logger.info(f"Recorded {self.recorded} interactions to {self.path}")
+        elif self.mode == self.REPLAY and self.remaining:
+            logger.warning(
+                f"Replay of {self.path} finished with {self.remaining} unused results"
+            )
+
+    def __enter__(self) -> "Cassette":
+        self._token = _active.set(self)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        _active.reset(self._token)
+        self.close()
+
+
+def use_cassette(
+    record: Optional[str] = None, replay: Optional[str] = None
+) -> Union["Cassette", ContextManager[None]]:
+    """Context for a run: recording to `record`, replaying `replay`, or neither"""
+    if record and replay:
+        raise ValueError("Cannot record and replay a cassette at the same time")
+    if record:
+        return Cassette(record, Cassette.RECORD)
+    if replay:
+        return Cassette(replay, Cassette.REPLAY)
+    return nullcontext()
+
+
+async def execute_tool(
+    name: str,
+    tool_input: Optional[Dict[str, Any]],
+    execute: Callable[[], Awaitable[Any]],
+) -> Any:
+    """Run a tool through the active cassette, or directly without one"""
+    cassette = active_cassette()
+    if cassette is None:
+        return await execute()
+    return await cassette.tool_result(name, tool_input, execute)
@@ -0,0 +1,158 @@
+"""Checkpoints of agent and planning flow runs, for resuming after a crash."""
+import gzip
+import json
+import os
+import time
+from contextvars import ContextVar, Token
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+from app.logger import logger
+from app.schema import AgentState, Message, ToolCall
+
+
+CHECKPOINT_VERSION = 1
+
+_active: ContextVar[Optional["Checkpoint"]] = ContextVar("checkpoint", default=None)
+
+
+def active_checkpoint() -> Optional["Checkpoint"]:
+    """Checkpoint saving the current run, if any"""
+    return _active.get()
+
+
+def snapshot_agent(agent: Any) -> Dict[str, Any]:
+    """State an agent needs to continue after its last completed step"""
+    return {
+        "name": agent.name,
+        "state": agent.state.value,
+        "current_step": agent.current_step,
+        "next_step_prompt": agent.next_step_prompt,
+        "messages": [message.to_dict() for message in agent.memory.messages],
+        "tool_calls": [call.model_dump() for call in getattr(agent, "tool_calls", [])],
+    }
+
+
+def restore_agent(agent: Any, data: Dict[str, Any]) -> AgentState:
+    """Restore an agent snapshot, leaving the agent idle and ready to run
+
+    Returns:
+        AgentState: The state the agent was in when the snapshot was taken
+    """
+    agent.messages = [Message(**message) for message in data["messages"]]
+    agent.current_step = data["current_step"]
+    agent.next_step_prompt = data["next_step_prompt"]
+    if hasattr(agent, "tool_calls"):
+        agent.tool_calls = [ToolCall(**call) for call in data["tool_calls"]]
+    agent.state = AgentState.IDLE
+    return AgentState(data["state"])
+
+
+def snapshot_flow(flow: Any) -> Dict[str, Any]:
+    """Plan progress of a planning flow and the state of each of its agents"""
+    return {
+        "active_plan_id": flow.active_plan_id,
+        "current_step_index": flow.current_step_index,
+        "plans": flow.planning_tool.plans,
+        "agents": {key: snapshot_agent(agent) for key, agent in flow.agents.items()},
+    }
+
+
+def restore_flow(flow: Any, data: Dict[str, Any]) -> None:
+    """Restore a planning flow snapshot, to be continued with `flow.execute("")`
+
+    An agent stopped in the middle of a plan step is recorded on the flow so
+    that it continues that run instead of restarting the step.
+    """
+    flow.active_plan_id = data["active_plan_id"]
+    flow.current_step_index = data["current_step_index"]
+    flow.planning_tool.plans = data["plans"]
+    for key, agent_data in data["agents"].items():
+        agent = flow.agents.get(key)
+        if agent is None:
+            logger.warning(f"Checkpoint agent {key} is not part of the flow, skipped")
+            continue
+        if restore_agent(agent, agent_data) != AgentState.IDLE:
+            flow.interrupted_executor = key
+
+
+class Checkpoint:
+    """Snapshot of an agent or planning flow run in a gzip-compressed JSON file.
+
+    While active (`with Checkpoint(path, agent): ...`) the target is saved
+    after every `every` completed agent steps, and planning flows also save
+    after each plan update. A file is replaced atomically, so a crash during
+    a save leaves the previous checkpoint intact. `restore()` loads the file
+    back into the target, which then continues from its last completed step:
+    `agent.run()` without a request, or `flow.execute("")`.
+    """
+
+    def __init__(self, path: Union[str, Path], target: Any, every: int = 1):
+        self.path = Path(path)
+        self.target = target
+        self.every = max(1, every)
+        self.saves = 0
+        self._steps = 0
+        self._token: Optional[Token] = None
+
+    @property
+    def is_flow(self) -> bool:
+        return hasattr(self.target, "planning_tool")
+
+    def save(self) -> None:
+        """Write the target's current state"""
+        data = {
+            "version": CHECKPOINT_VERSION,
+            "kind": "flow" if self.is_flow else "agent",
+            "saved_at": time.time(),
+            "state": (
+                snapshot_flow(self.target)
+                if self.is_flow
+                else snapshot_agent(self.target)
+            ),
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp = self.path.with_name(self.path.name + ".tmp")
+        with gzip.open(temp, "wt", encoding="utf-8", compresslevel=6) as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(temp, self.path)
+        self.saves += 1
+
+    def step_completed(self) -> None:
+        """Save after every `every` completed agent steps"""
+        self._steps += 1
+        if self._steps % self.every == 0:
+            self.save()
+
+    @staticmethod
+    def load(path: Union[str, Path]) -> Dict[str, Any]:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != CHECKPOINT_VERSION:
+            raise ValueError(
+                f"Unsupported checkpoint version {data.get('version')} in {path}"
+            )
+        return data
+
+    def restore(self) -> Optional[AgentState]:
+        """Load the checkpoint into the target
+
+        Returns:
+            Optional[AgentState]: For an agent, its state when saved
+        """
+        data = self.load(self.path)
+        kind = "flow" if self.is_flow else "agent"
+        if data["kind"] != kind:
+            raise ValueError(f"Checkpoint {self.path} is not a {kind} checkpoint")
+        logger.info(f"Resuming {kind} from checkpoint {self.path}")
+        if self.is_flow:
+            restore_flow(self.target, data["state"])
+            return None
+        return restore_agent(self.target, data["state"])
+
+    def __enter__(self) -> "Checkpoint":
+        self._token = _active.set(self)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        _active.reset(self._token)
@@ -23,11 +23,174 @@ class LLMSettings(BaseModel):
     max_tokens: int = Field(4096, description="Maximum number of tokens per request")
     max_input_tokens: Optional[int] = Field(
         None,
-        description="Maximum input tokens to use across all requests (None for unlimited)",
+        description="Maximum input tokens to use across all requests of a run (None for unlimited)",
     )
     temperature: float = Field(1.0, description="Sampling temperature")
     api_type: str = Field(..., description="Azure, Openai, or Ollama")
     api_version: str = Field(..., description="Azure Openai version if AzureOpenai")
+    context_budget: Optional[int] = Field(
+        None,
+        description="Token budget agent memory is compacted to before each request (None to disable)",
+    )
+    coalesce_requests: bool = Field(
+        True,
+        description="Share one upstream call among concurrent identical deterministic requests",
+    )
+    deterministic: bool = Field(
+        False,
+        description="Whether the model answers identical requests identically without temperature 0",
+    )
+    requests_per_minute: Optional[int] = Field(
+        None, description="Provider request rate limit (None for unlimited)"
+    )
+    tokens_per_minute: Optional[int] = Field(
+        None, description="Provider input token rate limit (None for unlimited)"
+    )
+    max_retries: int = Field(6, description="Maximum retries of retryable errors")
+    retry_max_wait: float = Field(
+        60.0, description="Maximum seconds to wait between retries"
+    )
+    circuit_failure_threshold: int = Field(
+        5, description="Consecutive provider failures before the circuit opens"
+    )
+    circuit_recovery_timeout: float = Field(
+        30.0, description="Seconds before a trial call is allowed on an open circuit"
+    )
+    endpoints: Optional[List[str]] = Field(
+        None,
+        description="Names of [llm.<name>] configs serving the same model to route between by latency",
+    )
+    hedge_delay: Optional[float] = Field(
+        None,
+        description="Seconds before a hedged duplicate is sent to the next best endpoint (None to disable)",
+    )
+    failover_retries: int = Field(
+        1,
+        description="Retries on a routed endpoint before failing over to the next one; the last one uses max_retries",
+    )
+    approximate_tokens: bool = Field(
+        False,
+        description="Estimate prompt tokens from character counts, counting exactly only near max_input_tokens",
+    )
+    chars_per_token: float = Field(
+        4.0, description="Initial characters per token of the approximate estimator"
+    )
+    stream_usage: bool = Field(
+        False,
+        description="Request token usage at the end of streamed responses (stream_options, not supported by every endpoint)",
+    )
+
+
+class LLMCacheSettings(BaseModel):
+    """Configuration for the on-disk LLM response cache"""
+
+    enabled: bool = Field(False, description="Whether to cache LLM responses")
+    path: str = Field(
+        "cache/llm_responses.sqlite",
+        description="SQLite file for cached responses, relative to the project root",
+    )
+    max_size_mb: float = Field(
+        256, description="Maximum cache size before least recently used eviction"
+    )
+    deterministic_only: bool = Field(
+        True,
+        description="Only cache deterministic requests, such as those with temperature 0",
+    )
+
+
+class HTTPPoolSettings(BaseModel):
+    """Configuration for the process-wide HTTP connection pool used by LLM clients"""
+
+    max_connections: int = Field(100, description="Maximum open connections")
+    max_keepalive_connections: int = Field(
+        20, description="Maximum idle connections kept alive for reuse"
+    )
+    keepalive_expiry: float = Field(
+        30.0, description="Seconds an idle connection is kept alive"
+    )
+    http2: bool = Field(False, description="Enable HTTP/2 (requires the h2 package)")
+    connect_timeout: float = Field(10.0, description="Connect timeout (seconds)")
+    read_timeout: float = Field(600.0, description="Read timeout (seconds)")
+    write_timeout: float = Field(60.0, description="Write timeout (seconds)")
+    pool_timeout: float = Field(
+        30.0, description="Seconds to wait for a free connection from the pool"
+    )
+
+
+class TelemetrySettings(BaseModel):
+    """Configuration for per-call LLM telemetry"""
+
+    enabled: bool = Field(True, description="Whether to record LLM call metrics")
+    buffer_size: int = Field(1000, description="Most recent calls kept in memory")
+    log_calls: bool = Field(False, description="Log a line per LLM call")
+    export_path: Optional[str] = Field(
+        None,
+        description="JSONL file each call is appended to, relative to the project root",
+    )
+
+
+class MemorySettings(BaseModel):
+    """Configuration for agent memory history"""
+
+    archive: bool = Field(
+        False, description="Write messages evicted from agent memory to disk"
+    )
+    archive_dir: str = Field(
+        "logs/memory",
+        description="Directory of evicted message logs, relative to the project root",
+    )
+    archive_max_bytes: Optional[int] = Field(
+        50 * 1024 * 1024,
+        description="Size at which an evicted message log stops growing (None for unlimited)",
+    )
+
+
+class AgentPoolSettings(BaseModel):
+    """Configuration for the pool of warm agents used by the API service"""
+
+    min_size: int = Field(1, description="Agents kept initialized while idle")
+    max_size: int = Field(4, description="Most agents alive at once")
+    idle_timeout: float = Field(
+        300.0, description="Seconds an agent above min_size may stay idle"
+    )
+    acquire_timeout: Optional[float] = Field(
+        60.0, description="Seconds to wait for a free agent (None to wait forever)"
+    )
+
+
+class BudgetSettings(BaseModel):
+    """Default limits of each agent or planning flow run"""
+
+    deadline: Optional[float] = Field(
+        None, description="Seconds of wall-clock time a run may take"
+    )
+    max_tokens: Optional[int] = Field(
+        None, description="Prompt and completion tokens a run may use"
+    )
+    max_tool_calls: Optional[int] = Field(None, description="Tool calls a run may make")
+
+
+class ImageSettings(BaseModel):
+    """Configuration for the image pipeline applied to screenshots before LLM calls"""
+
+    enabled: bool = Field(True, description="Whether to downscale and re-encode images")
+    quality: int = Field(75, description="JPEG quality used when re-encoding")
+    max_long_side: int = Field(
+        2048, description="Longest side, in pixels, the model looks at"
+    )
+    max_short_side: int = Field(
+        768, description="Shortest side, in pixels, the model looks at"
+    )
+    max_tiles: Optional[int] = Field(
+        None,
+        description="Further downscale so the image covers at most this many 512px tiles",
+    )
+    max_images_in_memory: Optional[int] = Field(
+        3, description="Images kept in agent memory before older ones are dropped"
+    )
+    max_image_bytes_in_memory: Optional[int] = Field(
+        None, description="Base64 bytes of images kept in agent memory"
+    )
 
 
 class ProxySettings(BaseModel):
@@ -148,6 +311,27 @@ class MCPSettings(BaseModel):
 
 class AppConfig(BaseModel):
     llm: Dict[str, LLMSettings]
+    llm_cache: Optional[LLMCacheSettings] = Field(
+        None, description="LLM response cache configuration"
+    )
+    http_pool: Optional[HTTPPoolSettings] = Field(
+        None, description="HTTP connection pool configuration"
+    )
+    image: Optional[ImageSettings] = Field(
+        None, description="Image pipeline configuration"
+    )
+    telemetry: Optional[TelemetrySettings] = Field(
+        None, description="LLM telemetry configuration"
+    )
+    memory: Optional[MemorySettings] = Field(
+        None, description="Agent memory configuration"
+    )
+    agent_pool: Optional[AgentPoolSettings] = Field(
+        None, description="Warm agent pool configuration"
+    )
+    budget: Optional[BudgetSettings] = Field(
+        None, description="Per-run budget configuration"
+    )
     sandbox: Optional[SandboxSettings] = Field(
         None, description="Sandbox configuration"
     )
@@ -215,6 +399,21 @@ class Config:
             "temperature": base_llm.get("temperature", 1.0),
             "api_type": base_llm.get("api_type", ""),
             "api_version": base_llm.get("api_version", ""),
+            "context_budget": base_llm.get("context_budget"),
+            "coalesce_requests": base_llm.get("coalesce_requests", True),
+            "deterministic": base_llm.get("deterministic", False),
+            "requests_per_minute": base_llm.get("requests_per_minute"),
+            "tokens_per_minute": base_llm.get("tokens_per_minute"),
+            "max_retries": base_llm.get("max_retries", 6),
+            "retry_max_wait": base_llm.get("retry_max_wait", 60.0),
+            "circuit_failure_threshold": base_llm.get("circuit_failure_threshold", 5),
+            "circuit_recovery_timeout": base_llm.get("circuit_recovery_timeout", 30.0),
+            "endpoints": base_llm.get("endpoints"),
+            "hedge_delay": base_llm.get("hedge_delay"),
+            "failover_retries": base_llm.get("failover_retries", 1),
+            "approximate_tokens": base_llm.get("approximate_tokens", False),
+            "chars_per_token": base_llm.get("chars_per_token", 4.0),
+            "stream_usage": base_llm.get("stream_usage", False),
         }
 
         # handle browser config.
@@ -260,6 +459,27 @@ class Config:
         else:
             sandbox_settings = SandboxSettings()
 
+        llm_cache_config = raw_config.get("llm_cache", {})
+        llm_cache_settings = LLMCacheSettings(**llm_cache_config)
+
+        http_pool_config = raw_config.get("http", {})
+        http_pool_settings = HTTPPoolSettings(**http_pool_config)
+
+        image_config = raw_config.get("image", {})
+        image_settings = ImageSettings(**image_config)
+
+        telemetry_config = raw_config.get("telemetry", {})
+        telemetry_settings = TelemetrySettings(**telemetry_config)
+
+        memory_config = raw_config.get("memory", {})
+        memory_settings = MemorySettings(**memory_config)
+
+        agent_pool_config = raw_config.get("agent_pool", {})
+        agent_pool_settings = AgentPoolSettings(**agent_pool_config)
+
+        budget_config = raw_config.get("budget", {})
+        budget_settings = BudgetSettings(**budget_config)
+
         mcp_config = raw_config.get("mcp", {})
         mcp_settings = None
         if mcp_config:
@@ -277,6 +497,13 @@ class Config:
                     for name, override_config in llm_overrides.items()
                 },
             },
+            "llm_cache": llm_cache_settings,
+            "http_pool": http_pool_settings,
+            "image": image_settings,
+            "telemetry": telemetry_settings,
+            "memory": memory_settings,
+            "agent_pool": agent_pool_settings,
+            "budget": budget_settings,
             "sandbox": sandbox_settings,
             "browser_config": browser_settings,
             "search_config": search_settings,
@@ -289,6 +516,34 @@ class Config:
     def llm(self) -> Dict[str, LLMSettings]:
         return self._config.llm
 
+    @property
+    def llm_cache(self) -> LLMCacheSettings:
+        return self._config.llm_cache
+
+    @property
+    def http_pool(self) -> HTTPPoolSettings:
+        return self._config.http_pool
+
+    @property
+    def image(self) -> ImageSettings:
+        return self._config.image
+
+    @property
+    def telemetry(self) -> TelemetrySettings:
+        return self._config.telemetry
+
+    @property
+    def memory(self) -> MemorySettings:
+        return self._config.memory
+
+    @property
+    def agent_pool(self) -> AgentPoolSettings:
+        return self._config.agent_pool
+
+    @property
+    def budget(self) -> BudgetSettings:
+        return self._config.budget
+
     @property
     def sandbox(self) -> SandboxSettings:
         return self._config.sandbox
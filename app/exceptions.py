@@ -11,3 +11,15 @@ class OpenManusError(Exception):
 
 class TokenLimitExceeded(OpenManusError):
     """Exception raised when the token limit is exceeded"""
+
+
+class CircuitOpenError(OpenManusError):
+    """Exception raised when calls to a failing LLM provider are suspended"""
+
+
+class CassetteMiss(OpenManusError):
+    """Exception raised when a replayed run makes a request that was not recorded"""
+
+
+class BudgetExceeded(OpenManusError):
+    """Exception raised when a run uses up its deadline, token or tool call budget"""
@@ -1,16 +1,20 @@
+import itertools
 import json
-import time
 from enum import Enum
 from typing import Dict, List, Optional, Union
 
 from pydantic import Field
 
 from app.agent.base import BaseAgent
+from app.budget import active_budget
+from app.cassette import active_cassette
+from app.checkpoint import active_checkpoint
 from app.flow.base import BaseFlow
 from app.llm import LLM
 from app.logger import logger
 from app.schema import AgentState, Message, ToolChoice
 from app.tool import PlanningTool
+from app.usage import UsageLedger
 
 
 class PlanStepStatus(str, Enum):
@@ -42,14 +46,30 @@ class PlanStepStatus(str, Enum):
         }
 
 
+_plan_numbers = itertools.count(1)
+
+
+def new_plan_id() -> str:
+    """Plan id numbered within the active cassette, or within the process"""
+    cassette = active_cassette()
+    if cassette is not None:
+        return cassette.next_id("plan")
+    return f"plan_{next(_plan_numbers)}"
+
+
 class PlanningFlow(BaseFlow):
     """A flow that manages planning and execution of tasks using agents."""
 
     llm: LLM = Field(default_factory=lambda: LLM())
     planning_tool: PlanningTool = Field(default_factory=PlanningTool)
     executor_keys: List[str] = Field(default_factory=list)
-    active_plan_id: str = Field(default_factory=lambda: f"plan_{int(time.time())}")
+    # Assigned when the first plan is created, so replayed runs get the same id
+    active_plan_id: Optional[str] = None
     current_step_index: Optional[int] = None
+    # Agent whose run of the current step was interrupted, set on resume
+    interrupted_executor: Optional[str] = None
+    # Tokens of the current or last execution, its agents' runs included
+    usage: Optional[UsageLedger] = None
 
     def __init__(
         self, agents: Union[BaseAgent, List[BaseAgent], Dict[str, BaseAgent]], **data
@@ -93,12 +113,19 @@ class PlanningFlow(BaseFlow):
 
     async def execute(self, input_text: str) -> str:
         """Execute the planning flow with agents."""
+        self.usage = UsageLedger("planning_flow")
+        async with self.usage:
+            return await self._execute_plan(input_text)
+
+    async def _execute_plan(self, input_text: str) -> str:
         try:
             if not self.primary_agent:
                 raise ValueError("No primary agent available")
 
             # Create initial plan if input provided
             if input_text:
+                if self.active_plan_id is None:
+                    self.active_plan_id = new_plan_id()
                 await self._create_initial_plan(input_text)
 
                 # Verify plan was created successfully
@@ -107,9 +134,22 @@ class PlanningFlow(BaseFlow):
                         f"Plan creation failed. Plan ID {self.active_plan_id} not found in planning tool."
                     )
                     return f"Failed to create plan for: {input_text}"
+                self._save_checkpoint()
 
             result = ""
+            if self.interrupted_executor:
+                result += await self._resume_interrupted_step() + "\n"
+
             while True:
+                # Stop between steps once the run budget is used up
+                exceeded = self._budget_exceeded()
+                if exceeded is not None:
+                    logger.warning(
+                        f"Stopping the plan: run budget exhausted ({exceeded})"
+                    )
+                    result += f"Terminated: Run budget exhausted ({exceeded})"
+                    break
+
                 # Get current step to execute
                 self.current_step_index, step_info = await self._get_current_step_info()
 
@@ -277,14 +317,30 @@ class PlanningFlow(BaseFlow):
         try:
             step_result = await executor.run(step_prompt)
 
-            # Mark the step as completed after successful execution
-            await self._mark_step_completed()
+            # Mark the step as completed after successful execution, unless
+            # the agent was stopped by the run budget
+            if self._budget_exceeded() is None:
+                await self._mark_step_completed()
 
             return step_result
         except Exception as e:
             logger.error(f"Error executing step {self.current_step_index}: {e}")
             return f"Error executing step {self.current_step_index}: {str(e)}"
 
+    async def _resume_interrupted_step(self) -> str:
+        """Continue the agent run that a checkpoint was taken in the middle of"""
+        executor = self.agents[self.interrupted_executor]
+        self.interrupted_executor = None
+        logger.info(f"Continuing step {self.current_step_index} from checkpoint")
+        try:
+            step_result = await executor.run()
+            if self._budget_exceeded() is None:
+                await self._mark_step_completed()
+            return step_result
+        except Exception as e:
+            logger.error(f"Error executing step {self.current_step_index}: {e}")
+            return f"Error executing step {self.current_step_index}: {str(e)}"
+
     async def _mark_step_completed(self) -> None:
         """Mark the current step as completed."""
         if self.current_step_index is None:
@@ -315,6 +371,20 @@ class PlanningFlow(BaseFlow):
                 # Update the status
                 step_statuses[self.current_step_index] = PlanStepStatus.COMPLETED.value
                 plan_data["step_statuses"] = step_statuses
+        self._save_checkpoint()
+
+    @staticmethod
+    def _budget_exceeded() -> Optional[str]:
+        """Why the active run budget ran out, if it did"""
+        budget = active_budget()
+        return budget.exceeded if budget is not None else None
+
+    @staticmethod
+    def _save_checkpoint() -> None:
+        """Save plan progress to the active checkpoint, if any"""
+        checkpoint = active_checkpoint()
+        if checkpoint is not None:
+            checkpoint.save()
 
     async def _get_plan_text(self) -> str:
         """Get the current plan as formatted text."""
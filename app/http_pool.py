@@ -0,0 +1,88 @@
+"""Process-wide pooled HTTP transport shared by all LLM clients."""
+import threading
+from typing import Any, Dict, Optional
+
+import httpx
+
+from app.config import HTTPPoolSettings, config
+from app.logger import logger
+
+
+_client: Optional[httpx.AsyncClient] = None
+_client_lock = threading.Lock()
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def create_http_client(settings: HTTPPoolSettings) -> httpx.AsyncClient:
+    """Create an AsyncClient with pool limits, keep-alive and timeouts from settings"""
+    http2 = settings.http2
+    if http2 and not _http2_available():
+        logger.warning("HTTP/2 requested but the h2 package is missing, using HTTP/1.1")
+        http2 = False
+
+    return httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=settings.max_connections,
+            max_keepalive_connections=settings.max_keepalive_connections,
+            keepalive_expiry=settings.keepalive_expiry,
+        ),
+        timeout=httpx.Timeout(
+            connect=settings.connect_timeout,
+            read=settings.read_timeout,
+            write=settings.write_timeout,
+            pool=settings.pool_timeout,
+        ),
+        follow_redirects=True,
+    )
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get the shared AsyncClient, creating it on first use"""
+    global _client
+    if _client is None or _client.is_closed:
+        with _client_lock:
+            if _client is None or _client.is_closed:
+                _client = create_http_client(config.http_pool or HTTPPoolSettings())
+    return _client
+
+
+async def close_http_client() -> None:
+    """Close the shared AsyncClient and all pooled connections"""
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
+
+
+def pool_stats() -> Dict[str, Any]:
+    """Report open and idle connections of the shared pool"""
+    settings = config.http_pool or HTTPPoolSettings()
+    stats = {
+        "open": 0,
+        "idle": 0,
+        "active": 0,
+        "max_connections": settings.max_connections,
+        "max_keepalive_connections": settings.max_keepalive_connections,
+    }
+    if _client is None or _client.is_closed:
+        return stats
+
+    # httpx does not expose pool state publicly; read it from the httpcore pool
+    pool = getattr(getattr(_client, "_transport", None), "_pool", None)
+    for connection in getattr(pool, "connections", []):
+        if connection.is_closed():
+            continue
+        stats["open"] += 1
+        if connection.is_idle():
+            stats["idle"] += 1
+        else:
+            stats["active"] += 1
+    return stats
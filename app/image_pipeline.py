@@ -0,0 +1,139 @@
+"""Screenshot downscaling, re-encoding and header-based dimension reading."""
+import base64
+import binascii
+import io
+import struct
+from typing import Optional, Tuple
+
+from PIL import Image
+
+from app.config import ImageSettings, config
+from app.logger import logger
+
+
+# Base64 characters decoded first when looking for an image header
+_HEADER_PREFIX_CHARS = 16384
+# Side of the square tiles high-detail images are billed by
+TILE_SIZE = 512
+
+
+def _jpeg_dimensions(data: bytes) -> Optional[Tuple[int, int]]:
+    """Read width and height from the first JPEG start-of-frame segment"""
+    offset = 2
+    while offset + 4 <= len(data):
+        if data[offset] != 0xFF:
+            return None
+        marker = data[offset + 1]
+        # Fill bytes and standalone markers carry no length
+        if marker == 0xFF:
+            offset += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD9:
+            offset += 2
+            continue
+        (length,) = struct.unpack(">H", data[offset + 2 : offset + 4])
+        # SOF0-SOF15, except DHT (C4), JPG (C8) and DAC (CC)
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            if offset + 9 > len(data):
+                return None
+            height, width = struct.unpack(">HH", data[offset + 5 : offset + 9])
+            return width, height
+        offset += 2 + length
+    return None
+
+
+def _webp_dimensions(data: bytes) -> Optional[Tuple[int, int]]:
+    chunk = data[12:16]
+    if chunk == b"VP8X" and len(data) >= 30:
+        width = int.from_bytes(data[24:27], "little") + 1
+        height = int.from_bytes(data[27:30], "little") + 1
+        return width, height
+    if chunk == b"VP8 " and len(data) >= 30:
+        width, height = struct.unpack("<HH", data[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L" and len(data) >= 25:
+        bits = int.from_bytes(data[21:25], "little")
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    return None
+
+
+def image_dimensions(data: bytes) -> Optional[Tuple[int, int]]:
+    """Read (width, height) from a JPEG, PNG, GIF or WebP header without decoding"""
+    if data[:2] == b"\xff\xd8":
+        return _jpeg_dimensions(data)
+    if data[:8] == b"\x89PNG\r\n\x1a\n" and len(data) >= 24:
+        return struct.unpack(">II", data[16:24])
+    if data[:4] == b"GIF8" and len(data) >= 10:
+        return struct.unpack("<HH", data[6:10])
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return _webp_dimensions(data)
+    return None
+
+
+def base64_image_dimensions(base64_image: str) -> Optional[Tuple[int, int]]:
+    """Read image dimensions from base64 data, decoding only a prefix when possible"""
+    if base64_image.startswith("data:"):
+        base64_image = base64_image.partition(",")[2]
+    try:
+        prefix = base64_image[:_HEADER_PREFIX_CHARS]
+        dimensions = image_dimensions(base64.b64decode(prefix[: len(prefix) // 4 * 4]))
+        if dimensions is None and len(base64_image) > _HEADER_PREFIX_CHARS:
+            # The frame header sits behind large metadata segments
+            dimensions = image_dimensions(base64.b64decode(base64_image))
+    except (binascii.Error, ValueError, struct.error):
+        return None
+    return dimensions
+
+
+def target_size(
+    width: int, height: int, settings: Optional[ImageSettings] = None
+) -> Tuple[int, int]:
+    """Largest size the model actually looks at, optionally capped to a tile budget"""
+    settings = settings or config.image or ImageSettings()
+    scale = min(1.0, settings.max_long_side / max(width, height))
+    scale = min(scale, settings.max_short_side / max(1, min(width, height)))
+
+    if settings.max_tiles:
+        # Best scale whose tile grid fits the budget, over every grid shape
+        tiles_budget = max(1, settings.max_tiles)
+        fitting = max(
+            min(
+                TILE_SIZE * columns / width,
+                TILE_SIZE * (tiles_budget // columns) / height,
+            )
+            for columns in range(1, tiles_budget + 1)
+        )
+        scale = min(scale, fitting)
+
+    return max(1, int(width * scale)), max(1, int(height * scale))
+
+
+def prepare_image(data: bytes, settings: Optional[ImageSettings] = None) -> bytes:
+    """Downscale an image to the model's resolution and re-encode it as JPEG
+
+    Images already within the target size and in JPEG format are returned
+    unchanged. Pass lossless captures, such as PNG screenshots, so the image
+    is only JPEG-encoded once.
+    """
+    settings = settings or config.image or ImageSettings()
+    if not settings.enabled:
+        return data
+
+    dimensions = image_dimensions(data)
+    if dimensions is not None:
+        size = target_size(*dimensions, settings)
+        if size == dimensions and data[:2] == b"\xff\xd8":
+            return data
+
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image = image.convert("RGB")
+            size = target_size(*image.size, settings)
+            if size != image.size:
+                image = image.resize(size, Image.LANCZOS)
+            output = io.BytesIO()
+            image.save(output, format="JPEG", quality=settings.quality, optimize=True)
+    except OSError as e:
+        logger.warning(f"Could not re-encode image, sending it unchanged: {e}")
+        return data
+    return output.getvalue()
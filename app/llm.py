@@ -1,7 +1,10 @@
+import asyncio
+import json
 import math
-from typing import Dict, List, Optional, Union
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Union
 
-import tiktoken
 from openai import (
     APIError,
     AsyncAzureOpenAI,
@@ -10,25 +13,52 @@ from openai import (
     OpenAIError,
     RateLimitError,
 )
-from openai.types.chat import ChatCompletion, ChatCompletionMessage
-from tenacity import (
-    retry,
-    retry_if_exception_type,
-    stop_after_attempt,
-    wait_random_exponential,
+from openai.types import CompletionUsage
+from openai.types.chat import (
+    ChatCompletion,
+    ChatCompletionMessage,
+    ChatCompletionMessageToolCall,
+)
+from openai.types.chat.chat_completion_message_tool_call import (
+    Function as ToolCallFunction,
 )
 
 from app.bedrock import BedrockClient
+from app.budget import active_budget, budgeted
+from app.cassette import active_cassette
 from app.config import LLMSettings, config
-from app.exceptions import TokenLimitExceeded
+from app.exceptions import CircuitOpenError, TokenLimitExceeded
+from app.http_pool import get_http_client
+from app.image_pipeline import base64_image_dimensions
+from app.llm_batch import (
+    BATCH_FINAL_STATUSES,
+    AdaptiveConcurrency,
+    BatchBackend,
+    BatchCheckpoint,
+    BatchJobState,
+    BatchRequest,
+    BatchResult,
+    OpenAIBatchBackend,
+    read_batch_output,
+    write_batch_file,
+)
+from app.llm_cache import get_response_cache, request_key
+from app.llm_router import Endpoint, EndpointRouter
+from app.llm_telemetry import CallMetrics, current_call, get_telemetry, tracked
 from app.logger import logger  # Assuming a logger is set up in your app
+from app.profiler import profiled, span
+from app.rate_limit import classify_error, get_provider_limiter
 from app.schema import (
     ROLE_VALUES,
     TOOL_CHOICE_TYPE,
     TOOL_CHOICE_VALUES,
     Message,
     ToolChoice,
+    to_wire_format,
 )
+from app.singleflight import SingleFlight
+from app.tokenizer import get_tokenizer
+from app.usage import current_ledger
 
 
 REASONING_MODELS = ["o1", "o3-mini"]
@@ -54,8 +84,13 @@ class TokenCounter:
     HIGH_DETAIL_TARGET_SHORT_SIDE = 768
     TILE_SIZE = 512
 
+    # Maximum number of per-message counts kept in the ledger
+    LEDGER_SIZE = 4096
+
     def __init__(self, tokenizer):
         self.tokenizer = tokenizer
+        # Per-message token ledger keyed by content hash (LRU ordered)
+        self._ledger: OrderedDict[int, int] = OrderedDict()
 
     def count_text(self, text: str) -> int:
         """Calculate tokens for a text string"""
@@ -72,7 +107,8 @@ class TokenCounter:
         3. Count 512px tiles (170 tokens each)
         4. Add 85 tokens
         """
-        detail = image_item.get("detail", "medium")
+        image_url = image_item.get("image_url") or {}
+        detail = image_item.get("detail") or image_url.get("detail") or "medium"
 
         # For low detail, always return fixed token count
         if detail == "low":
@@ -82,11 +118,18 @@ class TokenCounter:
         # OpenAI doesn't specify a separate calculation for medium
 
         # For high detail, calculate based on dimensions if available
-        if detail == "high" or detail == "medium":
+        if detail in ("high", "medium", "auto"):
             # If dimensions are provided in the image_item
             if "dimensions" in image_item:
                 width, height = image_item["dimensions"]
                 return self._calculate_high_detail_tokens(width, height)
+            # Otherwise read them from the header of an inline image
+            url = image_url.get("url", "")
+            dimensions = (
+                base64_image_dimensions(url) if url.startswith("data:") else None
+            )
+            if dimensions:
+                return self._calculate_high_detail_tokens(*dimensions)
 
         return (
             self._calculate_high_detail_tokens(1024, 1024) if detail == "high" else 1024
@@ -100,8 +143,8 @@ class TokenCounter:
             width = int(width * scale)
             height = int(height * scale)
 
-        # Step 2: Scale so shortest side is HIGH_DETAIL_TARGET_SHORT_SIDE
-        scale = self.HIGH_DETAIL_TARGET_SHORT_SIDE / min(width, height)
+        # Step 2: Scale down so shortest side is at most HIGH_DETAIL_TARGET_SHORT_SIDE
+        scale = min(1.0, self.HIGH_DETAIL_TARGET_SHORT_SIDE / min(width, height))
         scaled_width = int(width * scale)
         scaled_height = int(height * scale)
 
@@ -144,31 +187,225 @@ class TokenCounter:
                 token_count += self.count_text(function.get("arguments", ""))
         return token_count
 
+    @classmethod
+    def _freeze(cls, value: Any) -> Any:
+        """Convert a message value into a hashable structure"""
+        if isinstance(value, dict):
+            return tuple(sorted((k, cls._freeze(v)) for k, v in value.items()))
+        if isinstance(value, (list, tuple)):
+            return tuple(cls._freeze(item) for item in value)
+        return value
+
+    @classmethod
+    def message_key(cls, message: dict) -> int:
+        """Content hash of a formatted message, used as its ledger key"""
+        return hash(
+            (
+                message.get("role"),
+                cls._freeze(message.get("content")),
+                cls._freeze(message.get("tool_calls")),
+                message.get("name"),
+                message.get("tool_call_id"),
+            )
+        )
+
+    def _count_message(self, message: dict) -> int:
+        """Tokenize a single formatted message"""
+        tokens = self.BASE_MESSAGE_TOKENS  # Base tokens per message
+
+        # Add role tokens
+        tokens += self.count_text(message.get("role", ""))
+
+        # Add content tokens
+        if "content" in message:
+            tokens += self.count_content(message["content"])
+
+        # Add tool calls tokens
+        if "tool_calls" in message:
+            tokens += self.count_tool_calls(message["tool_calls"])
+
+        # Add name and tool_call_id tokens
+        tokens += self.count_text(message.get("name", ""))
+        tokens += self.count_text(message.get("tool_call_id", ""))
+
+        return tokens
+
+    def count_message(self, message: dict) -> int:
+        """Calculate tokens for a single message, reusing the ledger when possible
+
+        Each distinct message is tokenized once; later lookups are served from
+        the ledger by content hash, so an edited message is simply re-counted.
+        """
+        key = self.message_key(message)
+        tokens = self._ledger.get(key)
+        if tokens is not None:
+            self._ledger.move_to_end(key)
+            return tokens
+
+        tokens = self._count_message(message)
+        self._ledger[key] = tokens
+        if len(self._ledger) > self.LEDGER_SIZE:
+            self._ledger.popitem(last=False)
+        return tokens
+
     def count_message_tokens(self, messages: List[dict]) -> int:
         """Calculate the total number of tokens in a message list"""
         total_tokens = self.FORMAT_TOKENS  # Base format tokens
 
         for message in messages:
-            tokens = self.BASE_MESSAGE_TOKENS  # Base tokens per message
+            total_tokens += self.count_message(message)
+
+        return total_tokens
 
-            # Add role tokens
-            tokens += self.count_text(message.get("role", ""))
 
-            # Add content tokens
-            if "content" in message:
-                tokens += self.count_content(message["content"])
+class ApproximateTokenCounter(TokenCounter):
+    """Token counter estimating text from a calibrated characters-per-token ratio.
 
-            # Add tool calls tokens
-            if "tool_calls" in message:
-                tokens += self.count_tool_calls(message["tool_calls"])
+    Message structure, tool calls and images are counted like `TokenCounter`;
+    only text is estimated, so no tokenizer has to be loaded. `calibrate`
+    adjusts the ratio whenever an exact count of the same prompt is known.
+    """
 
-            # Add name and tool_call_id tokens
-            tokens += self.count_text(message.get("name", ""))
-            tokens += self.count_text(message.get("tool_call_id", ""))
+    # Relative headroom kept when trusting an estimate against a limit
+    MARGIN = 0.15
+    # Weight of each calibration sample in the running ratio
+    CALIBRATION_WEIGHT = 0.3
 
-            total_tokens += tokens
+    def __init__(self, chars_per_token: float = 4.0):
+        super().__init__(tokenizer=None)
+        self.chars_per_token = chars_per_token
 
-        return total_tokens
+    def count_text(self, text: str) -> int:
+        return 0 if not text else math.ceil(len(text) / self.chars_per_token)
+
+    def calibrate(self, estimated: int, exact: int) -> None:
+        """Move the ratio toward the one that would have produced `exact`"""
+        if estimated <= 0 or exact <= 0:
+            return
+        observed = self.chars_per_token * estimated / exact
+        self.chars_per_token += self.CALIBRATION_WEIGHT * (
+            observed - self.chars_per_token
+        )
+        # Counts depend on the ratio, so cached ones are stale
+        self._ledger.clear()
+
+
+class ToolCallStream:
+    """Async iterator over the tool calls of a streaming tool completion.
+
+    Tool-call deltas are accumulated per index, and each call is yielded as
+    soon as its arguments form a complete JSON object, so callers can start
+    executing it while the model is still generating the rest. Once a call
+    to one of `stop_tool_names` is complete the upstream stream is closed.
+    The text content, full message and reported usage are available after
+    iteration, when `on_finish` is called with the stream.
+    """
+
+    def __init__(
+        self,
+        chunks: Optional[AsyncIterator[Any]] = None,
+        stop_tool_names: Iterable[str] = (),
+        message: Optional[ChatCompletionMessage] = None,
+        metrics: Optional[CallMetrics] = None,
+        on_finish: Optional[Callable[["ToolCallStream"], None]] = None,
+    ):
+        self._chunks = chunks
+        self.metrics = metrics
+        self.on_finish = on_finish
+        self.usage: Optional[CompletionUsage] = None
+        self.stop_tool_names = {name.lower() for name in stop_tool_names}
+        self.content = (message.content or "") if message else ""
+        self.tool_calls: List[ChatCompletionMessageToolCall] = list(
+            (message.tool_calls or []) if message else []
+        )
+        self.stopped_early = False
+        self._partial: Dict[int, dict] = {}
+
+    @classmethod
+    def from_message(cls, message: Optional[ChatCompletionMessage]) -> "ToolCallStream":
+        """Wrap an already complete message, for clients that cannot stream"""
+        return cls(message=message)
+
+    @property
+    def message(self) -> ChatCompletionMessage:
+        """The assistant message assembled from the stream"""
+        return ChatCompletionMessage(
+            role="assistant",
+            content=self.content or None,
+            tool_calls=self.tool_calls or None,
+        )
+
+    def _complete_calls(
+        self, final: bool = False
+    ) -> List[ChatCompletionMessageToolCall]:
+        """Pop calls whose arguments are complete, preserving call order"""
+        completed = []
+        while self._partial:
+            index = min(self._partial)
+            partial = self._partial[index]
+            if not final:
+                try:
+                    complete = isinstance(json.loads(partial["arguments"]), dict)
+                except json.JSONDecodeError:
+                    complete = False
+                if not complete:
+                    break
+            del self._partial[index]
+            completed.append(
+                ChatCompletionMessageToolCall(
+                    id=partial["id"],
+                    type="function",
+                    function=ToolCallFunction(
+                        name=partial["name"], arguments=partial["arguments"] or "{}"
+                    ),
+                )
+            )
+        return completed
+
+    async def __aiter__(self) -> AsyncIterator[ChatCompletionMessageToolCall]:
+        if self._chunks is None:
+            for tool_call in self.tool_calls:
+                yield tool_call
+            return
+
+        try:
+            async for chunk in self._chunks:
+                self.usage = getattr(chunk, "usage", None) or self.usage
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                if self.metrics and (delta.content or delta.tool_calls):
+                    self.metrics.mark_first_token()
+                if delta.content:
+                    self.content += delta.content
+                for tool_delta in delta.tool_calls or []:
+                    partial = self._partial.setdefault(
+                        tool_delta.index, {"id": "", "name": "", "arguments": ""}
+                    )
+                    if tool_delta.id:
+                        partial["id"] = tool_delta.id
+                    if tool_delta.function:
+                        partial["name"] += tool_delta.function.name or ""
+                        partial["arguments"] += tool_delta.function.arguments or ""
+
+                for tool_call in self._complete_calls():
+                    self.tool_calls.append(tool_call)
+                    if tool_call.function.name.lower() in self.stop_tool_names:
+                        self.stopped_early = True
+                    yield tool_call
+                    if self.stopped_early:
+                        return
+
+            for tool_call in self._complete_calls(final=True):
+                self.tool_calls.append(tool_call)
+                yield tool_call
+        finally:
+            close = getattr(self._chunks, "close", None)
+            if self.stopped_early and close:
+                await close()
+            if self.on_finish is not None:
+                on_finish, self.on_finish = self.on_finish, None
+                on_finish(self)
 
 
 class LLM:
@@ -187,8 +424,9 @@ class LLM:
         self, config_name: str = "default", llm_config: Optional[LLMSettings] = None
     ):
         if not hasattr(self, "client"):  # Only initialize if not already initialized
-            llm_config = llm_config or config.llm
-            llm_config = llm_config.get(config_name, llm_config["default"])
+            llm_configs = llm_config or config.llm
+            llm_config = llm_configs.get(config_name, llm_configs["default"])
+            self.config_name = config_name
             self.model = llm_config.model
             self.max_tokens = llm_config.max_tokens
             self.temperature = llm_config.temperature
@@ -196,8 +434,12 @@ class LLM:
             self.api_key = llm_config.api_key
             self.api_version = llm_config.api_version
             self.base_url = llm_config.base_url
+            self.coalesce_requests = llm_config.coalesce_requests
+            self.deterministic = llm_config.deterministic
+            self.stream_usage = llm_config.stream_usage
+            self.context_budget = llm_config.context_budget
 
-            # Add token counting related attributes
+            # Process-wide token counts; runs are accounted in a UsageLedger
             self.total_input_tokens = 0
             self.total_completion_tokens = 0
             self.max_input_tokens = (
@@ -206,25 +448,103 @@ class LLM:
                 else None
             )
 
-            # Initialize tokenizer
-            try:
-                self.tokenizer = tiktoken.encoding_for_model(self.model)
-            except KeyError:
-                # If the model is not in tiktoken's presets, use cl100k_base as default
-                self.tokenizer = tiktoken.get_encoding("cl100k_base")
-
-            if self.api_type == "azure":
-                self.client = AsyncAzureOpenAI(
-                    base_url=self.base_url,
-                    api_key=self.api_key,
-                    api_version=self.api_version,
-                )
-            elif self.api_type == "aws":
-                self.client = BedrockClient()
-            else:
-                self.client = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url)
+            # Shared tokenizer, loaded on first exact count
+            self.tokenizer = get_tokenizer(self.model)
+
+            self.client = self._create_client(llm_config)
 
             self.token_counter = TokenCounter(self.tokenizer)
+            # Optional estimator used for pre-flight counts far from the limit
+            self.estimator = (
+                ApproximateTokenCounter(llm_config.chars_per_token)
+                if llm_config.approximate_tokens
+                else None
+            )
+
+            # Optional on-disk response cache shared by all instances
+            self.response_cache = get_response_cache()
+            # Concurrent identical requests share one upstream call
+            self.singleflight = SingleFlight()
+            # Rate limits, retries and circuit breaking shared per provider
+            self.limiter = get_provider_limiter(llm_config)
+            # Optional latency-aware routing across equivalent endpoints
+            self.router = self._create_router(llm_configs, llm_config)
+
+    @staticmethod
+    def _create_client(settings: LLMSettings) -> Any:
+        """Create the API client for one provider endpoint"""
+        if settings.api_type == "azure":
+            return AsyncAzureOpenAI(
+                base_url=settings.base_url,
+                api_key=settings.api_key,
+                api_version=settings.api_version,
+                http_client=get_http_client(),
+                max_retries=0,  # Retries are handled by the provider limiter
+            )
+        if settings.api_type == "aws":
+            return BedrockClient()
+        return AsyncOpenAI(
+            api_key=settings.api_key,
+            base_url=settings.base_url,
+            http_client=get_http_client(),
+            max_retries=0,  # Retries are handled by the provider limiter
+        )
+
+    def _create_router(
+        self, llm_configs: Dict[str, LLMSettings], llm_config: LLMSettings
+    ) -> Optional[EndpointRouter]:
+        """Build an endpoint router when the config lists several endpoints"""
+        if not llm_config.endpoints:
+            return None
+
+        endpoints = []
+        for name in llm_config.endpoints:
+            settings = llm_configs.get(name)
+            if settings is None:
+                raise ValueError(f"Unknown LLM endpoint config: {name}")
+            if settings is llm_config:
+                client, limiter = self.client, self.limiter
+            else:
+                client = self._create_client(settings)
+                limiter = get_provider_limiter(settings)
+            endpoints.append(Endpoint(name, settings, client, limiter))
+        return EndpointRouter(
+            endpoints,
+            hedge_delay=llm_config.hedge_delay,
+            failover_retries=llm_config.failover_retries,
+        )
+
+    def endpoint_stats(self) -> Optional[Dict[str, Any]]:
+        """Health and latency of routed endpoints, or None without routing"""
+        return self.router.stats() if self.router else None
+
+    async def _send(self, params: dict, stream: bool, input_tokens: int = 0) -> Any:
+        """Send a completion request, through the active cassette if there is one"""
+        cassette = active_cassette()
+        if cassette is None:
+            return await self._send_upstream(params, stream, input_tokens)
+        if (metrics := current_call()) is not None:
+            metrics.endpoint = f"cassette:{cassette.mode}"
+        return await cassette.llm_request(
+            params,
+            stream,
+            lambda: self._send_upstream(params, stream, input_tokens),
+        )
+
+    async def _send_upstream(
+        self, params: dict, stream: bool, input_tokens: int = 0
+    ) -> Any:
+        """Send a completion request through the endpoint router or provider limiter"""
+        with span("llm.http", "http", stream=stream):
+            if self.router is not None:
+                return await self.router.request(params, stream, input_tokens)
+            metrics = current_call()
+            if metrics is not None:
+                metrics.endpoint = self.limiter.name
+            return await self.limiter.call(
+                lambda: self.client.chat.completions.create(**params, stream=stream),
+                tokens=input_tokens,
+            )
 
     def count_tokens(self, text: str) -> int:
         """Calculate the number of tokens in a text"""
@@ -235,35 +555,240 @@ class LLM:
     def count_message_tokens(self, messages: List[dict]) -> int:
         return self.token_counter.count_message_tokens(messages)
 
+    def count_input_tokens(self, messages: List[dict], tools_tokens: int = 0) -> int:
+        """Count the prompt tokens of a request for pre-flight checks
+
+        With `approximate_tokens` enabled the messages are only estimated,
+        unless the estimate comes within the estimator's margin of the input
+        token limit; then they are counted exactly and the estimator is
+        calibrated against the exact count.
+        """
+        if self.estimator is None:
+            return self.count_message_tokens(messages) + tools_tokens
+
+        estimate = self.estimator.count_message_tokens(messages)
+        allowance = self.input_allowance()
+        if allowance is None or (
+            allowance[0] + (estimate + tools_tokens) * (1 + self.estimator.MARGIN)
+            <= allowance[1]
+        ):
+            return estimate + tools_tokens
+
+        exact = self.count_message_tokens(messages)
+        self.estimator.calibrate(estimate, exact)
+        return exact + tools_tokens
+
+    def count_prompt_tokens(
+        self,
+        history_tokens: int,
+        system_msgs: Optional[List[Union[dict, Message]]] = None,
+        tools_tokens: int = 0,
+    ) -> int:
+        """Count the prompt tokens of a request from its history's running total
+
+        `history_tokens` is the sum of `count_message` over the conversation,
+        as kept by `Memory.token_count`, so only the system messages are
+        counted here.
+        """
+        counter = self.estimator or self.token_counter
+        system_tokens = sum(self.count_message(m) for m in system_msgs or [])
+        return counter.FORMAT_TOKENS + history_tokens + system_tokens + tools_tokens
+
+    def count_tool_tokens(self, tools: Optional[List[dict]]) -> int:
+        """Calculate the tokens taken by tool descriptions
+
+        Estimated when `approximate_tokens` is enabled.
+        """
+        counter = self.estimator or self.token_counter
+        return sum(counter.count_text(str(tool)) for tool in tools or [])
+
+    def count_message(self, message: Union[dict, Message]) -> int:
+        """Calculate the tokens a single message contributes to a prompt
+
+        Estimated when `approximate_tokens` is enabled.
+        """
+        supports_images = self.model in MULTIMODAL_MODELS
+        formatted = self.format_messages([message], supports_images)
+        counter = self.estimator or self.token_counter
+        return counter.count_message(formatted[0]) if formatted else 0
+
+    def input_allowance(self) -> Optional[tuple[int, int]]:
+        """Input tokens used and allowed under the tightest limit, None if unlimited
+
+        Within a UsageLedger the limits apply to the current run, otherwise
+        `max_input_tokens` applies to the process-wide count.
+        """
+        ledger = current_ledger()
+        if ledger is not None:
+            return ledger.allowance(self.config_name, self.max_input_tokens)
+        if self.max_input_tokens is None:
+            return None
+        return self.total_input_tokens, self.max_input_tokens
+
     def update_token_count(self, input_tokens: int, completion_tokens: int = 0) -> None:
         """Update token counts"""
-        # Only track tokens if max_input_tokens is set
         self.total_input_tokens += input_tokens
         self.total_completion_tokens += completion_tokens
+        budget = active_budget()
+        if budget is not None:
+            budget.charge_tokens(input_tokens + completion_tokens)
+        ledger = current_ledger()
+        if ledger is not None:
+            ledger.record(self.config_name, input_tokens, completion_tokens)
+            cumulative_input, cumulative_completion = (
+                ledger.input_tokens,
+                ledger.completion_tokens,
+            )
+        else:
+            cumulative_input, cumulative_completion = (
+                self.total_input_tokens,
+                self.total_completion_tokens,
+            )
         logger.info(
             f"Token usage: Input={input_tokens}, Completion={completion_tokens}, "
-            f"Cumulative Input={self.total_input_tokens}, Cumulative Completion={self.total_completion_tokens}, "
-            f"Total={input_tokens + completion_tokens}, Cumulative Total={self.total_input_tokens + self.total_completion_tokens}"
+            f"Cumulative Input={cumulative_input}, Cumulative Completion={cumulative_completion}, "
+            f"Total={input_tokens + completion_tokens}, Cumulative Total={cumulative_input + cumulative_completion}"
         )
 
     def check_token_limit(self, input_tokens: int) -> bool:
         """Check if token limits are exceeded"""
-        if self.max_input_tokens is not None:
-            return (self.total_input_tokens + input_tokens) <= self.max_input_tokens
-        # If max_input_tokens is not set, always return True
-        return True
+        allowance = self.input_allowance()
+        # Without a limit, always return True
+        return allowance is None or allowance[0] + input_tokens <= allowance[1]
 
     def get_limit_error_message(self, input_tokens: int) -> str:
         """Generate error message for token limit exceeded"""
-        if (
-            self.max_input_tokens is not None
-            and (self.total_input_tokens + input_tokens) > self.max_input_tokens
-        ):
-            return f"Request may exceed input token limit (Current: {self.total_input_tokens}, Needed: {input_tokens}, Max: {self.max_input_tokens})"
+        allowance = self.input_allowance()
+        if allowance is not None and allowance[0] + input_tokens > allowance[1]:
+            current, maximum = allowance
+            return f"Request may exceed input token limit (Current: {current}, Needed: {input_tokens}, Max: {maximum})"
 
         return "Token limit exceeded"
 
+    def _is_deterministic(self, params: dict) -> bool:
+        """Check whether identical requests can be expected to get identical answers"""
+        # Reasoning model requests carry no temperature but are still sampled
+        return self.deterministic or params.get("temperature") == 0
+
+    def _is_cacheable(self, params: dict) -> bool:
+        """Check whether a request may be served from the response cache"""
+        if self.response_cache is None:
+            return False
+        if config.llm_cache.deterministic_only:
+            return self._is_deterministic(params)
+        return True
+
+    async def _create_completion(
+        self, params: dict, input_tokens: int = 0
+    ) -> ChatCompletion:
+        """Send a non-streaming completion request, using the response cache if enabled"""
+        cacheable = self._is_cacheable(params)
+        # Sampled requests are meant to differ, so only deterministic ones share a call
+        coalesce = self.coalesce_requests and self._is_deterministic(params)
+        key = request_key(params) if cacheable or coalesce else None
+
+        if cacheable:
+            cached = await asyncio.to_thread(self.response_cache.get, key)
+            if cached is not None:
+                logger.info(f"LLM response cache hit: {key[:12]}")
+                if (metrics := current_call()) is not None:
+                    metrics.cached = True
+                return ChatCompletion.model_validate(cached)
+
+        async def fetch() -> ChatCompletion:
+            response = await self._send(params, stream=False, input_tokens=input_tokens)
+            if cacheable and isinstance(response, ChatCompletion):
+                await asyncio.to_thread(
+                    self.response_cache.put, key, response.model_dump(mode="json")
+                )
+            return response
+
+        if not coalesce:
+            return await fetch()
+
+        response, joined = await self.singleflight.do_shared(
+            key, fetch, copy=self._copy_response
+        )
+        if joined:
+            logger.debug(f"Coalesced LLM request into in-flight call: {key[:12]}")
+            if (metrics := current_call()) is not None:
+                metrics.coalesced = True
+        return response
+
+    async def _create_stream(self, params: dict, input_tokens: int = 0) -> Any:
+        """Open a streaming completion request through the provider limiter"""
+        if (metrics := current_call()) is not None:
+            metrics.stream = True
+        if self.stream_usage:
+            # Have the provider report usage in a final chunk
+            params = {**params, "stream_options": {"include_usage": True}}
+        return await self._send(params, stream=True, input_tokens=input_tokens)
+
+    def _charge_usage(self, usage: Any, completion: bool = True) -> None:
+        """Record the usage a non-streaming response reports
+
+        A response served from the cache, or shared from another caller's
+        identical request, cost this caller nothing upstream and is only
+        recorded in the call's metrics.
+        """
+        metrics = current_call()
+        if metrics is not None:
+            metrics.set_usage(usage)
+            if metrics.cached or metrics.coalesced:
+                return
+        self.update_token_count(
+            usage.prompt_tokens, usage.completion_tokens if completion else 0
+        )
+
+    def _finish_stream(
+        self,
+        metrics: Optional[CallMetrics],
+        usage: Any,
+        input_tokens: int,
+        completion_text: Optional[str] = None,
+    ) -> None:
+        """Record the token usage of a finished stream
+
+        Uses the usage reported by the provider, falling back to the input
+        estimate and a count of the completion text when none was sent. The
+        completion is only estimated when `approximate_tokens` is enabled.
+        """
+        if usage is not None:
+            self.update_token_count(usage.prompt_tokens, usage.completion_tokens)
+            if metrics is not None:
+                metrics.set_usage(usage)
+            return
+
+        completion_tokens = None
+        if completion_text is not None:
+            # estimate completion tokens for streaming response
+            counter = self.estimator or self.token_counter
+            completion_tokens = counter.count_text(completion_text)
+            logger.info(
+                f"Estimated completion tokens for streaming response: {completion_tokens}"
+            )
+        self.update_token_count(input_tokens, completion_tokens or 0)
+        if metrics is not None:
+            metrics.prompt_tokens = input_tokens
+            metrics.completion_tokens = completion_tokens
+
     @staticmethod
+    def _copy_response(response: Any) -> Any:
+        """Copy a shared response so coalesced callers do not share mutable state"""
+        if isinstance(response, ChatCompletion):
+            return response.model_copy(deep=True)
+        return response
+
+    def coalescing_stats(self) -> Dict[str, Any]:
+        """Metrics on requests coalesced into in-flight upstream calls"""
+        return self.singleflight.stats()
+
+    def call_stats(self) -> Dict[str, Any]:
+        """Latency percentiles and token totals of recent calls to this model"""
+        return get_telemetry().summary(model=self.model)
+
+    @staticmethod
+    @profiled("llm.format_messages", "llm")
     def format_messages(
         messages: List[Union[dict, Message]], supports_images: bool = False
     ) -> List[dict]:
@@ -292,58 +817,21 @@ class LLM:
         formatted_messages = []
 
         for message in messages:
-            # Convert Message objects to dictionaries
+            # Message objects cache their wire format across calls
             if isinstance(message, Message):
-                message = message.to_dict()
-
-            if isinstance(message, dict):
+                message = message.to_wire(supports_images)
+            elif isinstance(message, dict):
                 # If message is a dict, ensure it has required fields
                 if "role" not in message:
                     raise ValueError("Message dict must contain 'role' field")
-
-                # Process base64 images if present and model supports images
-                if supports_images and message.get("base64_image"):
-                    # Initialize or convert content to appropriate format
-                    if not message.get("content"):
-                        message["content"] = []
-                    elif isinstance(message["content"], str):
-                        message["content"] = [
-                            {"type": "text", "text": message["content"]}
-                        ]
-                    elif isinstance(message["content"], list):
-                        # Convert string items to proper text objects
-                        message["content"] = [
-                            (
-                                {"type": "text", "text": item}
-                                if isinstance(item, str)
-                                else item
-                            )
-                            for item in message["content"]
-                        ]
-
-                    # Add the image to content
-                    message["content"].append(
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/jpeg;base64,{message['base64_image']}"
-                            },
-                        }
-                    )
-
-                    # Remove the base64_image field
-                    del message["base64_image"]
-                # If model doesn't support images but message has base64_image, handle gracefully
-                elif not supports_images and message.get("base64_image"):
-                    # Just remove the base64_image field and keep the text content
-                    del message["base64_image"]
-
-                if "content" in message or "tool_calls" in message:
-                    formatted_messages.append(message)
-                # else: do not include the message
+                message = to_wire_format(message, supports_images)
             else:
                 raise TypeError(f"Unsupported message type: {type(message)}")
 
+            if "content" in message or "tool_calls" in message:
+                formatted_messages.append(message)
+            # else: do not include the message
+
         # Validate all messages have required fields
         for msg in formatted_messages:
             if msg["role"] not in ROLE_VALUES:
@@ -351,13 +839,64 @@ class LLM:
 
         return formatted_messages
 
-    @retry(
-        wait=wait_random_exponential(min=1, max=60),
-        stop=stop_after_attempt(6),
-        retry=retry_if_exception_type(
-            (OpenAIError, Exception, ValueError)
-        ),  # Don't retry TokenLimitExceeded
-    )
+    def _prepare_ask_request(
+        self,
+        messages: List[Union[dict, Message]],
+        system_msgs: Optional[List[Union[dict, Message]]],
+        temperature: Optional[float],
+    ) -> tuple[dict, int]:
+        """Format a plain completion request and build its parameters
+
+        Returns:
+            tuple: The completion parameters and the estimated input token count
+        """
+        # Check if the model supports images
+        supports_images = self.model in MULTIMODAL_MODELS
+
+        # Format system and user messages with image support check
+        if system_msgs:
+            system_msgs = self.format_messages(system_msgs, supports_images)
+            messages = system_msgs + self.format_messages(messages, supports_images)
+        else:
+            messages = self.format_messages(messages, supports_images)
+
+        # Calculate input token count
+        input_tokens = self.count_input_tokens(messages)
+
+        # Check if token limits are exceeded
+        if not self.check_token_limit(input_tokens):
+            error_message = self.get_limit_error_message(input_tokens)
+            # Raise a special exception that won't be retried
+            raise TokenLimitExceeded(error_message)
+
+        params = {
+            "model": self.model,
+            "messages": messages,
+        }
+
+        if self.model in REASONING_MODELS:
+            params["max_completion_tokens"] = self.max_tokens
+        else:
+            params["max_tokens"] = self.max_tokens
+            params["temperature"] = (
+                temperature if temperature is not None else self.temperature
+            )
+        return params, input_tokens
+
+    def _completion_content(self, response: ChatCompletion) -> str:
+        """Validate a non-streaming response, record its usage and return its text"""
+        if not response.choices or not response.choices[0].message.content:
+            raise ValueError("Empty or invalid response from LLM")
+
+        # Update token counts
+        if response.usage:
+            self._charge_usage(response.usage)
+
+        return response.choices[0].message.content
+
+    @budgeted
+    @tracked("ask")
+    @profiled("llm.ask", "llm")
     async def ask(
         self,
         messages: List[Union[dict, Message]],
@@ -384,79 +923,41 @@ class LLM:
             Exception: For unexpected errors
         """
         try:
-            # Check if the model supports images
-            supports_images = self.model in MULTIMODAL_MODELS
-
-            # Format system and user messages with image support check
-            if system_msgs:
-                system_msgs = self.format_messages(system_msgs, supports_images)
-                messages = system_msgs + self.format_messages(messages, supports_images)
-            else:
-                messages = self.format_messages(messages, supports_images)
-
-            # Calculate input token count
-            input_tokens = self.count_message_tokens(messages)
-
-            # Check if token limits are exceeded
-            if not self.check_token_limit(input_tokens):
-                error_message = self.get_limit_error_message(input_tokens)
-                # Raise a special exception that won't be retried
-                raise TokenLimitExceeded(error_message)
-
-            params = {
-                "model": self.model,
-                "messages": messages,
-            }
-
-            if self.model in REASONING_MODELS:
-                params["max_completion_tokens"] = self.max_tokens
-            else:
-                params["max_tokens"] = self.max_tokens
-                params["temperature"] = (
-                    temperature if temperature is not None else self.temperature
-                )
+            params, input_tokens = self._prepare_ask_request(
+                messages, system_msgs, temperature
+            )
 
-            if not stream:
+            # Cacheable requests are always sent non-streaming so they can be stored
+            if not stream or self._is_cacheable(params):
                 # Non-streaming request
-                response = await self.client.chat.completions.create(
-                    **params, stream=False
-                )
-
-                if not response.choices or not response.choices[0].message.content:
-                    raise ValueError("Empty or invalid response from LLM")
+                response = await self._create_completion(params, input_tokens)
+                return self._completion_content(response)
 
-                # Update token counts
-                self.update_token_count(
-                    response.usage.prompt_tokens, response.usage.completion_tokens
-                )
-
-                return response.choices[0].message.content
-
-            # Streaming request, For streaming, update estimated token count before making the request
-            self.update_token_count(input_tokens)
-
-            response = await self.client.chat.completions.create(**params, stream=True)
+            # Streaming request
+            metrics = current_call()
+            response = await self._create_stream(params, input_tokens)
 
             collected_messages = []
             completion_text = ""
+            usage = None
             async for chunk in response:
+                usage = getattr(chunk, "usage", None) or usage
+                if not chunk.choices:
+                    # The final usage chunk carries no choices
+                    continue
                 chunk_message = chunk.choices[0].delta.content or ""
+                if chunk_message:
+                    metrics.mark_first_token()
                 collected_messages.append(chunk_message)
                 completion_text += chunk_message
                 print(chunk_message, end="", flush=True)
 
             print()  # Newline after streaming
+            self._finish_stream(metrics, usage, input_tokens, completion_text)
             full_response = "".join(collected_messages).strip()
             if not full_response:
                 raise ValueError("Empty response from streaming LLM")
 
-            # estimate completion tokens for streaming response
-            completion_tokens = self.count_tokens(completion_text)
-            logger.info(
-                f"Estimated completion tokens for streaming response: {completion_tokens}"
-            )
-            self.total_completion_tokens += completion_tokens
-
             return full_response
 
         except TokenLimitExceeded:
@@ -470,7 +971,9 @@ class LLM:
             if isinstance(oe, AuthenticationError):
                 logger.error("Authentication failed. Check API key.")
             elif isinstance(oe, RateLimitError):
-                logger.error("Rate limit exceeded. Consider increasing retry attempts.")
+                logger.error(
+                    "Rate limit exceeded after retries. Consider lowering requests_per_minute."
+                )
             elif isinstance(oe, APIError):
                 logger.error(f"API error: {oe}")
             raise
@@ -478,13 +981,192 @@ class LLM:
             logger.exception(f"Unexpected error in ask")
             raise
 
-    @retry(
-        wait=wait_random_exponential(min=1, max=60),
-        stop=stop_after_attempt(6),
-        retry=retry_if_exception_type(
-            (OpenAIError, Exception, ValueError)
-        ),  # Don't retry TokenLimitExceeded
-    )
+    @staticmethod
+    def _batch_request(
+        request: Union[BatchRequest, List[Union[dict, Message]]]
+    ) -> BatchRequest:
+        if isinstance(request, BatchRequest):
+            return request
+        return BatchRequest(messages=request)
+
+    def _rate_limited_count(self) -> int:
+        """Total 429 responses seen by the providers this instance calls"""
+        if self.router is not None:
+            return sum(e.limiter.rate_limited for e in self.router.endpoints)
+        return self.limiter.rate_limited
+
+    async def ask_batch(
+        self,
+        requests: List[Union[BatchRequest, List[Union[dict, Message]]]],
+        max_concurrency: int = 8,
+        checkpoint_path: Optional[Union[str, Path]] = None,
+    ) -> List[BatchResult]:
+        """
+        Run many independent completion requests with adaptive concurrency.
+
+        The number of requests in flight starts at `max_concurrency` and is
+        halved whenever the provider rate limits or fails transiently, then
+        grows back as calls succeed. A failed request does not fail the batch.
+
+        Args:
+            requests: Batch requests, or bare message lists
+            max_concurrency: Upper bound on requests in flight
+            checkpoint_path: Optional JSONL file recording completed requests;
+                requests already recorded there are not sent again
+
+        Returns:
+            List[BatchResult]: One result per request, in input order
+        """
+        window = AdaptiveConcurrency(max_concurrency)
+        checkpoint = BatchCheckpoint(checkpoint_path) if checkpoint_path else None
+
+        async def run(index: int, request: BatchRequest) -> BatchResult:
+            try:
+                params, input_tokens = self._prepare_ask_request(
+                    request.messages, request.system_msgs, request.temperature
+                )
+            except Exception as e:
+                return BatchResult(index=index, error=f"{type(e).__name__}: {e}")
+
+            key = request_key(params)
+            if checkpoint and (content := checkpoint.get(key)) is not None:
+                return BatchResult(index=index, content=content, from_checkpoint=True)
+
+            await window.acquire()
+            rate_limited = self._rate_limited_count()
+            error = None
+            try:
+                # Tracked per request, so shared and cached responses are not charged
+                with get_telemetry().track("ask_batch", self.model):
+                    if not self.check_token_limit(input_tokens):
+                        raise TokenLimitExceeded(
+                            self.get_limit_error_message(input_tokens)
+                        )
+                    response = await self._create_completion(params, input_tokens)
+                    content = self._completion_content(response)
+            except Exception as e:
+                error = e
+            finally:
+                congested = self._rate_limited_count() > rate_limited or (
+                    error is not None
+                    and (
+                        isinstance(error, CircuitOpenError) or classify_error(error)[0]
+                    )
+                )
+                await window.release(congested)
+
+            if error is not None:
+                return BatchResult(
+                    index=index, error=f"{type(error).__name__}: {error}"
+                )
+            if checkpoint:
+                checkpoint.record(key, content)
+            return BatchResult(index=index, content=content)
+
+        results = await asyncio.gather(
+            *(run(i, self._batch_request(r)) for i, r in enumerate(requests))
+        )
+        failed = sum(not result.ok for result in results)
+        logger.info(
+            f"Batch of {len(results)} requests finished: {failed} failed, "
+            f"{window.congestion_events} congestion events, "
+            f"final concurrency {int(window.limit)}"
+        )
+        return list(results)
+
+    async def ask_batch_file(
+        self,
+        requests: List[Union[BatchRequest, List[Union[dict, Message]]]],
+        work_dir: Union[str, Path],
+        backend: Optional[BatchBackend] = None,
+        poll_interval: float = 30.0,
+    ) -> List[BatchResult]:
+        """
+        Submit requests as one JSONL batch file and wait for the provider to finish it.
+
+        The submitted batch id is recorded in `work_dir`, so calling again with
+        the same requests after a crash resumes the batch instead of resubmitting.
+
+        Args:
+            requests: Batch requests, or bare message lists
+            work_dir: Directory for the input, output and state files
+            backend: Batch provider; defaults to the OpenAI Batch API of this client
+            poll_interval: Seconds between batch status checks
+
+        Returns:
+            List[BatchResult]: One result per request, in input order
+        """
+        work_dir = Path(work_dir)
+        work_dir.mkdir(parents=True, exist_ok=True)
+        if backend is None:
+            if self.api_type == "aws":
+                raise ValueError("Bedrock has no batch file API; pass a backend")
+            backend = OpenAIBatchBackend(self.client)
+
+        results: Dict[int, BatchResult] = {}
+        bodies: Dict[str, dict] = {}
+        indices: Dict[str, int] = {}
+        for index, request in enumerate(map(self._batch_request, requests)):
+            try:
+                params, _ = self._prepare_ask_request(
+                    request.messages, request.system_msgs, request.temperature
+                )
+            except Exception as e:
+                results[index] = BatchResult(
+                    index=index, error=f"{type(e).__name__}: {e}"
+                )
+                continue
+            custom_id = f"request-{index}"
+            bodies[custom_id] = params
+            indices[custom_id] = index
+
+        keys = [request_key(body) for body in bodies.values()]
+        state_path = work_dir / "batch_state.json"
+        state = BatchJobState.load(state_path)
+        if state is None or state.keys != keys:
+            input_path = work_dir / "batch_input.jsonl"
+            write_batch_file(input_path, bodies)
+            state = BatchJobState(batch_id=await backend.submit(input_path), keys=keys)
+            state.save(state_path)
+            logger.info(f"Submitted batch {state.batch_id} with {len(bodies)} requests")
+        else:
+            logger.info(f"Resuming batch {state.batch_id}")
+
+        while (status := await backend.status(state.batch_id)) not in (
+            BATCH_FINAL_STATUSES
+        ):
+            await asyncio.sleep(poll_interval)
+
+        if status != "completed":
+            # Forget the batch so the next call submits it again
+            state_path.unlink(missing_ok=True)
+            for index in indices.values():
+                results[index] = BatchResult(index=index, error=f"Batch {status}")
+            return [results[i] for i in range(len(requests))]
+
+        output_path = work_dir / "batch_output.jsonl"
+        await backend.download(state.batch_id, output_path)
+        outputs = read_batch_output(output_path)
+        for custom_id, index in indices.items():
+            output = outputs.get(custom_id)
+            if output is None:
+                results[index] = BatchResult(
+                    index=index, error="Missing from batch output"
+                )
+            elif "error" in output:
+                results[index] = BatchResult(index=index, error=output["error"])
+            else:
+                try:
+                    response = ChatCompletion.model_validate(output["body"])
+                    content = self._completion_content(response)
+                    results[index] = BatchResult(index=index, content=content)
+                except ValueError as e:
+                    results[index] = BatchResult(index=index, error=str(e))
+        return [results[i] for i in range(len(requests))]
+
+    @budgeted
+    @tracked("ask_with_images")
+    @profiled("llm.ask_with_images", "llm")
     async def ask_with_images(
         self,
         messages: List[Union[dict, Message]],
@@ -529,15 +1211,17 @@ class LLM:
                     "The last message must be from the user to attach images"
                 )
 
-            # Process the last user message to include images
-            last_message = formatted_messages[-1]
+            # Process a copy of the last user message to include images, as
+            # formatted messages may be shared with the message's wire cache
+            last_message = dict(formatted_messages[-1])
+            formatted_messages[-1] = last_message
 
             # Convert content to multimodal format if needed
             content = last_message["content"]
             multimodal_content = (
                 [{"type": "text", "text": content}]
                 if isinstance(content, str)
-                else content
+                else list(content)
                 if isinstance(content, list)
                 else []
             )
@@ -568,7 +1252,7 @@ class LLM:
                 all_messages = formatted_messages
 
             # Calculate tokens and check limits
-            input_tokens = self.count_message_tokens(all_messages)
+            input_tokens = self.count_input_tokens(all_messages)
             if not self.check_token_limit(input_tokens):
                 raise TokenLimitExceeded(self.get_limit_error_message(input_tokens))
 
@@ -576,7 +1260,6 @@ class LLM:
             params = {
                 "model": self.model,
                 "messages": all_messages,
-                "stream": stream,
             }
 
             # Add model-specific parameters
@@ -589,26 +1272,33 @@ class LLM:
                 )
 
             # Handle non-streaming request
-            if not stream:
-                response = await self.client.chat.completions.create(**params)
+            if not stream or self._is_cacheable(params):
+                response = await self._create_completion(params, input_tokens)
 
                 if not response.choices or not response.choices[0].message.content:
                     raise ValueError("Empty or invalid response from LLM")
 
-                self.update_token_count(response.usage.prompt_tokens)
+                self._charge_usage(response.usage, completion=False)
                 return response.choices[0].message.content
 
             # Handle streaming request
-            self.update_token_count(input_tokens)
-            response = await self.client.chat.completions.create(**params)
+            metrics = current_call()
+            response = await self._create_stream(params, input_tokens)
 
             collected_messages = []
+            usage = None
             async for chunk in response:
+                usage = getattr(chunk, "usage", None) or usage
+                if not chunk.choices:
+                    continue
                 chunk_message = chunk.choices[0].delta.content or ""
+                if chunk_message:
+                    metrics.mark_first_token()
                 collected_messages.append(chunk_message)
                 print(chunk_message, end="", flush=True)
 
             print()  # Newline after streaming
+            self._finish_stream(metrics, usage, input_tokens)
             full_response = "".join(collected_messages).strip()
 
             if not full_response:
@@ -626,7 +1316,9 @@ class LLM:
             if isinstance(oe, AuthenticationError):
                 logger.error("Authentication failed. Check API key.")
             elif isinstance(oe, RateLimitError):
-                logger.error("Rate limit exceeded. Consider increasing retry attempts.")
+                logger.error(
+                    "Rate limit exceeded after retries. Consider lowering requests_per_minute."
+                )
             elif isinstance(oe, APIError):
                 logger.error(f"API error: {oe}")
             raise
@@ -634,13 +1326,81 @@ class LLM:
             logger.error(f"Unexpected error in ask_with_images: {e}")
             raise
 
-    @retry(
-        wait=wait_random_exponential(min=1, max=60),
-        stop=stop_after_attempt(6),
-        retry=retry_if_exception_type(
-            (OpenAIError, Exception, ValueError)
-        ),  # Don't retry TokenLimitExceeded
-    )
+    def _prepare_tool_request(
+        self,
+        messages: List[Union[dict, Message]],
+        system_msgs: Optional[List[Union[dict, Message]]],
+        timeout: int,
+        tools: Optional[List[dict]],
+        tool_choice: TOOL_CHOICE_TYPE,  # type: ignore
+        temperature: Optional[float],
+        tools_tokens: Optional[int] = None,
+        input_tokens: Optional[int] = None,
+        **kwargs,
+    ) -> tuple[dict, int]:
+        """Validate a tool request and build its completion parameters
+
+        Returns:
+            tuple: The completion parameters and the estimated input token count
+        """
+        # Validate tool_choice
+        if tool_choice not in TOOL_CHOICE_VALUES:
+            raise ValueError(f"Invalid tool_choice: {tool_choice}")
+
+        # Check if the model supports images
+        supports_images = self.model in MULTIMODAL_MODELS
+
+        # Format messages
+        if system_msgs:
+            system_msgs = self.format_messages(system_msgs, supports_images)
+            messages = system_msgs + self.format_messages(messages, supports_images)
+        else:
+            messages = self.format_messages(messages, supports_images)
+
+        # If there are tools, calculate token count for tool descriptions
+        if tools_tokens is None:
+            tools_tokens = self.count_tool_tokens(tools)
+
+        # Calculate input token count, unless the caller kept a running total.
+        # A request refused on that total is counted again before giving up.
+        if input_tokens is None or not self.check_token_limit(input_tokens):
+            input_tokens = self.count_input_tokens(messages, tools_tokens)
+
+        # Check if token limits are exceeded
+        if not self.check_token_limit(input_tokens):
+            error_message = self.get_limit_error_message(input_tokens)
+            # Raise a special exception that won't be retried
+            raise TokenLimitExceeded(error_message)
+
+        # Validate tools if provided
+        if tools:
+            for tool in tools:
+                if not isinstance(tool, dict) or "type" not in tool:
+                    raise ValueError("Each tool must be a dict with 'type' field")
+
+        # Set up the completion request
+        params = {
+            "model": self.model,
+            "messages": messages,
+            "tools": tools,
+            "tool_choice": tool_choice,
+            "timeout": timeout,
+            **kwargs,
+        }
+
+        if self.model in REASONING_MODELS:
+            params["max_completion_tokens"] = self.max_tokens
+        else:
+            params["max_tokens"] = self.max_tokens
+            params["temperature"] = (
+                temperature if temperature is not None else self.temperature
+            )
+
+        return params, input_tokens
+
+    @budgeted
+    @tracked("ask_tool")
+    @profiled("llm.ask_tool", "llm")
     async def ask_tool(
         self,
         messages: List[Union[dict, Message]],
@@ -649,6 +1409,8 @@ class LLM:
         tools: Optional[List[dict]] = None,
         tool_choice: TOOL_CHOICE_TYPE = ToolChoice.AUTO,  # type: ignore
         temperature: Optional[float] = None,
+        tools_tokens: Optional[int] = None,
+        input_tokens: Optional[int] = None,
         **kwargs,
     ) -> ChatCompletionMessage | None:
         """
@@ -661,6 +1423,8 @@ class LLM:
             tools: List of tools to use
             tool_choice: Tool choice strategy
             temperature: Sampling temperature for the response
+            tools_tokens: Precomputed token cost of `tools`, see ToolCollection.params_tokens
+            input_tokens: Precomputed prompt token count, see count_prompt_tokens
             **kwargs: Additional completion arguments
 
         Returns:
@@ -673,64 +1437,21 @@ class LLM:
             Exception: For unexpected errors
         """
         try:
-            # Validate tool_choice
-            if tool_choice not in TOOL_CHOICE_VALUES:
-                raise ValueError(f"Invalid tool_choice: {tool_choice}")
-
-            # Check if the model supports images
-            supports_images = self.model in MULTIMODAL_MODELS
-
-            # Format messages
-            if system_msgs:
-                system_msgs = self.format_messages(system_msgs, supports_images)
-                messages = system_msgs + self.format_messages(messages, supports_images)
-            else:
-                messages = self.format_messages(messages, supports_images)
-
-            # Calculate input token count
-            input_tokens = self.count_message_tokens(messages)
-
-            # If there are tools, calculate token count for tool descriptions
-            tools_tokens = 0
-            if tools:
-                for tool in tools:
-                    tools_tokens += self.count_tokens(str(tool))
-
-            input_tokens += tools_tokens
-
-            # Check if token limits are exceeded
-            if not self.check_token_limit(input_tokens):
-                error_message = self.get_limit_error_message(input_tokens)
-                # Raise a special exception that won't be retried
-                raise TokenLimitExceeded(error_message)
-
-            # Validate tools if provided
-            if tools:
-                for tool in tools:
-                    if not isinstance(tool, dict) or "type" not in tool:
-                        raise ValueError("Each tool must be a dict with 'type' field")
-
-            # Set up the completion request
-            params = {
-                "model": self.model,
-                "messages": messages,
-                "tools": tools,
-                "tool_choice": tool_choice,
-                "timeout": timeout,
+            params, input_tokens = self._prepare_tool_request(
+                messages,
+                system_msgs,
+                timeout,
+                tools,
+                tool_choice,
+                temperature,
+                tools_tokens,
+                input_tokens,
                 **kwargs,
-            }
-
-            if self.model in REASONING_MODELS:
-                params["max_completion_tokens"] = self.max_tokens
-            else:
-                params["max_tokens"] = self.max_tokens
-                params["temperature"] = (
-                    temperature if temperature is not None else self.temperature
-                )
+            )
 
-            params["stream"] = False  # Always use non-streaming for tool requests
-            response: ChatCompletion = await self.client.chat.completions.create(
-                **params
+            # Always use non-streaming for tool requests
+            response: ChatCompletion = await self._create_completion(
+                params, input_tokens
             )
 
             # Check if response is valid
@@ -740,9 +1461,7 @@ class LLM:
                 return None
 
             # Update token counts
-            self.update_token_count(
-                response.usage.prompt_tokens, response.usage.completion_tokens
-            )
+            self._charge_usage(response.usage)
 
             return response.choices[0].message
 
@@ -757,10 +1476,109 @@ class LLM:
             if isinstance(oe, AuthenticationError):
                 logger.error("Authentication failed. Check API key.")
             elif isinstance(oe, RateLimitError):
-                logger.error("Rate limit exceeded. Consider increasing retry attempts.")
+                logger.error(
+                    "Rate limit exceeded after retries. Consider lowering requests_per_minute."
+                )
             elif isinstance(oe, APIError):
                 logger.error(f"API error: {oe}")
             raise
         except Exception as e:
             logger.error(f"Unexpected error in ask_tool: {e}")
             raise
+
+    @budgeted
+    @tracked("ask_tool_stream")
+    @profiled("llm.ask_tool_stream", "llm")
+    async def ask_tool_stream(
+        self,
+        messages: List[Union[dict, Message]],
+        system_msgs: Optional[List[Union[dict, Message]]] = None,
+        timeout: int = 300,
+        tools: Optional[List[dict]] = None,
+        tool_choice: TOOL_CHOICE_TYPE = ToolChoice.AUTO,  # type: ignore
+        temperature: Optional[float] = None,
+        tools_tokens: Optional[int] = None,
+        input_tokens: Optional[int] = None,
+        stop_tool_names: Iterable[str] = ("terminate",),
+        **kwargs,
+    ) -> ToolCallStream:
+        """
+        Ask LLM using functions/tools and stream the tool calls back.
+
+        Args:
+            messages: List of conversation messages
+            system_msgs: Optional system messages to prepend
+            timeout: Request timeout in seconds
+            tools: List of tools to use
+            tool_choice: Tool choice strategy
+            temperature: Sampling temperature for the response
+            tools_tokens: Precomputed token cost of `tools`, see ToolCollection.params_tokens
+            input_tokens: Precomputed prompt token count, see count_prompt_tokens
+            stop_tool_names: Tool names after which the stream is closed early
+            **kwargs: Additional completion arguments
+
+        Returns:
+            ToolCallStream: Async iterator yielding each complete tool call
+
+        Raises:
+            TokenLimitExceeded: If token limits are exceeded
+            ValueError: If tools, tool_choice, or messages are invalid
+            OpenAIError: If API call fails after retries
+        """
+        try:
+            params, input_tokens = self._prepare_tool_request(
+                messages,
+                system_msgs,
+                timeout,
+                tools,
+                tool_choice,
+                temperature,
+                tools_tokens,
+                input_tokens,
+                **kwargs,
+            )
+
+            # Cacheable requests are answered in one piece
+            if self._is_cacheable(params):
+                response = await self._create_completion(params, input_tokens)
+                if not response.choices or not response.choices[0].message:
+                    return ToolCallStream.from_message(None)
+                self._charge_usage(response.usage)
+                return ToolCallStream.from_message(response.choices[0].message)
+
+            metrics = current_call()
+            response = await self._create_stream(params, input_tokens)
+
+            def finish(stream: ToolCallStream) -> None:
+                self._finish_stream(metrics, stream.usage, input_tokens)
+                get_telemetry().record(metrics)
+
+            # The call is recorded once the caller has consumed the stream
+            metrics.defer()
+            return ToolCallStream(
+                response,
+                stop_tool_names=stop_tool_names,
+                metrics=metrics,
+                on_finish=finish,
+            )
+
+        except TokenLimitExceeded:
+            # Re-raise token limit errors without logging
+            raise
+        except ValueError as ve:
+            logger.error(f"Validation error in ask_tool_stream: {ve}")
+            raise
+        except OpenAIError as oe:
+            logger.error(f"OpenAI API error: {oe}")
+            if isinstance(oe, AuthenticationError):
+                logger.error("Authentication failed. Check API key.")
+            elif isinstance(oe, RateLimitError):
+                logger.error(
+                    "Rate limit exceeded after retries. Consider lowering requests_per_minute."
+                )
+            elif isinstance(oe, APIError):
+                logger.error(f"API error: {oe}")
+            raise
+        except Exception as e:
+            logger.error(f"Unexpected error in ask_tool_stream: {e}")
+            raise
@@ -0,0 +1,261 @@
+"""Bulk LLM completions: adaptive concurrency, checkpoints and JSONL batch files."""
+import asyncio
+import json
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+
+from openai.types.chat import ChatCompletion
+from pydantic import BaseModel, Field
+
+from app.logger import logger
+from app.schema import Message
+
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+# Batch statuses after which no further progress will be made
+BATCH_FINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+class BatchRequest(BaseModel):
+    """One independent completion request of a batch"""
+
+    messages: List[Union[dict, Message]]
+    system_msgs: Optional[List[Union[dict, Message]]] = None
+    temperature: Optional[float] = None
+
+
+class BatchResult(BaseModel):
+    """Outcome of one batch request, in input order"""
+
+    index: int
+    content: Optional[str] = None
+    error: Optional[str] = None
+    from_checkpoint: bool = Field(False, description="Loaded from a previous run")
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class AdaptiveConcurrency:
+    """Concurrency window with additive increase and multiplicative decrease.
+
+    The window grows by one slot per window of successful calls and halves on
+    every congestion signal (rate limiting or transient provider errors).
+    """
+
+    def __init__(self, max_concurrency: int, min_concurrency: int = 1):
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self.congestion_events = 0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self) -> None:
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self, congested: bool = False) -> None:
+        async with self._condition:
+            self.in_flight -= 1
+            if congested:
+                self.congestion_events += 1
+                self.limit = max(self.min_concurrency, self.limit / 2)
+            else:
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+
+class BatchCheckpoint:
+    """Append-only JSONL record of completed requests, keyed by request hash.
+
+    Each completed request is flushed as one line, so a crashed run loses at
+    most the requests that were in flight.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.completed: Dict[str, str] = {}
+        if self.path.exists():
+            with self.path.open(encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A line truncated by a crash mid-write
+                        continue
+                    self.completed[record["key"]] = record["content"]
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def get(self, key: str) -> Optional[str]:
+        return self.completed.get(key)
+
+    def record(self, key: str, content: str) -> None:
+        self.completed[key] = content
+        with self.path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps({"key": key, "content": content}) + "\n")
+            f.flush()
+
+
+def write_batch_file(path: Path, bodies: Dict[str, dict]) -> None:
+    """Write completion bodies as a JSONL batch input file keyed by custom_id"""
+    with path.open("w", encoding="utf-8") as f:
+        for custom_id, body in bodies.items():
+            line = {
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": BATCH_ENDPOINT,
+                "body": body,
+            }
+            f.write(json.dumps(line, ensure_ascii=False) + "\n")
+
+
+def read_batch_output(path: Path) -> Dict[str, Dict[str, Any]]:
+    """Read a JSONL batch output file into {custom_id: {"body"|"error": ...}}"""
+    results = {}
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            response = record.get("response") or {}
+            if record.get("error") or response.get("status_code", 200) >= 400:
+                error = record.get("error") or response.get("body", {}).get("error")
+                results[record["custom_id"]] = {"error": str(error)}
+            else:
+                results[record["custom_id"]] = {"body": response["body"]}
+    return results
+
+
+class BatchBackend(ABC):
+    """A provider that accepts JSONL batch submissions"""
+
+    @abstractmethod
+    async def submit(self, input_path: Path) -> str:
+        """Submit a batch input file and return the batch id"""
+
+    @abstractmethod
+    async def status(self, batch_id: str) -> str:
+        """Return the current status of a batch"""
+
+    @abstractmethod
+    async def download(self, batch_id: str, output_path: Path) -> None:
+        """Write the JSONL output of a finished batch to output_path"""
+
+
+class OpenAIBatchBackend(BatchBackend):
+    """OpenAI / Azure OpenAI Batch API"""
+
+    def __init__(self, client: Any, completion_window: str = "24h"):
+        self.client = client
+        self.completion_window = completion_window
+
+    async def submit(self, input_path: Path) -> str:
+        with input_path.open("rb") as f:
+            uploaded = await self.client.files.create(file=f, purpose="batch")
+        batch = await self.client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window=self.completion_window,
+        )
+        return batch.id
+
+    async def status(self, batch_id: str) -> str:
+        batch = await self.client.batches.retrieve(batch_id)
+        return batch.status
+
+    async def download(self, batch_id: str, output_path: Path) -> None:
+        batch = await self.client.batches.retrieve(batch_id)
+        with output_path.open("wb") as f:
+            for file_id in (batch.output_file_id, batch.error_file_id):
+                if file_id:
+                    content = await self.client.files.content(file_id)
+                    f.write(content.content)
+
+
+class LocalBatchBackend(BatchBackend):
+    """Process batch files locally, for providers without a batch API and tests.
+
+    Each body is sent through `complete`, and results are written next to the
+    input file in the provider's output format.
+    """
+
+    def __init__(
+        self,
+        complete: Callable[[dict], Awaitable[ChatCompletion]],
+        concurrency: int = 8,
+    ):
+        self.complete = complete
+        self.concurrency = concurrency
+        self._jobs: Dict[str, asyncio.Task] = {}
+
+    @staticmethod
+    def _output_path(batch_id: str) -> Path:
+        return Path(batch_id).with_suffix(".local_output.jsonl")
+
+    async def submit(self, input_path: Path) -> str:
+        batch_id = str(input_path)
+        self._jobs[batch_id] = asyncio.create_task(self._run(input_path))
+        return batch_id
+
+    async def _run(self, input_path: Path) -> None:
+        semaphore = asyncio.Semaphore(self.concurrency)
+        lines = [json.loads(line) for line in input_path.open(encoding="utf-8")]
+
+        async def process(line: dict) -> dict:
+            async with semaphore:
+                try:
+                    response = await self.complete(line["body"])
+                except Exception as e:
+                    return {
+                        "custom_id": line["custom_id"],
+                        "response": None,
+                        "error": {"message": f"{type(e).__name__}: {e}"},
+                    }
+            return {
+                "custom_id": line["custom_id"],
+                "response": {
+                    "status_code": 200,
+                    "body": response.model_dump(mode="json"),
+                },
+                "error": None,
+            }
+
+        records = await asyncio.gather(*(process(line) for line in lines))
+        with self._output_path(str(input_path)).open("w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    async def status(self, batch_id: str) -> str:
+        job = self._jobs.get(batch_id)
+        if job is None:
+            return "completed" if self._output_path(batch_id).exists() else "expired"
+        if not job.done():
+            return "in_progress"
+        return "failed" if job.exception() else "completed"
+
+    async def download(self, batch_id: str, output_path: Path) -> None:
+        output_path.write_bytes(self._output_path(batch_id).read_bytes())
+
+
+class BatchJobState(BaseModel):
+    """Submitted batch recorded in the work directory so a restart can resume it"""
+
+    batch_id: str
+    keys: List[str]
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["BatchJobState"]:
+        if not path.exists():
+            return None
+        try:
+            return cls.model_validate_json(path.read_text(encoding="utf-8"))
+        except ValueError:
+            logger.warning(f"Ignoring unreadable batch state file {path}")
+            return None
+
+    def save(self, path: Path) -> None:
+        path.write_text(self.model_dump_json(), encoding="utf-8")
@@ -0,0 +1,158 @@
+"""Content-addressed, disk-backed cache for LLM completion responses."""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from app.config import PROJECT_ROOT, LLMCacheSettings, config
+from app.logger import logger
+
+
+# Request parameters that do not influence the completion content
+_NON_SEMANTIC_PARAMS = ("timeout", "stream", "stream_options")
+
+
+def request_key(params: Dict[str, Any]) -> str:
+    """Canonical hash of a completion request"""
+    request = {k: v for k, v in params.items() if k not in _NON_SEMANTIC_PARAMS}
+    canonical = json.dumps(
+        request, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed store of completion responses keyed by request hash.
+
+    Entries are evicted in least-recently-used order once the stored payloads
+    exceed the configured size. All methods are thread-safe so they can be
+    offloaded from the event loop with `asyncio.to_thread`.
+    """
+
+    def __init__(self, path: Path, max_size_bytes: int):
+        self.path = Path(path)
+        self.max_size_bytes = max_size_bytes
+        self.hits = 0
+        self.misses = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, payload TEXT NOT NULL, "
+            "size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_last_access ON responses (last_access)"
+        )
+        self._conn.commit()
+
+    @classmethod
+    def from_settings(cls, settings: LLMCacheSettings) -> "ResponseCache":
+        path = Path(settings.path)
+        if not path.is_absolute():
+            path = PROJECT_ROOT / path
+        return cls(path, int(settings.max_size_mb * 1024 * 1024))
+
+    @staticmethod
+    def make_key(params: Dict[str, Any]) -> str:
+        """Canonical hash of a completion request"""
+        return request_key(params)
+
+    def get(self, key: str) -> Optional[dict]:
+        """Return the cached response for a key, or None on a miss"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE responses SET last_access = ? WHERE key = ?",
+                (time.time(), key),
+            )
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, response: dict) -> None:
+        """Store a response and evict old entries beyond the size limit"""
+        payload = json.dumps(response, separators=(",", ":"), ensure_ascii=False)
+        size = len(payload.encode("utf-8"))
+        if size > self.max_size_bytes:
+            logger.debug(f"Response of {size} bytes exceeds cache size, not cached")
+            return
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, payload, size, last_access) "
+                "VALUES (?, ?, ?, ?)",
+                (key, payload, size, time.time()),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until the cache fits its size limit"""
+        (total,) = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        if total <= self.max_size_bytes:
+            return
+
+        rows = self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY last_access ASC"
+        ).fetchall()
+        evicted = []
+        for key, size in rows:
+            if total <= self.max_size_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+        logger.debug(f"Evicted {len(evicted)} entries from LLM response cache")
+
+    def stats(self) -> Dict[str, Any]:
+        """Entry count, stored bytes, and hit/miss counters"""
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        return {
+            "entries": entries,
+            "size_bytes": size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def clear(self) -> None:
+        """Remove all cached responses"""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_response_cache: Optional[ResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Process-wide response cache, or None when caching is disabled"""
+    global _response_cache
+    settings = config.llm_cache
+    if not settings or not settings.enabled:
+        return None
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = ResponseCache.from_settings(settings)
+    return _response_cache
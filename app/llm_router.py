@@ -0,0 +1,220 @@
+"""Latency-aware routing of LLM calls across endpoints serving the same model."""
+import asyncio
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from app.config import LLMSettings
+from app.exceptions import CircuitOpenError
+from app.llm_telemetry import current_call
+from app.logger import logger
+from app.rate_limit import ProviderLimiter, classify_error
+
+
+class Endpoint:
+    """One provider endpoint with its client, limiter and recent latencies."""
+
+    WINDOW = 50
+
+    def __init__(
+        self, name: str, settings: LLMSettings, client: Any, limiter: ProviderLimiter
+    ):
+        self.name = name
+        self.settings = settings
+        self.client = client
+        self.limiter = limiter
+        self.latencies: deque = deque(maxlen=self.WINDOW)
+        self.successes = 0
+        self.failures = 0
+        self.in_flight = 0
+        self.hedges_won = 0
+        self.hedges_lost = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def healthy(self) -> bool:
+        """Whether the circuit lets calls through, an open one once it may recover"""
+        return self.limiter.breaker.available()
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Latency percentile over the recent window, or None without samples"""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def score(self) -> float:
+        """Expected latency; endpoints without samples score 0 so they get tried"""
+        if not self.latencies:
+            return 0.0
+        return (self.percentile(0.5) + self.percentile(0.95)) / 2
+
+    async def request(
+        self,
+        params: dict,
+        stream: bool,
+        tokens: int = 0,
+        max_retries: Optional[int] = None,
+    ) -> Any:
+        """Send a completion request with this endpoint's model and limiter"""
+        params = {**params, "model": self.settings.model}
+        self.in_flight += 1
+        start = time.monotonic()
+        try:
+            result = await self.limiter.call(
+                lambda: self.client.chat.completions.create(**params, stream=stream),
+                tokens=tokens,
+                max_retries=max_retries,
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.failures += 1
+            self.last_error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self.in_flight -= 1
+        self.latencies.append(time.monotonic() - start)
+        self.successes += 1
+        # Only the winner of a hedged race gets this far
+        metrics = current_call()
+        if metrics is not None:
+            metrics.endpoint = self.name
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        p50, p95 = self.percentile(0.5), self.percentile(0.95)
+        return {
+            "name": self.name,
+            "base_url": self.settings.base_url,
+            "model": self.settings.model,
+            "healthy": self.healthy,
+            "circuit": self.limiter.breaker.state,
+            "p50": round(p50, 3) if p50 is not None else None,
+            "p95": round(p95, 3) if p95 is not None else None,
+            "samples": len(self.latencies),
+            "successes": self.successes,
+            "failures": self.failures,
+            "in_flight": self.in_flight,
+            "hedges_won": self.hedges_won,
+            "hedges_lost": self.hedges_lost,
+            "last_error": self.last_error,
+        }
+
+
+class EndpointRouter:
+    """Route each call to the endpoint with the best recent latency.
+
+    Healthy endpoints are ranked by the mean of their recent p50 and p95
+    latency. With `hedge_delay` set, a call still pending after that delay is
+    duplicated on the next best endpoint; the first response wins and the
+    other request is cancelled. Calls that fail with a retryable error or an
+    open circuit fail over to the next endpoint, after at most
+    `failover_retries` retries on each endpoint but the last.
+    """
+
+    def __init__(
+        self,
+        endpoints: List[Endpoint],
+        hedge_delay: Optional[float] = None,
+        failover_retries: int = 1,
+    ):
+        if not endpoints:
+            raise ValueError("EndpointRouter requires at least one endpoint")
+        self.endpoints = endpoints
+        self.hedge_delay = hedge_delay
+        self.failover_retries = failover_retries
+        self.hedged = 0
+
+    def ranked(self) -> List[Endpoint]:
+        """Endpoints ordered from best to worst: healthy first, then by latency"""
+        return sorted(self.endpoints, key=lambda e: (not e.healthy, e.score()))
+
+    async def request(self, params: dict, stream: bool = False, tokens: int = 0) -> Any:
+        """Send a completion request to the best endpoint, hedging and failing over"""
+        candidates = self.ranked()
+        last_error: Optional[BaseException] = None
+        while candidates:
+            primary = candidates.pop(0)
+            # The last endpoint left retries as its limiter would on its own
+            retries = self.failover_retries if candidates else None
+            try:
+                if self.hedge_delay is None or not candidates:
+                    return await primary.request(params, stream, tokens, retries)
+                return await self._hedged(primary, candidates, params, stream, tokens)
+            except Exception as e:
+                if not isinstance(e, CircuitOpenError) and not classify_error(e)[0]:
+                    raise
+                last_error = e
+                if candidates:
+                    logger.warning(
+                        f"LLM endpoint {primary.name} failed ({type(e).__name__}), "
+                        f"failing over to {candidates[0].name}"
+                    )
+        raise last_error
+
+    async def _hedged(
+        self,
+        primary: Endpoint,
+        candidates: List[Endpoint],
+        params: dict,
+        stream: bool,
+        tokens: int,
+    ) -> Any:
+        """Race the primary against a delayed duplicate on the next best endpoint"""
+        first = asyncio.ensure_future(
+            primary.request(params, stream, tokens, self.failover_retries)
+        )
+        racers = {first: primary}
+        pending = {first}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=self.hedge_delay)
+            if done:
+                return first.result()
+
+            backup = candidates.pop(0)
+            self.hedged += 1
+            logger.debug(
+                f"LLM endpoint {primary.name} slower than {self.hedge_delay}s, "
+                f"hedging on {backup.name}"
+            )
+            second = asyncio.ensure_future(
+                backup.request(params, stream, tokens, self.failover_retries)
+            )
+            racers[second] = backup
+            pending.add(second)
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        racers[task].hedges_won += 1
+                        for other, endpoint in racers.items():
+                            if other is not task:
+                                endpoint.hedges_lost += 1
+                        return task.result()
+            # Both requests failed; surface the primary's error for failover
+            raise first.exception()
+        finally:
+            await self._discard(pending)
+
+    @staticmethod
+    async def _discard(tasks) -> None:
+        """Cancel losing requests and close any stream they already opened"""
+        for task in tasks:
+            task.cancel()
+        for result in await asyncio.gather(*tasks, return_exceptions=True):
+            close = getattr(result, "close", None)
+            if not isinstance(result, BaseException) and close is not None:
+                outcome = close()
+                if asyncio.iscoroutine(outcome):
+                    await outcome
+
+    def stats(self) -> Dict[str, Any]:
+        """Health and latency of every endpoint, best first"""
+        return {
+            "hedge_delay": self.hedge_delay,
+            "hedged_requests": self.hedged,
+            "endpoints": [endpoint.stats() for endpoint in self.ranked()],
+        }
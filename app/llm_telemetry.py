@@ -0,0 +1,249 @@
+"""Per-call LLM latency, throughput and token metrics."""
+import functools
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+from pydantic import BaseModel, Field, PrivateAttr, computed_field
+
+from app.config import PROJECT_ROOT, TelemetrySettings, config
+from app.logger import logger
+
+
+class CallMetrics(BaseModel):
+    """Timings and token counts of one LLM call, as seen by the caller"""
+
+    method: str
+    model: str
+    stream: bool = False
+    endpoint: Optional[str] = None
+    cached: bool = Field(False, description="Served from the response cache")
+    coalesced: bool = Field(False, description="Joined an identical in-flight call")
+    started_at: float = Field(default_factory=time.time)
+    queue_wait: float = Field(0.0, description="Seconds spent waiting on rate limits")
+    time_to_first_token: Optional[float] = None
+    latency: Optional[float] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    usage_reported: bool = Field(
+        False, description="Token counts come from the provider, not estimates"
+    )
+    retries: int = 0
+    error: Optional[str] = None
+
+    _start: float = PrivateAttr(default_factory=time.monotonic)
+    _deferred: bool = PrivateAttr(default=False)
+
+    @computed_field
+    @property
+    def tokens_per_second(self) -> Optional[float]:
+        """Completion tokens per second of generation, after the first token"""
+        if not self.completion_tokens or self.latency is None:
+            return None
+        duration = self.latency - (self.time_to_first_token or 0.0)
+        return self.completion_tokens / duration if duration > 0 else None
+
+    def mark_first_token(self) -> None:
+        if self.time_to_first_token is None:
+            self.time_to_first_token = time.monotonic() - self._start
+
+    def set_usage(self, usage: Any) -> None:
+        """Take token counts from a provider usage object"""
+        self.prompt_tokens = usage.prompt_tokens
+        self.completion_tokens = usage.completion_tokens
+        self.usage_reported = True
+
+    def defer(self) -> None:
+        """Keep the call open past `Telemetry.track`, to be recorded explicitly later"""
+        self._deferred = True
+
+    def finish(self) -> None:
+        if self.latency is None:
+            self.latency = time.monotonic() - self._start
+
+
+_current_call: ContextVar[Optional[CallMetrics]] = ContextVar(
+    "llm_call_metrics", default=None
+)
+
+
+def current_call() -> Optional[CallMetrics]:
+    """Metrics of the LLM call running in this context, if any"""
+    return _current_call.get()
+
+
+class TelemetryExporter(ABC):
+    """Destination for finished call metrics"""
+
+    @abstractmethod
+    def export(self, metrics: CallMetrics) -> None:
+        """Handle one finished call; must not block for long"""
+
+
+class LogExporter(TelemetryExporter):
+    """Log one line per call"""
+
+    def __init__(self, level: str = "DEBUG"):
+        self.level = level
+
+    def export(self, metrics: CallMetrics) -> None:
+        ttft = metrics.time_to_first_token
+        logger.log(
+            self.level,
+            f"LLM {metrics.method} [{metrics.endpoint or metrics.model}] "
+            f"{metrics.latency:.2f}s (wait {metrics.queue_wait:.2f}s"
+            f"{f', ttft {ttft:.2f}s' if ttft is not None else ''}), "
+            f"tokens {metrics.prompt_tokens}/{metrics.completion_tokens}, "
+            f"retries {metrics.retries}"
+            f"{f', error {metrics.error}' if metrics.error else ''}",
+        )
+
+
+class JSONLExporter(TelemetryExporter):
+    """Append each call as a JSON line to a file"""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def export(self, metrics: CallMetrics) -> None:
+        line = metrics.model_dump_json()
+        with self._lock, self.path.open("a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+def percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    """Nearest-rank p50, p95 and p99 of the given values"""
+    if not values:
+        return {"p50": None, "p95": None, "p99": None}
+    ordered = sorted(values)
+    return {
+        f"p{int(q * 100)}": round(
+            ordered[min(len(ordered) - 1, int(q * len(ordered)))], 4
+        )
+        for q in (0.5, 0.95, 0.99)
+    }
+
+
+class Telemetry:
+    """Ring buffer of recent LLM call metrics with pluggable exporters.
+
+    Calls are recorded through `track`, which makes the call's metrics
+    available to the rate limiter and router via `current_call` so queue
+    wait, retries and the endpoint used are attributed to the right call.
+    """
+
+    def __init__(
+        self,
+        buffer_size: int = 1000,
+        exporters: Optional[List[TelemetryExporter]] = None,
+        enabled: bool = True,
+    ):
+        self.enabled = enabled
+        self.calls: deque = deque(maxlen=buffer_size)
+        self.exporters: List[TelemetryExporter] = list(exporters or [])
+
+    @classmethod
+    def from_settings(cls, settings: TelemetrySettings) -> "Telemetry":
+        exporters: List[TelemetryExporter] = []
+        if settings.log_calls:
+            exporters.append(LogExporter("INFO"))
+        if settings.export_path:
+            path = Path(settings.export_path)
+            if not path.is_absolute():
+                path = PROJECT_ROOT / path
+            exporters.append(JSONLExporter(path))
+        return cls(settings.buffer_size, exporters, settings.enabled)
+
+    def add_exporter(self, exporter: TelemetryExporter) -> None:
+        self.exporters.append(exporter)
+
+    @contextmanager
+    def track(
+        self, method: str, model: str, stream: bool = False
+    ) -> Iterator[CallMetrics]:
+        """Measure the call made inside the block and record it on exit"""
+        metrics = CallMetrics(method=method, model=model, stream=stream)
+        token = _current_call.set(metrics)
+        try:
+            yield metrics
+        except BaseException as e:
+            metrics.error = f"{type(e).__name__}: {e}"
+            metrics._deferred = False
+            raise
+        finally:
+            _current_call.reset(token)
+            if not metrics._deferred:
+                self.record(metrics)
+
+    def record(self, metrics: CallMetrics) -> None:
+        """Store a finished call and hand it to every exporter"""
+        metrics.finish()
+        if not self.enabled:
+            return
+        self.calls.append(metrics)
+        for exporter in self.exporters:
+            try:
+                exporter.export(metrics)
+            except Exception as e:
+                logger.warning(f"LLM telemetry exporter {exporter} failed: {e}")
+
+    def summary(self, model: Optional[str] = None) -> Dict[str, Any]:
+        """Call counts, token totals and latency percentiles, overall and per method"""
+        calls = [c for c in self.calls if model is None or c.model == model]
+        groups = {"all": calls}
+        for call in calls:
+            groups.setdefault(call.method, []).append(call)
+        return {name: self._summarize(group) for name, group in groups.items()}
+
+    @staticmethod
+    def _summarize(calls: List[CallMetrics]) -> Dict[str, Any]:
+        def values(field: str) -> List[float]:
+            return [v for c in calls if (v := getattr(c, field)) is not None]
+
+        return {
+            "calls": len(calls),
+            "errors": sum(c.error is not None for c in calls),
+            "cached": sum(c.cached for c in calls),
+            "retries": sum(c.retries for c in calls),
+            "prompt_tokens": sum(values("prompt_tokens")),
+            "completion_tokens": sum(values("completion_tokens")),
+            "latency": percentiles(values("latency")),
+            "queue_wait": percentiles(values("queue_wait")),
+            "time_to_first_token": percentiles(values("time_to_first_token")),
+            "tokens_per_second": percentiles(values("tokens_per_second")),
+        }
+
+    def clear(self) -> None:
+        self.calls.clear()
+
+
+_telemetry: Optional[Telemetry] = None
+
+
+def get_telemetry() -> Telemetry:
+    """Process-wide LLM call telemetry"""
+    global _telemetry
+    if _telemetry is None:
+        _telemetry = Telemetry.from_settings(config.telemetry or TelemetrySettings())
+    return _telemetry
+
+
+def tracked(method: str):
+    """Decorate an async LLM method so each call is recorded in telemetry"""
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(self, *args, **kwargs):
+            with get_telemetry().track(method, self.model):
+                return await fn(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
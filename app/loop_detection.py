@@ -0,0 +1,108 @@
+"""Incremental detection of repeated assistant turns and tool-call cycles."""
+import json
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from app.schema import Message, ToolCall
+
+
+def normalize_content(content: str) -> str:
+    """Content with case and whitespace differences removed"""
+    return " ".join(content.lower().split())
+
+
+def tool_call_signature(call: ToolCall) -> str:
+    """Tool name and arguments, independent of key order and formatting"""
+    arguments = call.function.arguments or "{}"
+    try:
+        arguments = json.dumps(json.loads(arguments), sort_keys=True)
+    except json.JSONDecodeError:
+        arguments = " ".join(arguments.split())
+    return f"{call.function.name}:{arguments}"
+
+
+class LoopDetector:
+    """Index of assistant turns that spots repetition in constant time per turn.
+
+    Each turn is reduced to a hash when observed: the signatures of its
+    tool calls, or its normalized text when it calls no tool, so calls that
+    only differ in the accompanying reasoning still match. Two patterns are
+    reported:
+
+    - the same assistant text seen more than `duplicate_threshold` times
+      since the last `forget_recent()`;
+    - the last turns forming a cycle of up to `max_period` turns, such as
+      A→B→A→B. A cycle of one turn must repeat `duplicate_threshold + 1`
+      times in a row, longer cycles `duplicate_threshold` times.
+
+    Only a window of the most recent turn hashes is kept, so the work per
+    turn is bounded by `max_period` and `duplicate_threshold`, not history.
+    """
+
+    def __init__(self, duplicate_threshold: int = 2, max_period: int = 4):
+        self.duplicate_threshold = max(1, duplicate_threshold)
+        self.max_period = max(1, max_period)
+        self._content_counts: Dict[int, int] = {}
+        self._turns: Deque[int] = deque(
+            maxlen=max(
+                self.duplicate_threshold + 1,
+                self.max_period * self.duplicate_threshold,
+            )
+        )
+
+    @staticmethod
+    def turn_key(message: Message) -> Tuple[int, Optional[int]]:
+        """Hash of a turn, and of its text when it has any"""
+        content = normalize_content(message.content or "")
+        content_hash = hash(content) if content else None
+        if message.tool_calls:
+            calls = tuple(tool_call_signature(call) for call in message.tool_calls)
+            return hash(calls), content_hash
+        return hash(("text", content)), content_hash
+
+    def _repeats(self, period: int) -> int:
+        return self.duplicate_threshold + (1 if period == 1 else 0)
+
+    def _cycle(self) -> Optional[int]:
+        """Shortest period the most recent turns repeat with, if any"""
+        turns = self._turns
+        for period in range(1, self.max_period + 1):
+            span = period * self._repeats(period)
+            if span > len(turns):
+                break
+            if all(
+                turns[-i] == turns[-i - period] for i in range(1, span - period + 1)
+            ):
+                return period
+        return None
+
+    def observe(self, message: Message) -> Optional[str]:
+        """Record an assistant turn and describe the loop it completes, if any"""
+        turn_hash, content_hash = self.turn_key(message)
+        self._turns.append(turn_hash)
+
+        if content_hash is not None:
+            count = self._content_counts.get(content_hash, 0) + 1
+            self._content_counts[content_hash] = count
+            if count > self.duplicate_threshold:
+                return f"same response repeated {count} times"
+
+        period = self._cycle()
+        if period == 1:
+            return f"same turn repeated {self._repeats(1)} times in a row"
+        if period is not None:
+            return f"cycle of {period} turns repeated {self._repeats(period)} times"
+        return None
+
+    def observe_all(self, messages: List[Message]) -> Optional[str]:
+        """Observe the assistant turns among `messages`, returning the last loop found"""
+        reason = None
+        for message in messages:
+            if message.role == "assistant":
+                reason = self.observe(message) or reason
+        return reason
+
+    def forget_recent(self) -> None:
+        """Drop the turns seen so far so a reported loop must build up again"""
+        self._turns.clear()
+        self._content_counts.clear()
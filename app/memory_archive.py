@@ -0,0 +1,122 @@
+"""On-disk log of messages evicted from agent memory."""
+import hashlib
+import json
+import time
+import uuid
+from pathlib import Path
+from typing import Iterator, List, Optional, Union
+
+from app.config import PROJECT_ROOT, MemorySettings, config
+from app.logger import logger
+from app.schema import Message
+
+
+class MessageArchive:
+    """Append-only JSONL log of messages that left an agent's memory.
+
+    Each line holds one message as it was before eviction, with the reason
+    it was evicted ("trimmed", "compacted", "elided" or "image_removed")
+    and a sequence number. The file is only created on the first eviction,
+    so runs that never outgrow memory leave nothing behind. Images are
+    recorded by hash and size only, and the log stops growing at
+    `max_bytes`.
+    """
+
+    def __init__(self, path: Union[str, Path], max_bytes: Optional[int] = None):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.count = 0
+        self.size = 0
+        self.full = False
+
+    @classmethod
+    def for_agent(
+        cls, name: str, settings: Optional[MemorySettings] = None
+    ) -> Optional["MessageArchive"]:
+        """New archive for one agent run, or None when archiving is disabled"""
+        settings = settings or config.memory or MemorySettings()
+        if not settings.archive:
+            return None
+        directory = Path(settings.archive_dir)
+        if not directory.is_absolute():
+            directory = PROJECT_ROOT / directory
+        stamp = time.strftime("%Y%m%d%H%M%S")
+        return cls(
+            directory / f"{name}-{stamp}-{uuid.uuid4().hex[:8]}.jsonl",
+            settings.archive_max_bytes,
+        )
+
+    @staticmethod
+    def _entry_message(message: Message) -> dict:
+        """Message as archived, with any image replaced by its hash and size"""
+        data = message.to_dict()
+        image = data.pop("base64_image", None)
+        if image:
+            data["image_sha256"] = hashlib.sha256(image.encode()).hexdigest()
+            data["image_size"] = len(image)
+        return data
+
+    def append(self, messages: List[Message], reason: str) -> None:
+        """Write evicted messages to the log"""
+        if not messages:
+            return
+        lines = []
+        for message in messages:
+            lines.append(
+                json.dumps(
+                    {
+                        "seq": self.count,
+                        "time": time.time(),
+                        "reason": reason,
+                        "message": self._entry_message(message),
+                    },
+                    ensure_ascii=False,
+                )
+            )
+            self.count += 1
+        data = ("\n".join(lines) + "\n").encode("utf-8")
+        if self.max_bytes is not None and self.size + len(data) > self.max_bytes:
+            if not self.full:
+                logger.warning(
+                    f"Evicted message log {self.path} reached its {self.max_bytes} "
+                    "byte limit, later evictions are not archived"
+                )
+                self.full = True
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("ab") as f:
+                f.write(data)
+            self.size += len(data)
+        except OSError as e:
+            logger.warning(f"Could not archive evicted messages to {self.path}: {e}")
+
+    def entries(
+        self, reason: Optional[str] = None, role: Optional[str] = None
+    ) -> Iterator[dict]:
+        """Archived entries in eviction order, optionally filtered"""
+        if not self.path.exists():
+            return
+        with self.path.open(encoding="utf-8") as f:
+            for line in f:
+                entry = json.loads(line)
+                if reason is not None and entry["reason"] != reason:
+                    continue
+                if role is not None and entry["message"]["role"] != role:
+                    continue
+                yield entry
+
+    def messages(
+        self, reason: Optional[str] = None, role: Optional[str] = None
+    ) -> List[Message]:
+        """Archived messages in eviction order, optionally filtered"""
+        return [Message(**entry["message"]) for entry in self.entries(reason, role)]
+
+    def search(self, text: str) -> List[Message]:
+        """Archived messages whose content contains `text`, ignoring case"""
+        text = text.lower()
+        return [
+            Message(**entry["message"])
+            for entry in self.entries()
+            if text in (entry["message"].get("content") or "").lower()
+        ]
@@ -0,0 +1,186 @@
+"""Step-level timing tree of agent runs, exportable as a Chrome trace."""
+import asyncio
+import functools
+import json
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar, Token
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+
+_active: ContextVar[Optional["Profiler"]] = ContextVar("profiler", default=None)
+_current_span: ContextVar[Optional["Span"]] = ContextVar("profiler_span", default=None)
+
+# Returned by `span` when no profiler is active; reusable and reentrant
+_NOOP = nullcontext()
+
+
+class Span:
+    """One timed section of a run and the sections nested in it"""
+
+    __slots__ = ("name", "category", "args", "start", "end", "tid", "children")
+
+    def __init__(self, name: str, category: str, args: Dict[str, Any], tid: int):
+        self.name = name
+        self.category = category
+        self.args = args
+        self.tid = tid
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.children: List["Span"] = []
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    @property
+    def self_time(self) -> float:
+        """Duration not covered by child spans"""
+        return max(0.0, self.duration - sum(c.duration for c in self.children))
+
+    def walk(self) -> Iterator["Span"]:
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+
+class Profiler:
+    """Record a timing tree of everything run while the profiler is active.
+
+    Activate it around a run with `with Profiler() as profiler: ...`. Code
+    marks sections with `span(name, category)` or the `profiled` decorator:
+    agent steps, think and act, LLM calls and their HTTP requests, tools,
+    browser state capture, message formatting and sandbox commands. Spans
+    nest by async context, so tool calls running in parallel tasks still
+    hang under the step that started them. Without an active profiler
+    `span` only reads a context variable and returns a no-op context.
+    """
+
+    def __init__(self):
+        self.roots: List[Span] = []
+        self.started = time.perf_counter()
+        self._tids: Dict[int, int] = {}
+        self._token: Optional[Token] = None
+
+    def _tid(self) -> int:
+        """Small id of the current asyncio task or thread, one trace lane each"""
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        key = id(task) if task is not None else threading.get_ident()
+        return self._tids.setdefault(key, len(self._tids) + 1)
+
+    @contextmanager
+    def span(self, name: str, category: str = "", **args) -> Iterator[Span]:
+        parent = _current_span.get()
+        span = Span(name, category, args, self._tid())
+        (parent.children if parent is not None else self.roots).append(span)
+        token = _current_span.set(span)
+        try:
+            yield span
+        finally:
+            span.end = time.perf_counter()
+            _current_span.reset(token)
+
+    def spans(self) -> Iterator[Span]:
+        for root in self.roots:
+            yield from root.walk()
+
+    def trace_events(self) -> List[dict]:
+        """Spans as Chrome trace-event "complete" events, in microseconds"""
+        return [
+            {
+                "name": span.name,
+                "cat": span.category,
+                "ph": "X",
+                "ts": round((span.start - self.started) * 1e6, 1),
+                "dur": round(span.duration * 1e6, 1),
+                "pid": 1,
+                "tid": span.tid,
+                "args": span.args,
+            }
+            for span in self.spans()
+        ]
+
+    def export_chrome_trace(self, path: Union[str, Path]) -> Path:
+        """Write the run as JSON loadable in chrome://tracing or Perfetto"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        trace = {"traceEvents": self.trace_events(), "displayTimeUnit": "ms"}
+        path.write_text(json.dumps(trace, default=str), encoding="utf-8")
+        return path
+
+    def summary(self, top: int = 10) -> List[Dict[str, Any]]:
+        """Span names ordered by total self time, the run's top time sinks"""
+        totals: Dict[str, Dict[str, Any]] = {}
+        for span in self.spans():
+            entry = totals.setdefault(
+                span.name,
+                {"name": span.name, "calls": 0, "total": 0.0, "self": 0.0},
+            )
+            entry["calls"] += 1
+            entry["total"] += span.duration
+            entry["self"] += span.self_time
+        ordered = sorted(totals.values(), key=lambda e: e["self"], reverse=True)
+        return ordered[:top]
+
+    def format_summary(self, top: int = 10) -> str:
+        """Summary table of the top time sinks"""
+        run_time = sum(root.duration for root in self.roots) or 1.0
+        lines = [
+            f"{'span':<32} {'calls':>6} {'total s':>9} {'self s':>9} {'self %':>7}"
+        ]
+        for entry in self.summary(top):
+            lines.append(
+                f"{entry['name'][:32]:<32} {entry['calls']:>6} "
+                f"{entry['total']:>9.3f} {entry['self']:>9.3f} "
+                f"{entry['self'] / run_time:>7.1%}"
+            )
+        return "\n".join(lines)
+
+    def __enter__(self) -> "Profiler":
+        self._token = _active.set(self)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        _active.reset(self._token)
+
+
+def span(name: str, category: str = "", **args):
+    """Time the block under the active profiler, or do nothing without one"""
+    profiler = _active.get()
+    if profiler is None:
+        return _NOOP
+    return profiler.span(name, category, **args)
+
+
+def profiled(name: str, category: str = ""):
+    """Decorate a function or coroutine function so each call is a span"""
+
+    def decorator(fn):
+        if asyncio.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                profiler = _active.get()
+                if profiler is None:
+                    return await fn(*args, **kwargs)
+                with profiler.span(name, category):
+                    return await fn(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            profiler = _active.get()
+            if profiler is None:
+                return fn(*args, **kwargs)
+            with profiler.span(name, category):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
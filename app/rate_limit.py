@@ -0,0 +1,350 @@
+"""Provider-aware rate limiting, retry classification and circuit breaking for LLM calls."""
+import asyncio
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import httpx
+from openai import APIConnectionError, APIStatusError, APITimeoutError
+
+from app.config import LLMSettings
+from app.exceptions import CircuitOpenError
+from app.llm_telemetry import current_call
+from app.logger import logger
+
+
+# HTTP status codes worth retrying: timeouts, conflicts, rate limits and server errors
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+# botocore error codes worth retrying, as raised by the Bedrock client
+RETRYABLE_AWS_ERROR_CODES = {
+    "ThrottlingException",
+    "ServiceUnavailableException",
+    "InternalServerException",
+    "ModelNotReadyException",
+    "ModelTimeoutException",
+}
+
+
+def _parse_retry_after(headers: httpx.Headers) -> Optional[float]:
+    """Read the delay requested by the provider from response headers"""
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    """HTTP status of an OpenAI or botocore error, if it has one"""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        aws_error = getattr(error, "response", None)
+        if isinstance(aws_error, dict):
+            status = aws_error.get("ResponseMetadata", {}).get("HTTPStatusCode")
+    return status
+
+
+def classify_error(error: BaseException) -> Tuple[bool, Optional[float]]:
+    """Decide whether an LLM call error is worth retrying
+
+    Returns:
+        tuple: Whether the error is retryable and the provider's Retry-After delay
+    """
+    if isinstance(error, (APITimeoutError, APIConnectionError)):
+        return True, None
+    if isinstance(error, APIStatusError):
+        retryable = error.status_code in RETRYABLE_STATUS_CODES
+        return retryable, _parse_retry_after(error.response.headers)
+    if isinstance(error, (httpx.TimeoutException, httpx.NetworkError)):
+        return True, None
+    # botocore ClientError, detected by shape to avoid importing botocore
+    aws_error = getattr(error, "response", None)
+    if isinstance(aws_error, dict) and "Error" in aws_error:
+        return aws_error["Error"].get("Code") in RETRYABLE_AWS_ERROR_CODES, None
+    return False, None
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at a per-minute rate."""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    async def acquire(self, amount: float = 1) -> float:
+        """Wait until `amount` tokens are available and take them
+
+        Requests larger than the bucket only wait for a full bucket.
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        async with self._lock:
+            self._refill()
+            while self._tokens < amount:
+                delay = (amount - self._tokens) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+                self._refill()
+            self._tokens -= amount
+        return waited
+
+    @property
+    def available(self) -> float:
+        self._refill()
+        return self._tokens
+
+
+class CircuitBreaker:
+    """Stop calling a failing provider until a recovery timeout has passed.
+
+    After `failure_threshold` consecutive failures the circuit opens and calls
+    fail fast. Once `recovery_timeout` has elapsed a single trial call is let
+    through (half-open); its outcome closes or re-opens the circuit. Other
+    calls keep failing fast while the trial is in flight.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    def check(self, name: str = "provider") -> bool:
+        """Raise CircuitOpenError if calls should not be attempted
+
+        Returns:
+            bool: Whether this call is the half-open trial, to be passed to
+                `end_trial` once it finishes
+        """
+        if self.state == self.OPEN:
+            remaining = self._opened_at + self.recovery_timeout - time.monotonic()
+            if remaining > 0:
+                raise CircuitOpenError(
+                    f"Circuit open for {name}, retry in {remaining:.1f}s"
+                )
+            self.state = self.HALF_OPEN
+        elif self.state == self.CLOSED:
+            return False
+        elif self._trial_in_flight:
+            raise CircuitOpenError(
+                f"Circuit half-open for {name}, trial call in flight"
+            )
+        self._trial_in_flight = True
+        return True
+
+    def available(self) -> bool:
+        """Whether `check` would let a call through now, without changing state"""
+        if self.state == self.OPEN:
+            return time.monotonic() >= self._opened_at + self.recovery_timeout
+        return self.state == self.CLOSED or not self._trial_in_flight
+
+    def end_trial(self) -> None:
+        """Mark the half-open trial call finished
+
+        A trial that failed with an error not counted as a failure, or was
+        cancelled, leaves the circuit half-open for the next call to try.
+        """
+        self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.failures = 0
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+
+
+class ProviderLimiter:
+    """Rate limits, retries and circuit breaking for calls to one provider.
+
+    Requests and tokens per minute are enforced with token buckets shared by
+    every caller of the provider. When the provider answers 429, all callers
+    pause for the Retry-After delay instead of retrying independently.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+        max_retries: int = 6,
+        max_backoff: float = 60.0,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+    ):
+        self.name = name
+        self.max_retries = max_retries
+        self.max_backoff = max_backoff
+        # Requests may burst by one second's worth; tokens by a full minute's
+        self.request_bucket = (
+            TokenBucket(requests_per_minute, max(1.0, requests_per_minute / 60))
+            if requests_per_minute
+            else None
+        )
+        self.token_bucket = (
+            TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        )
+        self.breaker = CircuitBreaker(failure_threshold, recovery_timeout)
+        self._paused_until = 0.0
+
+        self.calls = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.failures = 0
+        self.wait_time = 0.0
+
+    @classmethod
+    def from_settings(cls, settings: LLMSettings) -> "ProviderLimiter":
+        return cls(
+            name=f"{settings.api_type or 'openai'}:{settings.base_url}",
+            requests_per_minute=settings.requests_per_minute,
+            tokens_per_minute=settings.tokens_per_minute,
+            max_retries=settings.max_retries,
+            max_backoff=settings.retry_max_wait,
+            failure_threshold=settings.circuit_failure_threshold,
+            recovery_timeout=settings.circuit_recovery_timeout,
+        )
+
+    def _backoff(self, attempt: int) -> float:
+        """Exponential backoff with full jitter"""
+        return random.uniform(0, min(self.max_backoff, 2**attempt))
+
+    async def _wait_for_capacity(self, tokens: int) -> float:
+        """Wait out any shared pause and take capacity from the buckets
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        waited = 0.0
+        pause = self._paused_until - time.monotonic()
+        if pause > 0:
+            await asyncio.sleep(pause)
+            waited += pause
+        if self.request_bucket:
+            waited += await self.request_bucket.acquire(1)
+        if self.token_bucket and tokens:
+            waited += await self.token_bucket.acquire(tokens)
+        self.wait_time += waited
+        return waited
+
+    async def call(
+        self,
+        fn: Callable[[], Awaitable[Any]],
+        tokens: int = 0,
+        max_retries: Optional[int] = None,
+    ) -> Any:
+        """Call the provider, retrying only errors classified as retryable
+
+        Args:
+            fn: Coroutine factory performing the request
+            tokens: Estimated tokens consumed by the request
+            max_retries: Retries of this call, instead of the limiter's own
+
+        Raises:
+            CircuitOpenError: If the provider's circuit is open
+            Exception: The last error once retries are exhausted or it is not retryable
+        """
+        if max_retries is None:
+            max_retries = self.max_retries
+        attempt = 0
+        metrics = current_call()
+        while True:
+            trial = self.breaker.check(self.name)
+            try:
+                waited = await self._wait_for_capacity(tokens)
+                if metrics is not None:
+                    metrics.queue_wait += waited
+                self.calls += 1
+                result = await fn()
+            except Exception as e:
+                error = e
+            else:
+                self.breaker.record_success()
+                return result
+            finally:
+                # Any verdict is recorded below before another call can check in
+                if trial:
+                    self.breaker.end_trial()
+
+            retryable, retry_after = classify_error(error)
+            status = _status_code(error)
+            if status == 429:
+                self.rate_limited += 1
+            elif retryable:
+                self.breaker.record_failure()
+            if not retryable or attempt >= max_retries:
+                self.failures += 1
+                raise error
+
+            delay = retry_after if retry_after is not None else self._backoff(attempt)
+            delay = min(delay, self.max_backoff)
+            if status == 429:
+                # Pause every caller of this provider, not just this one
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            logger.warning(
+                f"LLM call to {self.name} failed ({type(error).__name__}"
+                f"{f' {status}' if status else ''}), retrying in {delay:.1f}s"
+            )
+            attempt += 1
+            self.retries += 1
+            if metrics is not None:
+                metrics.retries += 1
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "provider": self.name,
+            "calls": self.calls,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "failures": self.failures,
+            "wait_time": round(self.wait_time, 3),
+            "circuit": self.breaker.state,
+        }
+
+
+_limiters: Dict[str, ProviderLimiter] = {}
+
+
+def get_provider_limiter(settings: LLMSettings) -> ProviderLimiter:
+    """Limiter shared by every LLM instance that talks to the same provider"""
+    key = f"{settings.api_type}:{settings.base_url}:{hash(settings.api_key)}"
+    if key not in _limiters:
+        _limiters[key] = ProviderLimiter.from_settings(settings)
+    return _limiters[key]
@@ -2,6 +2,7 @@ from abc import ABC, abstractmethod
 from typing import Dict, Optional, Protocol
 
 from app.config import SandboxSettings
+from app.profiler import profiled
 from app.sandbox.core.sandbox import DockerSandbox
 
 
@@ -107,6 +108,7 @@ class LocalSandboxClient(BaseSandboxClient):
         self.sandbox = DockerSandbox(config, volume_bindings)
         await self.sandbox.create()
 
+    @profiled("sandbox.run_command", "sandbox")
     async def run_command(self, command: str, timeout: Optional[int] = None) -> str:
         """Runs command in sandbox.
 
@@ -124,6 +126,7 @@ class LocalSandboxClient(BaseSandboxClient):
             raise RuntimeError("Sandbox not initialized")
         return await self.sandbox.run_command(command, timeout)
 
+    @profiled("sandbox.copy_from", "sandbox")
     async def copy_from(self, container_path: str, local_path: str) -> None:
         """Copies file from container to local.
 
@@ -138,6 +141,7 @@ class LocalSandboxClient(BaseSandboxClient):
             raise RuntimeError("Sandbox not initialized")
         await self.sandbox.copy_from(container_path, local_path)
 
+    @profiled("sandbox.copy_to", "sandbox")
     async def copy_to(self, local_path: str, container_path: str) -> None:
         """Copies file from local to container.
 
@@ -152,6 +156,7 @@ class LocalSandboxClient(BaseSandboxClient):
             raise RuntimeError("Sandbox not initialized")
         await self.sandbox.copy_to(local_path, container_path)
 
+    @profiled("sandbox.read_file", "sandbox")
     async def read_file(self, path: str) -> str:
         """Reads file from container.
 
@@ -168,6 +173,7 @@ class LocalSandboxClient(BaseSandboxClient):
             raise RuntimeError("Sandbox not initialized")
         return await self.sandbox.read_file(path)
 
+    @profiled("sandbox.write_file", "sandbox")
     async def write_file(self, path: str, content: str) -> None:
         """Writes file to container.
 
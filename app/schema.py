@@ -1,7 +1,9 @@
 from enum import Enum
-from typing import Any, List, Literal, Optional, Union
+from typing import Any, Callable, ClassVar, Dict, List, Literal, Optional, Union
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
+
+from app.logger import logger
 
 
 class Role(str, Enum):
@@ -51,6 +53,38 @@ class ToolCall(BaseModel):
     function: Function
 
 
+def to_wire_format(message: dict, supports_images: bool = False) -> dict:
+    """Convert a message dict to the API wire format without mutating it
+
+    A `base64_image` field is expanded into multimodal content when the model
+    supports images, and dropped otherwise.
+    """
+    base64_image = message.get("base64_image")
+    if not base64_image and "base64_image" not in message:
+        return message
+
+    message = {k: v for k, v in message.items() if k != "base64_image"}
+    if supports_images and base64_image:
+        content = message.get("content")
+        if not content:
+            content = []
+        elif isinstance(content, str):
+            content = [{"type": "text", "text": content}]
+        else:
+            # Convert string items to proper text objects
+            content = [
+                {"type": "text", "text": item} if isinstance(item, str) else item
+                for item in content
+            ]
+        message["content"] = content + [
+            {
+                "type": "image_url",
+                "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"},
+            }
+        ]
+    return message
+
+
 class Message(BaseModel):
     """Represents a chat message in the conversation"""
 
@@ -61,6 +95,22 @@ class Message(BaseModel):
     tool_call_id: Optional[str] = Field(default=None)
     base64_image: Optional[str] = Field(default=None)
 
+    # Wire format per image support flag, built on first use
+    _wire: Dict[bool, dict] = PrivateAttr(default_factory=dict)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+        if name in type(self).model_fields:
+            self._wire.clear()
+
+    def model_copy(
+        self, *, update: Optional[Dict[str, Any]] = None, deep: bool = False
+    ):
+        copied = super().model_copy(update=update, deep=deep)
+        # The copy may differ from this message; never share its wire cache
+        copied._wire = {}
+        return copied
+
     def __add__(self, other) -> List["Message"]:
         """支持 Message + list 或 Message + Message 的操作"""
         if isinstance(other, list):
@@ -96,6 +146,20 @@ class Message(BaseModel):
             message["base64_image"] = self.base64_image
         return message
 
+    def to_wire(self, supports_images: bool = False) -> dict:
+        """API wire format of the message, built once and shared across calls
+
+        The returned dict is cached on the message and must not be modified.
+        Assigning a message field discards the cached format.
+        """
+        # Read the private cache directly; pydantic's attribute lookup is slow here
+        cache = self.__pydantic_private__["_wire"]
+        wire = cache.get(supports_images)
+        if wire is None:
+            wire = to_wire_format(self.to_dict(), supports_images)
+            cache[supports_images] = wire
+        return wire
+
     @classmethod
     def user_message(
         cls, content: str, base64_image: Optional[str] = None
@@ -159,24 +223,257 @@ class Message(BaseModel):
 class Memory(BaseModel):
     messages: List[Message] = Field(default_factory=list)
     max_messages: int = Field(default=100)
+    token_counter: Optional[Callable[[Message], int]] = Field(
+        default=None, exclude=True, description="Per-message token counter"
+    )
+    token_budget: Optional[int] = Field(
+        default=None,
+        description="Compact the history to stay under this many tokens (None to disable)",
+    )
+    keep_recent: int = Field(
+        default=10, description="Most recent messages never compacted"
+    )
+    max_images: Optional[int] = Field(
+        default=None,
+        description="Keep only this many of the latest images (None for no limit)",
+    )
+    max_image_bytes: Optional[int] = Field(
+        default=None,
+        description="Keep only the latest images whose base64 data fits in this many bytes",
+    )
+    on_evict: Optional[Callable[[List[Message], str], None]] = Field(
+        default=None,
+        exclude=True,
+        description="Called with messages, as they were, before they leave memory and the reason",
+    )
+
+    # Characters of an elided tool output kept from its start and end
+    ELIDE_HEAD_CHARS: ClassVar[int] = 400
+    ELIDE_TAIL_CHARS: ClassVar[int] = 200
+    # Text left in place of an image dropped by the retention policy
+    IMAGE_PLACEHOLDER: ClassVar[str] = "[Earlier image removed from context]"
+
+    # Token counts parallel to `messages` and their running total
+    _token_counts: List[int] = PrivateAttr(default_factory=list)
+    _token_total: int = PrivateAttr(default=0)
+    # Messages ever added, unaffected by trimming and compaction
+    _appended: int = PrivateAttr(default=0)
+
+    def _count(self, message: Message) -> int:
+        return self.token_counter(message) if self.token_counter else 0
+
+    def _evict(self, messages: List[Message], reason: str) -> None:
+        if self.on_evict is not None and messages:
+            self.on_evict(messages, reason)
 
     def add_message(self, message: Message) -> None:
         """Add a message to memory"""
-        self.messages.append(message)
-        # Optional: Implement message limit
-        if len(self.messages) > self.max_messages:
-            self.messages = self.messages[-self.max_messages :]
+        self.add_messages([message])
 
     def add_messages(self, messages: List[Message]) -> None:
         """Add multiple messages to memory"""
+        # The ledger is only updated incrementally while it is in sync with
+        # `messages`; otherwise `token_count` rebuilds it on next access.
+        in_sync = len(self._token_counts) == len(self.messages)
         self.messages.extend(messages)
+        self._appended += len(messages)
+        if in_sync:
+            counts = [self._count(message) for message in messages]
+            self._token_counts.extend(counts)
+            self._token_total += sum(counts)
+        else:
+            self._token_counts.clear()
+
         # Optional: Implement message limit
         if len(self.messages) > self.max_messages:
-            self.messages = self.messages[-self.max_messages :]
+            dropped = len(self.messages) - self.max_messages
+            # Never keep tool results whose tool call was trimmed away
+            while (
+                dropped < len(self.messages)
+                and self.messages[dropped].role == Role.TOOL
+            ):
+                dropped += 1
+            self._evict(self.messages[:dropped], "trimmed")
+            # Trim in place; the list stays at most `max_messages` long
+            if in_sync:
+                self._token_total -= sum(self._token_counts[:dropped])
+                del self._token_counts[:dropped]
+            del self.messages[:dropped]
+
+        if (self.max_images is not None or self.max_image_bytes is not None) and any(
+            message.base64_image for message in messages
+        ):
+            self.retain_images()
+
+        if self.token_budget is not None and self.token_counter is not None:
+            self.compact(self.token_budget)
 
     def clear(self) -> None:
         """Clear all messages"""
         self.messages.clear()
+        self._token_counts.clear()
+        self._token_total = 0
+
+    def recount_tokens(self) -> int:
+        """Rebuild the token ledger, e.g. after `messages` was replaced directly"""
+        self._token_counts = [self._count(message) for message in self.messages]
+        self._token_total = sum(self._token_counts)
+        return self._token_total
+
+    @property
+    def appended(self) -> int:
+        """Number of messages added over the memory's lifetime"""
+        return self._appended
+
+    @property
+    def token_count(self) -> int:
+        """Running token total of all messages in memory"""
+        if len(self._token_counts) != len(self.messages):
+            return self.recount_tokens()
+        return self._token_total
+
+    def _compactable_end(self) -> int:
+        """Index of the first message kept verbatim as part of the recent turns"""
+        end = max(0, len(self.messages) - self.keep_recent)
+        # Do not separate tool results from the assistant turn that called them
+        while end > 0 and self.messages[end].role == Role.TOOL:
+            end -= 1
+        return end
+
+    def _protected(self) -> set:
+        """Ids of messages always kept verbatim: system prompts and the initial task"""
+        protected = {id(m) for m in self.messages if m.role == Role.SYSTEM}
+        first_user = next((m for m in self.messages if m.role == Role.USER), None)
+        if first_user is not None:
+            protected.add(id(first_user))
+        return protected
+
+    def _replace(self, index: int, message: Message) -> None:
+        count = self._count(message)
+        self._token_total += count - self._token_counts[index]
+        self._token_counts[index] = count
+        self.messages[index] = message
+
+    def retain_images(self) -> int:
+        """Replace images beyond `max_images` / `max_image_bytes` with a placeholder
+
+        The latest images are kept; once either limit is reached, every older
+        image is dropped and its message keeps its text plus a short note.
+
+        Returns:
+            int: Images removed
+        """
+        in_sync = len(self._token_counts) == len(self.messages)
+        kept = kept_bytes = removed = 0
+        full = False
+        for index in range(len(self.messages) - 1, -1, -1):
+            message = self.messages[index]
+            if not message.base64_image:
+                continue
+            size = len(message.base64_image)
+            full = full or (
+                (self.max_images is not None and kept >= self.max_images)
+                or (
+                    self.max_image_bytes is not None
+                    and kept_bytes + size > self.max_image_bytes
+                )
+            )
+            if not full:
+                kept += 1
+                kept_bytes += size
+                continue
+
+            content = (
+                f"{message.content}\n{self.IMAGE_PLACEHOLDER}"
+                if message.content
+                else self.IMAGE_PLACEHOLDER
+            )
+            stripped = message.model_copy(
+                update={"base64_image": None, "content": content}
+            )
+            self._evict([message], "image_removed")
+            if in_sync:
+                self._replace(index, stripped)
+            else:
+                self.messages[index] = stripped
+            removed += 1
+        return removed
+
+    def _elide(self, message: Message) -> Optional[Message]:
+        """Shorten a tool output to its head and tail, or None if already short"""
+        content = message.content or ""
+        keep = self.ELIDE_HEAD_CHARS + self.ELIDE_TAIL_CHARS
+        if len(content) <= keep * 2:
+            return None
+        elided = len(content) - keep
+        return message.model_copy(
+            update={
+                "content": f"{content[: self.ELIDE_HEAD_CHARS]}\n"
+                f"[... {elided} characters of output elided to save context ...]\n"
+                f"{content[-self.ELIDE_TAIL_CHARS :]}"
+            }
+        )
+
+    def _turn_end(self, index: int) -> int:
+        """End index (exclusive) of the turn starting at `index`, with its tool results"""
+        message = self.messages[index]
+        end = index + 1
+        if message.tool_calls:
+            call_ids = {call.id for call in message.tool_calls}
+            while (
+                end < len(self.messages)
+                and self.messages[end].role == Role.TOOL
+                and self.messages[end].tool_call_id in call_ids
+            ):
+                end += 1
+        return end
+
+    def compact(self, budget: int) -> int:
+        """Compact old history until it fits in `budget` tokens
+
+        Old tool outputs are elided to their head and tail first, oldest
+        first. If that is not enough, the oldest turns are dropped whole, each
+        assistant tool call together with its results. System messages, the
+        initial task and the `keep_recent` latest messages stay verbatim.
+
+        Returns:
+            int: Tokens saved
+        """
+        before = self.token_count
+        if before <= budget:
+            return 0
+
+        protected = self._protected()
+        end = self._compactable_end()
+        for index in range(end):
+            if self._token_total <= budget:
+                break
+            message = self.messages[index]
+            if message.role != Role.TOOL or id(message) in protected:
+                continue
+            elided = self._elide(message)
+            if elided is not None:
+                self._evict([message], "elided")
+                self._replace(index, elided)
+
+        index = 0
+        while self._token_total > budget and index < self._compactable_end():
+            if id(self.messages[index]) in protected:
+                index += 1
+                continue
+            turn_end = self._turn_end(index)
+            self._evict(self.messages[index:turn_end], "compacted")
+            self._token_total -= sum(self._token_counts[index:turn_end])
+            del self.messages[index:turn_end]
+            del self._token_counts[index:turn_end]
+
+        saved = before - self._token_total
+        if saved:
+            logger.info(
+                f"Compacted memory from {before} to {self._token_total} tokens "
+                f"(budget {budget})"
+            )
+        return saved
 
     def get_recent_messages(self, n: int) -> List[Message]:
         """Get n most recent messages"""
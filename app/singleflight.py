@@ -0,0 +1,68 @@
+"""Single-flight execution: concurrent identical calls share one upstream call."""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+class SingleFlight:
+    """Deduplicate concurrent calls that share the same key.
+
+    The first caller for a key starts the work as a task; callers arriving
+    while it is in flight await the same task instead of starting their own.
+    The task is shielded, so a cancelled caller does not cancel the call for
+    the others.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[Any]],
+        copy: Optional[Callable[[Any], Any]] = None,
+    ) -> Any:
+        """Run `fn` once per in-flight key and return its result to every caller.
+
+        Args:
+            key: Identity of the call; equal keys are coalesced.
+            fn: Coroutine factory performing the upstream call.
+            copy: Optional function applied to the shared result for callers that
+                joined an in-flight call, so they do not share mutable state.
+        """
+        result, _ = await self.do_shared(key, fn, copy)
+        return result
+
+    async def do_shared(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[Any]],
+        copy: Optional[Callable[[Any], Any]] = None,
+    ) -> Tuple[Any, bool]:
+        """Like `do`, also returning whether this caller joined an in-flight call"""
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            result = await asyncio.shield(task)
+            return (copy(result) if copy else result), True
+
+        self.calls += 1
+        task = asyncio.ensure_future(fn())
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task), False
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._inflight)
+
+    def stats(self) -> Dict[str, Any]:
+        """Upstream calls made, calls coalesced into them, and the saving ratio"""
+        total = self.calls + self.coalesced
+        return {
+            "upstream_calls": self.calls,
+            "coalesced_calls": self.coalesced,
+            "in_flight": self.in_flight,
+            "coalesced_ratio": self.coalesced / total if total else 0.0,
+        }
@@ -0,0 +1,74 @@
+"""Lazily loaded, process-wide shared tokenizers."""
+import threading
+from typing import Dict, List, Optional
+
+import tiktoken
+from tiktoken.model import encoding_name_for_model
+
+from app.logger import logger
+
+
+# Encoding used for models tiktoken does not know
+DEFAULT_ENCODING = "cl100k_base"
+
+_encodings: Dict[str, tiktoken.Encoding] = {}
+_tokenizers: Dict[str, "LazyTokenizer"] = {}
+_lock = threading.Lock()
+
+
+def encoding_name(model: str) -> str:
+    """Name of the encoding used by a model, resolved without loading it"""
+    try:
+        return encoding_name_for_model(model)
+    except KeyError:
+        return DEFAULT_ENCODING
+
+
+def get_encoding(name: str) -> tiktoken.Encoding:
+    """Load an encoding once per process"""
+    encoding = _encodings.get(name)
+    if encoding is None:
+        with _lock:
+            encoding = _encodings.get(name)
+            if encoding is None:
+                logger.debug(f"Loading tokenizer encoding {name}")
+                encoding = _encodings[name] = tiktoken.get_encoding(name)
+    return encoding
+
+
+class LazyTokenizer:
+    """Tokenizer that loads its BPE ranks on first use.
+
+    Building an `LLM` only resolves the encoding name; the encoding itself is
+    loaded, and shared with every other tokenizer of the same name, the first
+    time text is actually encoded.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._encoding: Optional[tiktoken.Encoding] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._encoding is not None
+
+    @property
+    def encoding(self) -> tiktoken.Encoding:
+        if self._encoding is None:
+            self._encoding = get_encoding(self.name)
+        return self._encoding
+
+    def encode(self, text: str) -> List[int]:
+        return self.encoding.encode(text)
+
+    def decode(self, tokens: List[int]) -> str:
+        return self.encoding.decode(tokens)
+
+
+def get_tokenizer(model: str) -> LazyTokenizer:
+    """Lazy tokenizer for a model, shared by every model with the same encoding"""
+    name = encoding_name(model)
+    with _lock:
+        if name not in _tokenizers:
+            _tokenizers[name] = LazyTokenizer(name)
+        return _tokenizers[name]
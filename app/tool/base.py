@@ -8,6 +8,14 @@ class BaseTool(ABC, BaseModel):
     name: str
     description: str
     parameters: Optional[dict] = None
+    concurrency_safe: bool = Field(
+        default=False,
+        description="Whether calls may run concurrently with other tool calls",
+    )
+    exclusive_resource: Optional[str] = Field(
+        default=None,
+        description="Resource held exclusively while running; calls sharing it run one at a time",
+    )
 
     class Config:
         arbitrary_types_allowed = True
@@ -20,6 +28,10 @@ class BaseTool(ABC, BaseModel):
     async def execute(self, **kwargs) -> Any:
         """Execute the tool with given parameters."""
 
+    def resource_key(self, **kwargs) -> Optional[str]:
+        """Exclusive resource a call with these parameters needs, if any."""
+        return self.exclusive_resource
+
     def to_param(self) -> Dict:
         """Convert tool to function call format."""
         return {
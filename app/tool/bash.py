@@ -128,6 +128,8 @@ class Bash(BaseTool):
         },
         "required": ["command"],
     }
+    concurrency_safe: bool = True
+    exclusive_resource: Optional[str] = "bash_session"
 
     _session: Optional[_BashSession] = None
 
@@ -11,6 +11,7 @@ from pydantic import Field, field_validator
 from pydantic_core.core_schema import ValidationInfo
 
 from app.config import config
+from app.image_pipeline import prepare_image
 from app.llm import LLM
 from app.tool.base import BaseTool, ToolResult
 from app.tool.web_search import WebSearch
@@ -120,6 +121,8 @@ class BrowserUseTool(BaseTool, Generic[Context]):
             "extract_content": ["goal"],
         },
     }
+    concurrency_safe: bool = True
+    exclusive_resource: Optional[str] = "browser"
 
     lock: asyncio.Lock = Field(default_factory=asyncio.Lock)
     browser: Optional[BrowserUseBrowser] = Field(default=None, exclude=True)
@@ -504,9 +507,20 @@ Page content:
             await page.bring_to_front()
             await page.wait_for_load_state()
 
-            screenshot = await page.screenshot(
-                full_page=True, animations="disabled", type="jpeg", quality=100
-            )
+            if config.image.enabled:
+                # Capture losslessly so the only JPEG encoding is the pipeline's
+                screenshot = await page.screenshot(
+                    full_page=True, animations="disabled", type="png"
+                )
+                # Downscale off the event loop to what the model actually sees
+                screenshot = await asyncio.to_thread(prepare_image, screenshot)
+            else:
+                screenshot = await page.screenshot(
+                    full_page=True,
+                    animations="disabled",
+                    type="jpeg",
+                    quality=config.image.quality,
+                )
 
             screenshot = base64.b64encode(screenshot).decode("utf-8")
 
@@ -538,6 +552,21 @@ Page content:
         except Exception as e:
             return ToolResult(error=f"Failed to get browser state: {str(e)}")
 
+    async def reset_context(self) -> None:
+        """Replace the browser context, dropping its cookies, logins and tabs
+
+        The browser process is kept running, so the next session starts
+        without relaunching it.
+        """
+        async with self.lock:
+            if self.context is None:
+                return
+            await self.context.close()
+            self.context = None
+            self.dom_service = None
+            if self.browser is not None:
+                await self._ensure_browser_initialized()
+
     async def cleanup(self):
         """Clean up browser resources."""
         async with self.lock:
@@ -1,3 +1,4 @@
+import asyncio
 import multiprocessing
 import sys
 from io import StringIO
@@ -21,6 +22,8 @@ class PythonExecute(BaseTool):
         },
         "required": ["code"],
     }
+    # Each call runs in its own process
+    concurrency_safe: bool = True
 
     def _run_code(self, code: str, result_dict: dict, safe_globals: dict) -> None:
         original_stdout = sys.stdout
@@ -51,7 +54,10 @@ class PythonExecute(BaseTool):
         Returns:
             Dict: Contains 'output' with execution output or error message and 'success' status.
         """
+        # Waiting on the process blocks, so keep it off the event loop
+        return await asyncio.to_thread(self._execute_sync, code, timeout)
 
+    def _execute_sync(self, code: str, timeout: int) -> Dict:
         with multiprocessing.Manager() as manager:
             result = manager.dict({"observation": "", "success": False})
             if isinstance(__builtins__, dict):
@@ -98,6 +98,7 @@ class StrReplaceEditor(BaseTool):
         },
         "required": ["command", "path"],
     }
+    concurrency_safe: bool = True
     _file_history: DefaultDict[PathLike, List[str]] = defaultdict(list)
     _local_operator: LocalFileOperator = LocalFileOperator()
     _sandbox_operator: SandboxFileOperator = SandboxFileOperator()
@@ -111,6 +112,10 @@ class StrReplaceEditor(BaseTool):
             else self._local_operator
         )
 
+    def resource_key(self, path: Optional[str] = None, **kwargs) -> Optional[str]:
+        """Operations on the same file run one at a time, in call order."""
+        return f"file:{path}" if path else None
+
     async def execute(
         self,
         *,
@@ -391,6 +396,10 @@ class StrReplaceEditor(BaseTool):
 
         return CLIResult(output=success_msg)
 
+    def clear_history(self) -> None:
+        """Forget the edits that `undo_edit` could revert"""
+        self._file_history.clear()
+
     async def undo_edit(
         self, path: PathLike, operator: FileOperator = None
     ) -> CLIResult:
@@ -1,6 +1,7 @@
 """Collection classes for managing multiple tools."""
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
+from app.cassette import execute_tool
 from app.exceptions import ToolError
 from app.logger import logger
 from app.tool.base import BaseTool, ToolFailure, ToolResult
@@ -19,8 +20,31 @@ class ToolCollection:
     def __iter__(self):
         return iter(self.tools)
 
+    @property
+    def tools(self) -> Tuple[BaseTool, ...]:
+        return self._tools
+
+    @tools.setter
+    def tools(self, tools: Tuple[BaseTool, ...]) -> None:
+        self._tools = tuple(tools)
+        self.invalidate_params()
+
+    def invalidate_params(self) -> None:
+        """Drop the cached tool params, e.g. after a tool's schema changed"""
+        self._params: Optional[List[Dict[str, Any]]] = None
+        self._params_tokens: Dict[Callable[[List[dict]], int], int] = {}
+
     def to_params(self) -> List[Dict[str, Any]]:
-        return [tool.to_param() for tool in self.tools]
+        """Tool params in function-calling format, built once per tool set"""
+        if self._params is None:
+            self._params = [tool.to_param() for tool in self.tools]
+        return list(self._params)
+
+    def params_tokens(self, count_tool_tokens: Callable[[List[dict]], int]) -> int:
+        """Token cost of the tool params, cached per counter until the tools change"""
+        if count_tool_tokens not in self._params_tokens:
+            self._params_tokens[count_tool_tokens] = count_tool_tokens(self.to_params())
+        return self._params_tokens[count_tool_tokens]
 
     async def execute(
         self, *, name: str, tool_input: Dict[str, Any] = None
@@ -29,7 +53,9 @@ class ToolCollection:
         if not tool:
             return ToolFailure(error=f"Tool {name} is invalid")
         try:
-            result = await tool(**tool_input)
+            result = await execute_tool(
+                name, tool_input, lambda: tool(**(tool_input or {}))
+            )
             return result
         except ToolError as e:
             return ToolFailure(error=e.message)
@@ -190,6 +190,7 @@ class WebSearch(BaseTool):
         },
         "required": ["query"],
     }
+    concurrency_safe: bool = True
     _search_engine: dict[str, WebSearchEngine] = {
         "google": GoogleSearchEngine(),
         "baidu": BaiduSearchEngine(),
@@ -0,0 +1,121 @@
+"""Token usage accounting scoped to a run rather than the process."""
+from contextvars import ContextVar, Token
+from typing import Any, Dict, Optional, Tuple
+
+
+_active: ContextVar[Optional["UsageLedger"]] = ContextVar("usage_ledger", default=None)
+
+
+def current_ledger() -> Optional["UsageLedger"]:
+    """Ledger of the innermost run in progress, if any"""
+    return _active.get()
+
+
+class LLMUsage:
+    """Tokens one LLM configuration used within a ledger"""
+
+    __slots__ = ("input_tokens", "completion_tokens", "requests")
+
+    def __init__(self):
+        self.input_tokens = 0
+        self.completion_tokens = 0
+        self.requests = 0
+
+    def to_dict(self) -> Dict[str, int]:
+        return {
+            "input_tokens": self.input_tokens,
+            "completion_tokens": self.completion_tokens,
+            "requests": self.requests,
+        }
+
+
+class UsageLedger:
+    """Token usage and input limits of one run.
+
+    `LLM` instances are shared process-wide, so their own counters mix the
+    usage of every concurrent run. While a ledger is active (`with
+    UsageLedger("manus"): ...`, or `async with`) the LLM charges it
+    instead, and checks its input limits against it: each LLM's
+    configured `max_input_tokens` applies to its usage within the run, and
+    `max_input_tokens` given here caps the run's total across all LLMs.
+
+    A ledger opened inside another, such as an agent run inside a flow,
+    also charges its parent, and every limit up the chain applies. An
+    LLM's configured limit is thus shared by the whole outermost run, not
+    granted again to each nested one.
+    """
+
+    def __init__(self, name: str = "run", max_input_tokens: Optional[int] = None):
+        self.name = name
+        self.max_input_tokens = max_input_tokens
+        self.parent: Optional["UsageLedger"] = None
+        self.input_tokens = 0
+        self.completion_tokens = 0
+        self.llms: Dict[str, LLMUsage] = {}
+        self._token: Optional[Token] = None
+
+    def usage(self, llm: str) -> LLMUsage:
+        """Usage of an LLM configuration in this ledger"""
+        usage = self.llms.get(llm)
+        if usage is None:
+            usage = self.llms[llm] = LLMUsage()
+        return usage
+
+    def record(self, llm: str, input_tokens: int, completion_tokens: int = 0) -> None:
+        """Charge a request's tokens to this ledger and its parents"""
+        ledger = self
+        while ledger is not None:
+            ledger.input_tokens += input_tokens
+            ledger.completion_tokens += completion_tokens
+            usage = ledger.usage(llm)
+            usage.input_tokens += input_tokens
+            usage.completion_tokens += completion_tokens
+            usage.requests += 1
+            ledger = ledger.parent
+
+    def allowance(
+        self, llm: str, llm_limit: Optional[int] = None
+    ) -> Optional[Tuple[int, int]]:
+        """Input tokens used and allowed under the tightest limit, None if unlimited
+
+        Args:
+            llm: LLM configuration about to send a request
+            llm_limit: Its configured `max_input_tokens`, applied to its usage
+                in this ledger and in every parent, so nested runs share it
+        """
+        tightest = None
+        ledger = self
+        while ledger is not None:
+            limits = [(ledger.input_tokens, ledger.max_input_tokens)]
+            if llm_limit is not None:
+                limits.append((ledger.usage(llm).input_tokens, llm_limit))
+            for used, limit in limits:
+                if limit is not None and (
+                    tightest is None or limit - used < tightest[1] - tightest[0]
+                ):
+                    tightest = (used, limit)
+            ledger = ledger.parent
+        return tightest
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "input_tokens": self.input_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.input_tokens + self.completion_tokens,
+            "llms": {name: usage.to_dict() for name, usage in self.llms.items()},
+        }
+
+    def __enter__(self) -> "UsageLedger":
+        self.parent = _active.get()
+        self._token = _active.set(self)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        _active.reset(self._token)
+
+    async def __aenter__(self) -> "UsageLedger":
+        return self.__enter__()
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.__exit__(*exc_info)
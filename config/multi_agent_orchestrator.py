@@ -1,11 +1,12 @@
 import toml
-import httpx
 import asyncio
 import json
 import os
 import re
 from typing import Optional, Dict, Any
 
+from app.http_pool import get_http_client
+
 # Charge la configuration (chemin relatif à adapter si besoin)
 config = toml.load("config/config.toml")
 
@@ -61,15 +62,17 @@ class AgentLLM:
             "temperature": self.temperature,
             "messages": messages
         }
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(
-                f"{self.base_url}/messages",
-                headers=headers,
-                json=payload
-            )
-            response.raise_for_status()
-            result = response.json()
-            return result["content"][0]["text"]
+        # Connexions réutilisées via le pool HTTP partagé du processus
+        client = get_http_client()
+        response = await client.post(
+            f"{self.base_url}/messages",
+            headers=headers,
+            json=payload,
+            timeout=60.0
+        )
+        response.raise_for_status()
+        result = response.json()
+        return result["content"][0]["text"]
     
     async def _call_openai(self, prompt: str, context: Optional[Dict] = None) -> str:
         headers = {
@@ -86,15 +89,16 @@ class AgentLLM:
             "temperature": self.temperature,
             "messages": messages
         }
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(
-                f"{self.base_url}/chat/completions",
-                headers=headers,
-                json=payload
-            )
-            response.raise_for_status()
-            result = response.json()
-            return result["choices"][0]["message"]["content"]
+        client = get_http_client()
+        response = await client.post(
+            f"{self.base_url}/chat/completions",
+            headers=headers,
+            json=payload,
+            timeout=60.0
+        )
+        response.raise_for_status()
+        result = response.json()
+        return result["choices"][0]["message"]["content"]
     
     async def _call_gemini(self, prompt: str, context: Optional[Dict] = None) -> str:
         full_prompt = prompt
@@ -112,15 +116,16 @@ class AgentLLM:
                 "temperature": self.temperature
             }
         }
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(
-                f"{self.base_url}/{self.model}:generateContent?key={self.api_key}",
-                headers={"Content-Type": "application/json"},
-                json=payload
-            )
-            response.raise_for_status()
-            result = response.json()
-            return result["candidates"][0]["content"]["parts"][0]["text"]
+        client = get_http_client()
+        response = await client.post(
+            f"{self.base_url}/{self.model}:generateContent?key={self.api_key}",
+            headers={"Content-Type": "application/json"},
+            json=payload,
+            timeout=60.0
+        )
+        response.raise_for_status()
+        result = response.json()
+        return result["candidates"][0]["content"]["parts"][0]["text"]
 
 # Instanciation des agents (objets globaux pour fallback)
 agent_claude = AgentLLM(config["llm_claude"], "Chef de projet")
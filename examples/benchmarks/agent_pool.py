@@ -0,0 +1,50 @@
+"""
+Benchmark of the time until a `Manus` agent is ready to take a request.
+
+Compares building an agent per request with `Manus.create()`, as the
+service used to, against leasing a warm agent from an `AgentPool`. Only
+agent and tool construction plus MCP setup for the configured servers
+are measured; a browser launched on first use and sandbox startup are
+also kept warm by the pool but are not started here.
+
+Run with: python -m examples.benchmarks.agent_pool
+"""
+import asyncio
+import time
+
+from app.agent.manus import Manus
+from app.agent.pool import AgentPool
+
+
+REQUESTS = 20
+
+
+async def cold() -> float:
+    start = time.perf_counter()
+    for _ in range(REQUESTS):
+        agent = await Manus.create()
+        await agent.cleanup()
+    return (time.perf_counter() - start) / REQUESTS
+
+
+async def warm() -> float:
+    pool = AgentPool(Manus.create, min_size=1, max_size=1)
+    await pool.start()
+    start = time.perf_counter()
+    for _ in range(REQUESTS):
+        async with pool.lease() as agent:
+            agent.update_memory("user", "task")
+    elapsed = (time.perf_counter() - start) / REQUESTS
+    await pool.close()
+    return elapsed
+
+
+async def main():
+    per_request = await cold()
+    leased = await warm()
+    print(f"create per request: {per_request * 1000:8.2f}ms")
+    print(f"lease from pool:    {leased * 1000:8.2f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
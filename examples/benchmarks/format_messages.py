@@ -0,0 +1,81 @@
+"""
+Micro-benchmark for the cached message wire format.
+
+Simulates the per-step prompt preparation of an agent with a 100-message
+history holding 5 screenshots: every step formats the whole history for a
+multimodal model and counts its tokens. Compares rebuilding each message
+from `Message.to_dict()` with the wire format cached on each `Message`.
+
+Run with: python -m examples.benchmarks.format_messages
+"""
+import base64
+import os
+import time
+
+import tiktoken
+
+from app.llm import LLM, TokenCounter
+from app.schema import Message, to_wire_format
+
+
+HISTORY_SIZE = 100
+IMAGES = 5
+IMAGE_BYTES = 150 * 1024
+STEPS = 50
+
+
+def build_history() -> list[Message]:
+    image_every = HISTORY_SIZE // IMAGES
+    history = []
+    for i in range(HISTORY_SIZE):
+        base64_image = None
+        if i % image_every == image_every - 1:
+            base64_image = base64.b64encode(os.urandom(IMAGE_BYTES)).decode()
+        if i % 2:
+            message = Message.tool_message(
+                content=f"Observed output of step {i}:\n" + "result line\n" * 20,
+                name="browser_use",
+                tool_call_id=f"call_{i}",
+                base64_image=base64_image,
+            )
+        else:
+            message = Message.user_message(
+                f"Step {i}: " + "please continue " * 10, base64_image=base64_image
+            )
+        history.append(message)
+    return history
+
+
+def bench_rebuild(counter: TokenCounter, history: list[Message]) -> float:
+    start = time.perf_counter()
+    for _ in range(STEPS):
+        messages = [to_wire_format(msg.to_dict(), True) for msg in history]
+        counter.count_message_tokens(messages)
+    return time.perf_counter() - start
+
+
+def bench_cached(counter: TokenCounter, history: list[Message]) -> float:
+    start = time.perf_counter()
+    for _ in range(STEPS):
+        messages = LLM.format_messages(history, supports_images=True)
+        counter.count_message_tokens(messages)
+    return time.perf_counter() - start
+
+
+def main():
+    tokenizer = tiktoken.get_encoding("cl100k_base")
+    history = build_history()
+
+    rebuild = bench_rebuild(TokenCounter(tokenizer), history)
+    cached = bench_cached(TokenCounter(tokenizer), history)
+
+    print(f"{HISTORY_SIZE}-message history with {IMAGES} images, {STEPS} steps")
+    print(f"  rebuild per step : {rebuild / STEPS * 1000:8.3f} ms/step")
+    print(
+        f"  cached wire      : {cached / STEPS * 1000:8.3f} ms/step "
+        f"({rebuild / cached:.1f}x)"
+    )
+
+
+if __name__ == "__main__":
+    main()
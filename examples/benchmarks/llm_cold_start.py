@@ -0,0 +1,108 @@
+"""
+Benchmark for LLM cold start.
+
+Times, in fresh interpreter processes, building an `LLM` from the default
+config and a first agent-style `ask_tool` request, with the editor and
+terminate tool schemas, against a local scripted provider:
+
+- eager: the tokenizer is loaded while the `LLM` is built, as it used to be
+- lazy: the tokenizer is loaded by the first exact count
+- approximate: `approximate_tokens` is enabled, so a first request far from
+  `max_input_tokens` never loads the tokenizer, for its messages, its tool
+  schemas or its usage
+
+Run with: python -m examples.benchmarks.llm_cold_start
+"""
+import subprocess
+import sys
+
+
+RUNS = 3
+SCRIPT = """
+import asyncio
+import time
+
+start = time.perf_counter()
+from openai.types.chat import ChatCompletion
+
+from app.config import config
+from app.llm import LLM
+from app.tool import StrReplaceEditor, Terminate, ToolCollection
+
+
+class Provider:
+    def __init__(self):
+        self.chat = self
+        self.completions = self
+
+    async def create(self, **params):
+        return ChatCompletion.model_validate(
+            {{
+                "id": "cold-start",
+                "object": "chat.completion",
+                "created": 0,
+                "model": params["model"],
+                "choices": [
+                    {{
+                        "index": 0,
+                        "finish_reason": "stop",
+                        "message": {{"role": "assistant", "content": "done"}},
+                    }}
+                ],
+                "usage": {{
+                    "prompt_tokens": 2000,
+                    "completion_tokens": 1,
+                    "total_tokens": 2001,
+                }},
+            }}
+        )
+
+
+settings = config.llm["default"].model_copy(update={{"approximate_tokens": {approx}}})
+llm = LLM("cold_start", {{"default": settings}})
+llm.client, llm.router, llm.response_cache = Provider(), None, None
+tools = ToolCollection(StrReplaceEditor(), Terminate())
+if {eager}:
+    llm.tokenizer.encoding
+built = time.perf_counter()
+asyncio.run(
+    llm.ask_tool(
+        [{{"role": "user", "content": "hello " * 2000}}],
+        tools=tools.to_params(),
+        tools_tokens=tools.params_tokens(llm.count_tool_tokens),
+    )
+)
+asked = time.perf_counter()
+print(built - start, asked - built, llm.tokenizer.loaded)
+"""
+VARIANTS = {
+    "eager": {"eager": True, "approx": False},
+    "lazy": {"eager": False, "approx": False},
+    "approximate": {"eager": False, "approx": True},
+}
+
+
+def run(eager: bool, approx: bool) -> tuple:
+    output = subprocess.run(
+        [sys.executable, "-c", SCRIPT.format(eager=eager, approx=approx)],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.split()[-3:]
+    return float(output[0]), float(output[1]), output[2] == "True"
+
+
+def main():
+    print(f"{'variant':>12} {'construct':>10} {'first ask':>11} {'total':>8} loaded")
+    for name, variant in VARIANTS.items():
+        built, counted, loaded = min(
+            (run(**variant) for _ in range(RUNS)), key=lambda r: r[0] + r[1]
+        )
+        print(
+            f"{name:>12} {built * 1000:>8.0f}ms {counted * 1000:>9.1f}ms "
+            f"{(built + counted) * 1000:>6.0f}ms {loaded}"
+        )
+
+
+if __name__ == "__main__":
+    main()
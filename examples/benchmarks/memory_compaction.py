@@ -0,0 +1,75 @@
+"""
+Benchmark for token-budgeted memory compaction.
+
+Replays a long agent run in which every step issues a tool call and stores
+a large tool observation, then measures the prompt each step would send:
+its token count and the time to format and count it. Compares unbounded
+memory (only `max_messages`) with a memory compacted to a token budget.
+
+Run with: python -m examples.benchmarks.memory_compaction
+"""
+import time
+
+import tiktoken
+
+from app.llm import LLM, TokenCounter
+from app.schema import Memory, Message
+
+
+STEPS = 150
+BUDGET = 16000
+OBSERVATION_LINES = 120
+
+
+def replay(counter: TokenCounter, budget) -> tuple[float, float]:
+    def count(message: Message) -> int:
+        return counter.count_message(message.to_wire())
+
+    memory = Memory(max_messages=100, token_counter=count, token_budget=budget)
+    memory.add_message(Message.user_message("Research the topic and write a report"))
+
+    prompt_tokens = []
+    elapsed = 0.0
+    for step in range(STEPS):
+        call = {
+            "id": f"call_{step}",
+            "function": {"name": "browser_use", "arguments": '{"action": "extract"}'},
+        }
+        memory.add_message(Message(role="assistant", tool_calls=[call]))
+        observation = "".join(
+            f"page {step} paragraph {line}: extracted text content\n"
+            for line in range(OBSERVATION_LINES)
+        )
+        memory.add_message(
+            Message.tool_message(
+                observation, name="browser_use", tool_call_id=f"call_{step}"
+            )
+        )
+
+        start = time.perf_counter()
+        messages = LLM.format_messages(memory.messages)
+        prompt_tokens.append(counter.count_message_tokens(messages))
+        elapsed += time.perf_counter() - start
+
+    recent = prompt_tokens[-50:]
+    return sum(recent) / len(recent), elapsed / STEPS
+
+
+def main():
+    tokenizer = tiktoken.get_encoding("cl100k_base")
+    full_tokens, full_time = replay(TokenCounter(tokenizer), None)
+    compact_tokens, compact_time = replay(TokenCounter(tokenizer), BUDGET)
+
+    print(f"{STEPS}-step run, {OBSERVATION_LINES}-line observations")
+    print(
+        f"  unbounded memory   : {full_tokens:9.0f} prompt tokens/step, "
+        f"{full_time * 1000:6.3f} ms/step"
+    )
+    print(
+        f"  budget {BUDGET:<11} : {compact_tokens:9.0f} prompt tokens/step, "
+        f"{compact_time * 1000:6.3f} ms/step"
+    )
+
+
+if __name__ == "__main__":
+    main()
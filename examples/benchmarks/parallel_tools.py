@@ -0,0 +1,76 @@
+"""
+Benchmark of one agent step issuing several independent tool calls.
+
+Each step asks for three searches and one view of a source file. The
+search tool sleeps for a fixed latency, standing in for a network-bound
+call. With `max_parallel_tools=1` the calls run one after another, as
+they did before concurrent execution; otherwise the searches overlap and
+the step takes about as long as its slowest call.
+
+Run with: python -m examples.benchmarks.parallel_tools
+"""
+import asyncio
+import json
+import time
+
+from app.agent.toolcall import ToolCallAgent
+from app.config import PROJECT_ROOT
+from app.schema import Function, ToolCall
+from app.tool import StrReplaceEditor, ToolCollection
+from app.tool.base import BaseTool
+
+
+SEARCH_LATENCY = 0.5
+STEPS = 3
+
+
+class SlowSearch(BaseTool):
+    name: str = "web_search"
+    description: str = "Search the web, slowly"
+    parameters: dict = {
+        "type": "object",
+        "properties": {"query": {"type": "string"}},
+        "required": ["query"],
+    }
+    concurrency_safe: bool = True
+
+    async def execute(self, query: str) -> str:
+        await asyncio.sleep(SEARCH_LATENCY)
+        return f"Results for {query}"
+
+
+def step_calls(step: int) -> list:
+    calls = [("web_search", {"query": f"query {step}.{i}"}) for i in range(3)] + [
+        ("str_replace_editor", {"command": "view", "path": str(PROJECT_ROOT)})
+    ]
+    return [
+        ToolCall(
+            id=f"call_{step}_{i}",
+            function=Function(name=name, arguments=json.dumps(arguments)),
+        )
+        for i, (name, arguments) in enumerate(calls)
+    ]
+
+
+async def run(max_parallel_tools: int) -> float:
+    agent = ToolCallAgent(
+        available_tools=ToolCollection(SlowSearch(), StrReplaceEditor()),
+        max_parallel_tools=max_parallel_tools,
+    )
+    start = time.perf_counter()
+    for step in range(STEPS):
+        agent.tool_calls = step_calls(step)
+        await agent.act()
+    return time.perf_counter() - start
+
+
+async def main():
+    sequential = await run(1)
+    parallel = await run(4)
+    print(f"{STEPS} steps of 4 tool calls, {SEARCH_LATENCY * 1000:.0f}ms per search")
+    print(f"sequential: {sequential * 1000:8.1f}ms")
+    print(f"parallel:   {parallel * 1000:8.1f}ms ({sequential / parallel:.1f}x)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+"""
+Throughput of the provider limiter under 429 pressure.
+
+A local fake provider accepts a fixed number of requests per second and
+answers 429 with a Retry-After header beyond that. The same burst of
+concurrent requests is sent with independent per-caller exponential backoff
+(the previous tenacity policy), with the shared limiter honouring
+Retry-After, and with a requests-per-minute bucket matching the provider.
+
+Run with: python -m examples.benchmarks.rate_limit
+"""
+import asyncio
+import random
+import time
+from collections import deque
+
+import httpx
+from openai import RateLimitError
+
+from app.rate_limit import ProviderLimiter
+
+
+PROVIDER_RPS = 20
+REQUESTS = 80
+CONCURRENCY = 40
+
+
+class FakeProvider:
+    """Accepts PROVIDER_RPS requests per sliding second, 429 otherwise."""
+
+    def __init__(self, rps: int):
+        self.rps = rps
+        self.accepted = deque()
+        self.rejected = 0
+
+    async def complete(self) -> str:
+        await asyncio.sleep(0.01)
+        now = time.monotonic()
+        while self.accepted and now - self.accepted[0] > 1.0:
+            self.accepted.popleft()
+        if len(self.accepted) >= self.rps:
+            self.rejected += 1
+            request = httpx.Request("POST", "http://fake-provider/v1/chat/completions")
+            response = httpx.Response(
+                429, headers={"retry-after": "1"}, request=request
+            )
+            raise RateLimitError("Too Many Requests", response=response, body=None)
+        self.accepted.append(now)
+        return "ok"
+
+
+async def naive_call(provider: FakeProvider, stats: dict) -> str:
+    """Per-caller random exponential backoff, as tenacity did before"""
+    for attempt in range(6):
+        try:
+            return await provider.complete()
+        except RateLimitError:
+            stats["retries"] += 1
+            await asyncio.sleep(random.uniform(1, min(60, 2**attempt)))
+    return await provider.complete()
+
+
+async def run(limiter: ProviderLimiter = None) -> dict:
+    provider = FakeProvider(PROVIDER_RPS)
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    naive = {"retries": 0}
+
+    async def one():
+        async with semaphore:
+            if limiter is None:
+                return await naive_call(provider, naive)
+            return await limiter.call(provider.complete, tokens=100)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one() for _ in range(REQUESTS)))
+    elapsed = time.perf_counter() - start
+    return {
+        "completed": len(results),
+        "elapsed": elapsed,
+        "throughput": len(results) / elapsed,
+        "rejected": provider.rejected,
+        "retries": limiter.retries if limiter else naive["retries"],
+    }
+
+
+def report(name: str, stats: dict) -> None:
+    print(
+        f"  {name:<22} {stats['elapsed']:6.2f}s  {stats['throughput']:6.1f} req/s  "
+        f"429s={stats['rejected']:<4} retries={stats['retries']}"
+    )
+
+
+async def main():
+    print(
+        f"{REQUESTS} requests, {CONCURRENCY} concurrent, provider limit {PROVIDER_RPS}/s"
+    )
+    report("per-caller backoff", await run())
+    report("shared Retry-After", await run(ProviderLimiter("retry-only")))
+    report(
+        "rpm token bucket",
+        await run(
+            ProviderLimiter("bucket", requests_per_minute=PROVIDER_RPS * 60 * 0.9)
+        ),
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
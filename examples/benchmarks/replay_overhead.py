@@ -0,0 +1,114 @@
+"""
+Benchmark of pure framework overhead using a replayed cassette.
+
+Records a 19-step Manus run against a local scripted provider. Each step
+views a slice of a source file with `str_replace_editor`, and the last
+step terminates. The recorded cassette is then replayed several times:
+no LLM request is sent and no tool is executed, so the replay time is the
+agent loop, message formatting, token counting and memory handling alone.
+
+Run with: python -m examples.benchmarks.replay_overhead
+"""
+import asyncio
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from openai.types.chat import ChatCompletion
+
+from app.agent.manus import Manus
+from app.cassette import Cassette
+from app.config import PROJECT_ROOT
+
+
+STEPS = 19
+REPLAYS = 5
+SOURCE = PROJECT_ROOT / "app" / "llm.py"
+
+
+class ScriptedProvider:
+    """Chat completions endpoint answering each request with the next tool call"""
+
+    def __init__(self):
+        self.chat = self
+        self.completions = self
+        self.step = 0
+
+    async def create(self, **params) -> ChatCompletion:
+        step, self.step = self.step, self.step + 1
+        if step < STEPS:
+            name = "str_replace_editor"
+            arguments = {
+                "command": "view",
+                "path": str(SOURCE),
+                "view_range": [1 + step * 40, 40 + step * 40],
+            }
+        else:
+            name, arguments = "terminate", {"status": "success"}
+        return ChatCompletion.model_validate(
+            {
+                "id": f"step-{step}",
+                "object": "chat.completion",
+                "created": 0,
+                "model": params["model"],
+                "choices": [
+                    {
+                        "index": 0,
+                        "finish_reason": "tool_calls",
+                        "message": {
+                            "role": "assistant",
+                            "content": f"Reading part {step} of the file.",
+                            "tool_calls": [
+                                {
+                                    "id": f"call_{step}",
+                                    "type": "function",
+                                    "function": {
+                                        "name": name,
+                                        "arguments": json.dumps(arguments),
+                                    },
+                                }
+                            ],
+                        },
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": 1000,
+                    "completion_tokens": 50,
+                    "total_tokens": 1050,
+                },
+            }
+        )
+
+
+async def run(cassette: Cassette) -> float:
+    agent = Manus()
+    start = time.perf_counter()
+    with cassette:
+        await agent.run("Summarize app/llm.py")
+    elapsed = time.perf_counter() - start
+    await agent.cleanup()
+    return elapsed
+
+
+async def main():
+    path = Path(tempfile.mkdtemp()) / "manus.jsonl.gz"
+
+    llm = Manus().llm
+    client, router = llm.client, llm.router
+    llm.client, llm.router = ScriptedProvider(), None
+    recorded = await run(Cassette(path, Cassette.RECORD))
+    llm.client, llm.router = client, router
+
+    replays = [await run(Cassette(path, Cassette.REPLAY)) for _ in range(REPLAYS)]
+    best = min(replays)
+    print(f"cassette: {path.stat().st_size / 1024:.1f} KiB for {STEPS + 1} steps")
+    print(f"recorded run:  {recorded * 1000:8.1f}ms (scripted provider, real tools)")
+    print(
+        f"replayed run:  {best * 1000:8.1f}ms best of {REPLAYS}, "
+        f"{best / (STEPS + 1) * 1000:.2f}ms framework overhead per step"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,83 @@
+"""
+Benchmark for the screenshot pipeline.
+
+Renders synthetic full-page browser screenshots, encodes them the way
+`BrowserUseTool` used to (JPEG quality 100), and compares payload size and
+billed image tokens with a lossless PNG capture passed through
+`prepare_image`, as the tool now does, with and without a tile budget.
+Tokens are counted from the image header, as `TokenCounter` now does.
+
+Run with: python -m examples.benchmarks.screenshot_pipeline
+"""
+import io
+import random
+import time
+from typing import Optional
+
+from PIL import Image, ImageDraw
+
+from app.config import ImageSettings
+from app.image_pipeline import image_dimensions, prepare_image
+from app.llm import TokenCounter
+
+
+SIZES = [(1280, 720), (1280, 3200), (1920, 6000)]
+DEFAULT = ImageSettings()
+TILE_BUDGET = ImageSettings(max_tiles=4)
+# Count images the way OpenAI does without needing a tokenizer
+counter = TokenCounter(tokenizer=None)
+
+
+def render_page(width: int, height: int) -> Image.Image:
+    """A page of text-like rows and boxes"""
+    rng = random.Random(width * height)
+    image = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(image)
+    for y in range(0, height, 24):
+        x = 40
+        while x < width - 80:
+            word = rng.randint(20, 90)
+            draw.rectangle([x, y + 6, x + word, y + 16], fill=(40, 40, 40))
+            x += word + 8
+        if rng.random() < 0.05:
+            color = tuple(rng.randint(0, 255) for _ in range(3))
+            draw.rectangle([40, y, width - 40, y + 120], outline=color, width=3)
+    return image
+
+
+def capture(image: Image.Image, quality: Optional[int] = None) -> bytes:
+    """Encode like a browser screenshot: JPEG at `quality`, or PNG without one"""
+    buffer = io.BytesIO()
+    if quality is None:
+        image.save(buffer, format="PNG")
+    else:
+        image.save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def tokens(data: bytes) -> int:
+    return counter._calculate_high_detail_tokens(*image_dimensions(data))
+
+
+def main():
+    print(f"{'screenshot':>12} {'pipeline':>12} {'KiB':>6} {'tokens':>7} {'time':>8}")
+    for width, height in SIZES:
+        page = render_page(width, height)
+        original = capture(page, quality=100)
+        print(
+            f"{width:>5}x{height:<6} {'quality 100':>12} "
+            f"{len(original) // 1024:>6} {tokens(original):>7}"
+        )
+        captured = capture(page)
+        for label, settings in (("default", DEFAULT), ("max_tiles=4", TILE_BUDGET)):
+            start = time.perf_counter()
+            prepared = prepare_image(captured, settings)
+            elapsed = time.perf_counter() - start
+            print(
+                f"{'':>12} {label:>12} {len(prepared) // 1024:>6} "
+                f"{tokens(prepared):>7} {elapsed * 1000:>6.1f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Micro-benchmark for the per-message token ledger.
+
+Simulates an agent loop over a 200-message history: every step appends a
+message and re-counts the whole prompt, as `LLM.ask_tool` does. Compares a
+full re-tokenization per step with the ledger-backed `TokenCounter`.
+
+Run with: python -m examples.benchmarks.token_ledger
+"""
+import time
+
+import tiktoken
+
+from app.llm import TokenCounter
+from app.schema import Memory, Message
+
+
+HISTORY_SIZE = 200
+STEPS = 30
+
+
+def build_history(size: int) -> list[dict]:
+    messages = []
+    for i in range(size):
+        if i % 2:
+            message = Message.tool_message(
+                content=f"Observed output of step {i}:\n" + "result line\n" * 40,
+                name="python_execute",
+                tool_call_id=f"call_{i}",
+            )
+        else:
+            message = Message.user_message(f"Step {i}: " + "please continue " * 20)
+        messages.append(message.to_dict())
+    return messages
+
+
+def bench_full_recount(counter: TokenCounter, history: list[dict]) -> float:
+    start = time.perf_counter()
+    for step in range(STEPS):
+        prompt = history[: HISTORY_SIZE - STEPS + step + 1]
+        counter.FORMAT_TOKENS + sum(counter._count_message(msg) for msg in prompt)
+    return time.perf_counter() - start
+
+
+def bench_ledger(counter: TokenCounter, history: list[dict]) -> float:
+    start = time.perf_counter()
+    for step in range(STEPS):
+        prompt = history[: HISTORY_SIZE - STEPS + step + 1]
+        counter.count_message_tokens(prompt)
+    return time.perf_counter() - start
+
+
+def bench_memory_total(counter: TokenCounter, history: list[dict]) -> float:
+    memory = Memory(
+        max_messages=HISTORY_SIZE,
+        token_counter=lambda msg: counter.count_message(msg.to_dict()),
+    )
+    memory.add_messages([Message(**msg) for msg in history[: HISTORY_SIZE - STEPS]])
+    start = time.perf_counter()
+    for msg in history[HISTORY_SIZE - STEPS :]:
+        memory.add_message(Message(**msg))
+        memory.token_count
+    return time.perf_counter() - start
+
+
+def main():
+    tokenizer = tiktoken.get_encoding("cl100k_base")
+    history = build_history(HISTORY_SIZE)
+
+    full = bench_full_recount(TokenCounter(tokenizer), history)
+    ledger = bench_ledger(TokenCounter(tokenizer), history)
+    memory = bench_memory_total(TokenCounter(tokenizer), history)
+
+    print(f"{HISTORY_SIZE}-message history, {STEPS} steps")
+    print(f"  full re-tokenization : {full * 1000:8.2f} ms")
+    print(f"  ledger (cold start)  : {ledger * 1000:8.2f} ms ({full / ledger:.1f}x)")
+    print(f"  Memory.token_count   : {memory * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
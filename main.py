@@ -1,26 +1,100 @@
+import argparse
 import asyncio
+from contextlib import nullcontext
 
 from app.agent.manus import Manus
+from app.budget import RunBudget
+from app.cassette import use_cassette
+from app.checkpoint import Checkpoint
 from app.logger import logger
+from app.profiler import Profiler
+from app.schema import AgentState
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the Manus agent")
+    cassette = parser.add_mutually_exclusive_group()
+    cassette.add_argument(
+        "--record", metavar="PATH", help="Record LLM and tool I/O to a cassette file"
+    )
+    cassette.add_argument(
+        "--replay", metavar="PATH", help="Replay a recorded cassette offline"
+    )
+    checkpoint = parser.add_mutually_exclusive_group()
+    checkpoint.add_argument(
+        "--checkpoint", metavar="PATH", help="Save the run after every step"
+    )
+    checkpoint.add_argument(
+        "--resume",
+        metavar="PATH",
+        help="Continue a run from its checkpoint, saving further steps to it",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="PATH",
+        help="Write a Chrome trace of the run and log its top time sinks",
+    )
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        metavar="SECONDS",
+        help="Stop the run after this many seconds",
+    )
+    parser.add_argument(
+        "--max-tokens", type=int, help="Stop the run once it has used this many tokens"
+    )
+    parser.add_argument(
+        "--max-tool-calls", type=int, help="Stop the run after this many tool calls"
+    )
+    return parser.parse_args()
 
 
 async def main():
+    args = parse_args()
     # Create and initialize Manus agent
     agent = await Manus.create()
+    profiler = Profiler() if args.profile else None
     try:
-        prompt = input("Enter your prompt: ")
-        if not prompt.strip():
-            logger.warning("Empty prompt provided.")
-            return
+        checkpoint_path = args.resume or args.checkpoint
+        checkpoint = Checkpoint(checkpoint_path, agent) if checkpoint_path else None
+        if args.resume:
+            if checkpoint.restore() == AgentState.FINISHED:
+                logger.info("The checkpointed run had already finished.")
+                return
+            prompt = None
+        else:
+            prompt = input("Enter your prompt: ")
+            if not prompt.strip():
+                logger.warning("Empty prompt provided.")
+                return
 
         logger.warning("Processing your request...")
-        await agent.run(prompt)
-        logger.info("Request processing completed.")
+        budget = RunBudget.from_settings(
+            deadline=args.deadline,
+            max_tokens=args.max_tokens,
+            max_tool_calls=args.max_tool_calls,
+        )
+        with use_cassette(record=args.record, replay=args.replay), (
+            checkpoint or nullcontext()
+        ), (profiler or nullcontext()), budget:
+            await agent.run(prompt)
+        logger.info(f"Token usage of the run: {agent.usage.summary()}")
+        if budget.exceeded is not None:
+            logger.warning(f"Run stopped early: {budget.exceeded}")
+            if checkpoint_path:
+                logger.info(f"Continue the run with --resume {checkpoint_path}")
+        else:
+            logger.info("Request processing completed.")
     except KeyboardInterrupt:
         logger.warning("Operation interrupted.")
     finally:
         # Ensure agent resources are cleaned up before exiting
         await agent.cleanup()
+        if profiler is not None:
+            profiler.export_chrome_trace(args.profile)
+            logger.info(
+                f"Profile written to {args.profile}\n{profiler.format_summary()}"
+            )
 
 
 if __name__ == "__main__":
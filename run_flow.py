@@ -1,43 +1,135 @@
+import argparse
 import asyncio
 import time
+from contextlib import nullcontext
 
 from app.agent.manus import Manus
+from app.budget import RunBudget
+from app.cassette import use_cassette
+from app.checkpoint import Checkpoint
 from app.flow.flow_factory import FlowFactory, FlowType
 from app.logger import logger
+from app.profiler import Profiler
+
+
+# Time after the run deadline for the flow to stop cooperatively before it
+# is cancelled outright, for awaits the budget does not guard
+DEADLINE_GRACE = 60
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run a planning flow")
+    cassette = parser.add_mutually_exclusive_group()
+    cassette.add_argument(
+        "--record", metavar="PATH", help="Record LLM and tool I/O to a cassette file"
+    )
+    cassette.add_argument(
+        "--replay", metavar="PATH", help="Replay a recorded cassette offline"
+    )
+    checkpoint = parser.add_mutually_exclusive_group()
+    checkpoint.add_argument(
+        "--checkpoint",
+        metavar="PATH",
+        help="Save plan progress and agent state after every step",
+    )
+    checkpoint.add_argument(
+        "--resume",
+        metavar="PATH",
+        help="Continue a flow from its checkpoint, saving further steps to it",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="PATH",
+        help="Write a Chrome trace of the run and log its top time sinks",
+    )
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        metavar="SECONDS",
+        help="Stop the run after this many seconds",
+    )
+    parser.add_argument(
+        "--max-tokens", type=int, help="Stop the run once it has used this many tokens"
+    )
+    parser.add_argument(
+        "--max-tool-calls", type=int, help="Stop the run after this many tool calls"
+    )
+    return parser.parse_args()
 
 
 async def run_flow():
+    args = parse_args()
     agents = {
         "manus": Manus(),
     }
 
     try:
-        prompt = input("Enter your prompt: ")
-
-        if prompt.strip().isspace() or not prompt:
-            logger.warning("Empty prompt provided.")
-            return
-
         flow = FlowFactory.create_flow(
             flow_type=FlowType.PLANNING,
             agents=agents,
         )
+        checkpoint_path = args.resume or args.checkpoint
+        checkpoint = Checkpoint(checkpoint_path, flow) if checkpoint_path else None
+        profiler = Profiler() if args.profile else None
+
+        if args.resume:
+            checkpoint.restore()
+            # An empty input continues the restored plan
+            prompt = ""
+        else:
+            prompt = input("Enter your prompt: ")
+
+            if prompt.strip().isspace() or not prompt:
+                logger.warning("Empty prompt provided.")
+                return
+
         logger.warning("Processing your request...")
 
+        budget = RunBudget.from_settings(
+            deadline=args.deadline,
+            max_tokens=args.max_tokens,
+            max_tool_calls=args.max_tool_calls,
+        )
+        if budget.deadline is None:
+            budget.deadline = 3600  # 60 minute limit for the entire execution
+
         try:
             start_time = time.time()
-            result = await asyncio.wait_for(
-                flow.execute(prompt),
-                timeout=3600,  # 60 minute timeout for the entire execution
-            )
+            with use_cassette(record=args.record, replay=args.replay), (
+                checkpoint or nullcontext()
+            ), (profiler or nullcontext()), budget:
+                result = await asyncio.wait_for(
+                    flow.execute(prompt), timeout=budget.deadline + DEADLINE_GRACE
+                )
             elapsed_time = time.time() - start_time
             logger.info(f"Request processed in {elapsed_time:.2f} seconds")
             logger.info(result)
+            logger.info(f"Token usage of the run: {flow.usage.summary()}")
+            if budget.exceeded is not None:
+                logger.error(f"Request processing stopped early: {budget.exceeded}")
+                if checkpoint_path:
+                    logger.info(f"Continue the run with --resume {checkpoint_path}")
+                else:
+                    logger.info(
+                        "Operation terminated by its run budget. Please try a simpler request."
+                    )
         except asyncio.TimeoutError:
-            logger.error("Request processing timed out after 1 hour")
-            logger.info(
-                "Operation terminated due to timeout. Please try a simpler request."
+            logger.error(
+                f"Request processing did not stop within {DEADLINE_GRACE}s of its "
+                f"{budget.deadline:g}s deadline and was cancelled"
             )
+            if checkpoint_path:
+                logger.info(f"Continue the run with --resume {checkpoint_path}")
+            else:
+                logger.info(
+                    "Operation terminated due to timeout. Please try a simpler request."
+                )
+        finally:
+            if profiler is not None:
+                profiler.export_chrome_trace(args.profile)
+                logger.info(
+                    f"Profile written to {args.profile}\n{profiler.format_summary()}"
+                )
 
     except KeyboardInterrupt:
         logger.info("Operation cancelled by user.")
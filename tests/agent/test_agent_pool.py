@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+from app.agent.manus import Manus
+from app.agent.pool import AgentPool
+from app.agent.toolcall import ToolCallAgent
+from app.schema import AgentState
+
+
+class PooledAgent(ToolCallAgent):
+    cleaned_up: bool = False
+
+    async def cleanup(self):
+        self.cleaned_up = True
+
+
+async def make_agent() -> PooledAgent:
+    agent = PooledAgent(next_step_prompt="next")
+    agent.memory.token_counter = lambda message: 1
+    return agent
+
+
+@pytest.mark.asyncio
+async def test_agents_reused_reset_and_discarded_after_failure():
+    """Tests that returned agents are reset and reused, and failed ones replaced."""
+    pool = AgentPool(make_agent, min_size=1, max_size=1)
+    await pool.start()
+
+    async with pool.lease() as first:
+        assert first.keep_resources
+        first.update_memory("user", "task")
+        first.current_step = 3
+        first.next_step_prompt = "stuck\nnext"
+    async with pool.lease() as second:
+        assert second is first
+        assert not second.messages and second.current_step == 0
+        assert second.next_step_prompt == "next"
+
+    with pytest.raises(RuntimeError):
+        async with pool.lease():
+            raise RuntimeError("run failed")
+    assert first.cleaned_up
+
+    async with pool.lease() as third:
+        assert third is not first and third.state == AgentState.IDLE
+    assert pool.stats()["created"] == 2
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_max_size_bounds_leases_and_idle_agents_expire():
+    """Tests that leases wait at max_size and idle agents above min_size expire."""
+    pool = AgentPool(
+        make_agent, min_size=0, max_size=1, idle_timeout=0.0, acquire_timeout=0.05
+    )
+    async with pool.lease():
+        with pytest.raises(asyncio.TimeoutError):
+            await pool.acquire()
+    assert pool.stats()["idle"] == 1
+
+    await pool._evict_idle()
+    assert pool.stats()["size"] == 0
+
+
+class FakeBrowserContext:
+    closed: bool = False
+
+    async def close(self):
+        self.closed = True
+
+
+async def make_manus() -> Manus:
+    agent = Manus()
+    agent.memory.token_counter = lambda message: 1
+    return agent
+
+
+@pytest.mark.asyncio
+async def test_pooled_manus_forgets_previous_caller_state():
+    """Tests that a re-leased Manus drops the last caller's browser and edit state."""
+    pool = AgentPool(make_manus, min_size=0, max_size=1)
+
+    async with pool.lease() as first:
+        browser = first.available_tools.get_tool("browser_use")
+        context = browser.context = FakeBrowserContext()
+        editor = first.available_tools.get_tool("str_replace_editor")
+        editor._file_history["/tmp/notes.txt"].append("secret")
+        first.browser_context_helper._current_base64_image = "screenshot"
+
+    async with pool.lease() as second:
+        assert second is first
+        assert context.closed and browser.context is None
+        assert not editor._file_history
+        assert second.browser_context_helper._current_base64_image is None
+    await pool.close()
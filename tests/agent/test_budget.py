@@ -0,0 +1,94 @@
+import asyncio
+import json
+
+import pytest
+
+from app.agent.base import BaseAgent
+from app.agent.toolcall import ToolCallAgent
+from app.budget import RunBudget, active_budget
+from app.schema import Function, ToolCall
+from app.tool import ToolCollection
+from app.tool.base import BaseTool
+
+
+class SleepTool(BaseTool):
+    name: str = "sleep"
+    description: str = "Sleep, then return"
+    parameters: dict = {"type": "object", "properties": {}}
+    concurrency_safe: bool = True
+
+    async def execute(self, delay: float) -> str:
+        await asyncio.sleep(delay)
+        return "slept"
+
+
+class SpendingAgent(BaseAgent):
+    """Agent whose every step uses a fixed number of tokens"""
+
+    name: str = "spender"
+    max_steps: int = 10
+
+    async def step(self) -> str:
+        active_budget().charge_tokens(40)
+        return "ok"
+
+
+def sleep_calls(*delays):
+    return [
+        ToolCall(
+            id=f"call_{i}",
+            function=Function(name="sleep", arguments=json.dumps({"delay": delay})),
+        )
+        for i, delay in enumerate(delays)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_deadline_cancels_tool_calls_in_flight():
+    """Tests that tools still running at the deadline stop with an error result."""
+    agent = ToolCallAgent(available_tools=ToolCollection(SleepTool()))
+    agent.memory.token_counter = lambda message: 1
+    agent.tool_calls = sleep_calls(0.01, 5, 5)
+
+    start = asyncio.get_running_loop().time()
+    with RunBudget(deadline=0.1) as budget:
+        await agent.act()
+    assert asyncio.get_running_loop().time() - start < 1
+
+    results = [m.content for m in agent.memory.messages]
+    assert "slept" in results[0]
+    assert all("run budget exhausted" in result for result in results[1:])
+    assert budget.exceeded == "deadline of 0.1s reached"
+
+
+@pytest.mark.asyncio
+async def test_tool_call_limit_refuses_only_calls_past_it():
+    """Tests that calls within the limit finish and later ones are refused."""
+    agent = ToolCallAgent(available_tools=ToolCollection(SleepTool()))
+    agent.memory.token_counter = lambda message: 1
+    agent.tool_calls = sleep_calls(0.05, 0.05, 0.05)
+
+    with RunBudget(max_tool_calls=2) as budget:
+        await agent.act()
+
+    results = [m.content for m in agent.memory.messages]
+    assert ["slept" in result for result in results] == [True, True, False]
+    assert budget.tool_calls == 2
+    assert budget.exceeded == "tool call budget of 2 used up"
+
+
+@pytest.mark.asyncio
+async def test_run_stops_once_tokens_are_used_up():
+    """Tests that an agent run ends at the first step after the token budget."""
+    agent = SpendingAgent(keep_resources=True)
+    agent.memory.token_counter = lambda message: 1
+
+    with RunBudget(max_tokens=100):
+        result = await agent.run("task")
+
+    assert result.splitlines() == [
+        "Step 1: ok",
+        "Step 2: ok",
+        "Step 3: ok",
+        "Terminated: Run budget exhausted (token budget of 100 used up)",
+    ]
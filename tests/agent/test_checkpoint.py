@@ -0,0 +1,123 @@
+import pytest
+
+from app.agent.base import BaseAgent
+from app.checkpoint import Checkpoint
+from app.flow.planning import PlanningFlow
+from app.schema import AgentState
+
+
+class CountingAgent(BaseAgent):
+    """Agent whose every step stands for one LLM completion"""
+
+    name: str = "counter"
+    max_steps: int = 5
+    completions: int = 0
+    crash_at: int = 0
+
+    async def step(self) -> str:
+        if self.current_step == self.crash_at:
+            raise RuntimeError("crash")
+        self.completions += 1
+        self.update_memory("assistant", f"completion {self.current_step}")
+        if self.current_step == self.max_steps:
+            self.state = AgentState.FINISHED
+        return "ok"
+
+
+def make_agent(**kwargs) -> CountingAgent:
+    agent = CountingAgent(keep_resources=True, **kwargs)
+    agent.memory.token_counter = lambda message: 1
+    return agent
+
+
+@pytest.mark.asyncio
+async def test_resume_continues_after_last_completed_step(tmp_path):
+    """Tests that a resumed run keeps earlier work and skips completed steps."""
+    path = tmp_path / "run.json.gz"
+    crashed = make_agent(crash_at=3)
+    with pytest.raises(RuntimeError), Checkpoint(path, crashed):
+        await crashed.run("task")
+
+    resumed = make_agent()
+    checkpoint = Checkpoint(path, resumed)
+    assert checkpoint.restore() == AgentState.RUNNING
+    assert resumed.current_step == 2
+    with checkpoint:
+        await resumed.run()
+
+    assert resumed.completions == 3
+    assert [m.content for m in resumed.messages] == ["task"] + [
+        f"completion {step}" for step in range(1, 6)
+    ]
+    assert Checkpoint(path, make_agent()).restore() == AgentState.FINISHED
+
+
+class Crash(BaseException):
+    """Stands for the process dying; not caught like an ordinary error"""
+
+
+class StepAgent(BaseAgent):
+    """Agent running each plan step in three completions"""
+
+    name: str = "executor"
+    max_steps: int = 3
+    completions: int = 0
+    crash_before: int = 0
+
+    async def step(self) -> str:
+        if self.completions + 1 == self.crash_before:
+            raise Crash()
+        self.completions += 1
+        self.update_memory("assistant", f"completion {self.completions}")
+        return f"completion {self.completions}"
+
+
+class QuietPlanningFlow(PlanningFlow):
+    async def _finalize_plan(self) -> str:
+        return "Plan completed"
+
+
+def make_flow(**agent_fields) -> QuietPlanningFlow:
+    agent = StepAgent(keep_resources=True, **agent_fields)
+    agent.memory.token_counter = lambda message: 1
+    return QuietPlanningFlow(agents={"executor": agent})
+
+
+async def make_planned_flow(**agent_fields) -> QuietPlanningFlow:
+    flow = make_flow(**agent_fields)
+    flow.active_plan_id = "plan_1"
+    await flow.planning_tool.execute(
+        command="create", plan_id="plan_1", title="Two steps", steps=["one", "two"]
+    )
+    return flow
+
+
+@pytest.mark.asyncio
+async def test_flow_resumes_interrupted_step(tmp_path):
+    """Tests that a restored flow continues the interrupted step, not the whole plan."""
+    path = tmp_path / "flow.json.gz"
+    crashed = await make_planned_flow(crash_before=5)
+    with pytest.raises(Crash), Checkpoint(path, crashed):
+        await crashed.execute("")
+
+    resumed = make_flow()
+    Checkpoint(path, resumed).restore()
+    assert resumed.active_plan_id == "plan_1"
+    assert resumed.current_step_index == 1
+    assert resumed.interrupted_executor == "executor"
+    assert resumed.planning_tool.plans["plan_1"]["step_statuses"] == [
+        "completed",
+        "in_progress",
+    ]
+
+    with Checkpoint(path, resumed):
+        result = await resumed.execute("")
+
+    executor = resumed.agents["executor"]
+    # Step one is not redone, and step two only finishes its last two completions
+    assert executor.completions == 2
+    assert result.endswith("Plan completed")
+    assert resumed.planning_tool.plans["plan_1"]["step_statuses"] == [
+        "completed",
+        "completed",
+    ]
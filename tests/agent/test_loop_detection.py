@@ -0,0 +1,80 @@
+import json
+
+import pytest
+
+from app.agent.base import BaseAgent
+from app.loop_detection import LoopDetector
+from app.schema import Message, ToolCall
+
+
+def turn(name, content="", **args):
+    call = ToolCall(
+        id=f"call_{name}",
+        function={"name": name, "arguments": json.dumps(args)},
+    )
+    return Message.from_tool_calls([call], content=content)
+
+
+def test_alternating_tool_calls_detected_despite_varying_text():
+    """Tests that an A-B-A-B tool-call cycle is reported, ignoring reasoning text."""
+    detector = LoopDetector(duplicate_threshold=2)
+
+    def a(i):
+        return turn("browser", f"attempt {i}", action="click", index=3)
+
+    def b(i):
+        return turn("browser", f"check {i}", index=3, action="scroll")
+
+    assert detector.observe(a(0)) is None
+    assert detector.observe(b(0)) is None
+    assert detector.observe(a(1)) is None
+    assert detector.observe(b(1)) == "cycle of 2 turns repeated 2 times"
+
+    detector.forget_recent()
+    assert detector.observe(a(2)) is None
+
+
+def test_duplicate_text_counted_over_whole_history():
+    """Tests that repeated assistant text is reported however far apart."""
+    detector = LoopDetector(duplicate_threshold=2)
+    reasons = [
+        detector.observe(Message.assistant_message(content))
+        for content in ["I am done.", "step", "i am  DONE.", "other", "I am done."]
+    ]
+    assert reasons == [None, None, None, None, "same response repeated 3 times"]
+
+
+def test_repeated_text_must_build_up_again_after_redirect():
+    """Tests that a redirect resets the text counts, not only the cycle window."""
+    detector = LoopDetector(duplicate_threshold=2)
+    for _ in range(3):
+        reason = detector.observe(Message.assistant_message("I am done."))
+    assert reason == "same response repeated 3 times"
+
+    detector.forget_recent()
+    assert detector.observe(Message.assistant_message("I am done.")) is None
+    assert detector.observe(Message.assistant_message("I am done.")) is None
+
+
+class RepeatingAgent(BaseAgent):
+    """Agent that gives the same answer at every step"""
+
+    name: str = "repeater"
+
+    async def step(self) -> str:
+        self.update_memory("assistant", "I am done.")
+        return "ok"
+
+
+@pytest.mark.asyncio
+async def test_stopped_run_reports_the_loop():
+    """Tests that a run stopped on a loop says so in its result."""
+    agent = RepeatingAgent(keep_resources=True, max_stuck_redirects=0)
+    agent.memory.token_counter = lambda message: 1
+
+    result = await agent.run("task")
+
+    assert result.splitlines()[-1] == (
+        "Terminated: loop detected (same response repeated 3 times)"
+    )
+    assert agent.current_step == 3
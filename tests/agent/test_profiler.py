@@ -0,0 +1,39 @@
+import asyncio
+import json
+
+import pytest
+
+from app.profiler import Profiler, profiled, span
+
+
+@profiled("tool", "tool")
+async def tool(delay: float) -> None:
+    await asyncio.sleep(delay)
+
+
+@pytest.mark.asyncio
+async def test_spans_nest_across_tasks_and_export_as_trace(tmp_path):
+    """Tests that spans form a tree, also across tasks, and export to a trace."""
+    assert span("ignored") is span("also ignored")
+
+    with Profiler() as profiler:
+        with span("step", "agent", step=1):
+            with span("act", "agent"):
+                await asyncio.gather(tool(0.02), tool(0.01))
+
+    (step,) = profiler.roots
+    (act,) = step.children
+    assert [child.name for child in act.children] == ["tool", "tool"]
+    assert act.children[0].tid != act.children[1].tid
+
+    trace = json.loads(
+        profiler.export_chrome_trace(tmp_path / "trace.json").read_text()
+    )
+    events = trace["traceEvents"]
+    assert [e["name"] for e in events] == ["step", "act", "tool", "tool"]
+    assert events[0]["ph"] == "X" and events[0]["args"] == {"step": 1}
+    assert events[0]["dur"] >= events[1]["dur"] >= events[2]["dur"]
+
+    top = profiler.summary(top=1)[0]
+    assert top["name"] == "tool" and top["calls"] == 2
+    assert "tool" in profiler.format_summary()
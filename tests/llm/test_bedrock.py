@@ -0,0 +1,107 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.bedrock import ChatCompletions
+from app.llm import ToolCallStream
+
+
+class FakeRuntime:
+    """Blocking stand-in for the boto3 bedrock-runtime client."""
+
+    def __init__(self):
+        self.requests = []
+        self.threads = set()
+
+    def converse_stream(self, **request):
+        self.requests.append(request)
+        self.threads.add(threading.current_thread().name)
+        events = [
+            {"messageStart": {"role": "assistant"}},
+            {"contentBlockDelta": {"contentBlockIndex": 0, "delta": {"text": "Hi"}}},
+        ]
+        for block, (tool_id, name, args) in enumerate(
+            [("t1", "search", {"q": "a"}), ("t2", "terminate", {"status": "ok"})],
+            start=1,
+        ):
+            arguments = json.dumps(args)
+            events += [
+                {
+                    "contentBlockStart": {
+                        "contentBlockIndex": block,
+                        "start": {"toolUse": {"toolUseId": tool_id, "name": name}},
+                    }
+                },
+                {
+                    "contentBlockDelta": {
+                        "contentBlockIndex": block,
+                        "delta": {"toolUse": {"input": arguments[:5]}},
+                    }
+                },
+                {
+                    "contentBlockDelta": {
+                        "contentBlockIndex": block,
+                        "delta": {"toolUse": {"input": arguments[5:]}},
+                    }
+                },
+            ]
+        events += [
+            {"messageStop": {"stopReason": "tool_use"}},
+            {"metadata": {"usage": {"inputTokens": 7, "outputTokens": 3}}},
+        ]
+        return {"stream": iter(events)}
+
+
+@pytest.mark.asyncio
+async def test_stream_maps_every_tool_use_off_the_event_loop():
+    """Tests that streamed toolUse blocks become indexed tool calls, off-loop."""
+    runtime = FakeRuntime()
+    executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="bedrock")
+    completions = ChatCompletions(runtime, executor)
+
+    stream = await completions.create(
+        model="anthropic.claude",
+        messages=[{"role": "user", "content": "go"}],
+        max_tokens=100,
+        temperature=0,
+        stream=True,
+        tools=[{"type": "function", "function": {"name": "search"}}],
+    )
+    calls = ToolCallStream(stream, stop_tool_names=())
+    names = [call.function.name async for call in calls]
+
+    assert names == ["search", "terminate"]
+    assert json.loads(calls.tool_calls[0].function.arguments) == {"q": "a"}
+    assert calls.content == "Hi"
+    assert runtime.threads == {"bedrock_0"}
+    assert runtime.requests[0]["toolConfig"]["toolChoice"] == {"auto": {}}
+    executor.shutdown()
+
+
+def test_multi_tool_turn_converted_to_bedrock_blocks():
+    """Tests that all tool calls and results of a turn are sent to Bedrock."""
+    completions = ChatCompletions(client=None)
+    calls = [
+        {"id": f"t{i}", "function": {"name": "search", "arguments": "{}"}}
+        for i in (1, 2)
+    ]
+    _, messages = completions._convert_openai_messages_to_bedrock_format(
+        [
+            {"role": "user", "content": "go"},
+            {"role": "assistant", "content": None, "tool_calls": calls},
+            {"role": "tool", "content": "one", "tool_call_id": "t1"},
+            {"role": "tool", "content": "two", "tool_call_id": "t2"},
+        ]
+    )
+
+    assert [block["toolUse"]["toolUseId"] for block in messages[1]["content"]] == [
+        "t1",
+        "t2",
+    ]
+    assert len(messages) == 3
+    assert [block["toolResult"]["toolUseId"] for block in messages[2]["content"]] == [
+        "t1",
+        "t2",
+    ]
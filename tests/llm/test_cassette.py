@@ -0,0 +1,172 @@
+import json
+from typing import Any, Union
+
+import pytest
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+from app.agent.toolcall import ToolCallAgent
+from app.cassette import Cassette, execute_tool
+from app.exceptions import CassetteMiss
+from app.flow.planning import PlanningFlow
+from app.llm import LLM, TokenCounter
+from app.tool.base import ToolFailure
+
+
+PARAMS = {"model": "test", "messages": [{"role": "user", "content": "hi"}]}
+
+
+def completion(content: str) -> ChatCompletion:
+    return ChatCompletion.model_validate(
+        {
+            "id": "chatcmpl-test",
+            "object": "chat.completion",
+            "created": 0,
+            "model": "test",
+            "choices": [
+                {
+                    "index": 0,
+                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": content},
+                }
+            ],
+        }
+    )
+
+
+def tool_call_completion(name: str, arguments: dict) -> ChatCompletion:
+    call = {
+        "id": f"call_{name}",
+        "type": "function",
+        "function": {"name": name, "arguments": json.dumps(arguments)},
+    }
+    return ChatCompletion.model_validate(
+        {
+            "id": "chatcmpl-test",
+            "object": "chat.completion",
+            "created": 0,
+            "model": "test",
+            "choices": [
+                {
+                    "index": 0,
+                    "finish_reason": "tool_calls",
+                    "message": {"role": "assistant", "tool_calls": [call]},
+                }
+            ],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+        }
+    )
+
+
+class WordTokenizer:
+    def encode(self, text: str) -> list:
+        return text.split()
+
+
+class ScriptedProvider:
+    """Chat completions endpoint answering each request with the next response"""
+
+    def __init__(self, *responses: Union[ChatCompletion, str]):
+        self.chat = self
+        self.completions = self
+        self.responses = list(responses)
+
+    async def create(self, stream: bool = False, **params) -> Any:
+        if not self.responses:
+            raise AssertionError("replay must not call upstream")
+        response = self.responses.pop(0)
+        if stream:
+            return stream_of(response)
+        return response
+
+
+def make_flow(llm: LLM) -> PlanningFlow:
+    agent = ToolCallAgent(name="executor", llm=llm)
+    return PlanningFlow(agents={"executor": agent}, llm=llm)
+
+
+def chunk(content: str) -> ChatCompletionChunk:
+    return ChatCompletionChunk.model_validate(
+        {
+            "id": "chunk",
+            "object": "chat.completion.chunk",
+            "created": 0,
+            "model": "test",
+            "choices": [{"index": 0, "delta": {"content": content}}],
+        }
+    )
+
+
+async def stream_of(*contents: str):
+    for content in contents:
+        yield chunk(content)
+
+
+async def open_stream():
+    return stream_of("a", "b")
+
+
+@pytest.mark.asyncio
+async def test_record_then_replay(tmp_path):
+    """Tests that recorded responses and tool results are replayed in order."""
+    path = tmp_path / "run.jsonl.gz"
+    answers = iter(["first", "second"])
+
+    async def send():
+        return completion(next(answers))
+
+    async def tool():
+        return ToolFailure(error="no such file")
+
+    with Cassette(path, Cassette.RECORD) as cassette:
+        await cassette.llm_request(PARAMS, False, send)
+        await cassette.llm_request(PARAMS, False, send)
+        stream = await cassette.llm_request(PARAMS, True, open_stream)
+        assert [c.choices[0].delta.content async for c in stream] == ["a", "b"]
+        await execute_tool("str_replace_editor", {"path": "/x"}, tool)
+
+    async def offline():
+        raise AssertionError("replay must not call upstream")
+
+    with Cassette(path, Cassette.REPLAY) as cassette:
+        first = await cassette.llm_request(PARAMS, False, offline)
+        second = await cassette.llm_request(PARAMS, False, offline)
+        stream = await cassette.llm_request(PARAMS, True, offline)
+        result = await execute_tool("str_replace_editor", {"path": "/x"}, offline)
+
+        assert first.choices[0].message.content == "first"
+        assert second.choices[0].message.content == "second"
+        assert [c.choices[0].delta.content async for c in stream] == ["a", "b"]
+        assert isinstance(result, ToolFailure) and result.error == "no such file"
+        with pytest.raises(CassetteMiss):
+            await cassette.llm_request(PARAMS, False, offline)
+
+
+@pytest.mark.asyncio
+async def test_planning_flow_record_then_replay(tmp_path):
+    """Tests that a recorded planning flow replays with the same plan and steps."""
+    path = tmp_path / "flow.jsonl.gz"
+    llm = LLM("cassette_flow")
+    llm.token_counter = TokenCounter(WordTokenizer())
+    llm.tokenizer = llm.token_counter.tokenizer
+    llm.router, llm.response_cache = None, None
+    llm.client = ScriptedProvider(
+        tool_call_completion(
+            "planning", {"command": "create", "title": "Greet", "steps": ["Say hi"]}
+        ),
+        tool_call_completion("terminate", {"status": "success"}),
+        "Greeted the user.",
+    )
+
+    with Cassette(path, Cassette.RECORD):
+        flow = make_flow(llm)
+        recorded = await flow.execute("Greet the user")
+    assert flow.active_plan_id == "plan_1"
+
+    llm.client = ScriptedProvider()
+    with Cassette(path, Cassette.REPLAY) as cassette:
+        flow = make_flow(llm)
+        replayed = await flow.execute("Greet the user")
+
+    assert recorded.endswith("Greeted the user.")
+    assert replayed == recorded
+    assert cassette.remaining == 0
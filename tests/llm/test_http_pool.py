@@ -0,0 +1,36 @@
+import pytest
+
+from app import http_pool
+from app.config import HTTPPoolSettings
+
+
+@pytest.mark.asyncio
+async def test_shared_client_reused():
+    """Tests that all callers receive the same pooled client."""
+    client = http_pool.get_http_client()
+    assert http_pool.get_http_client() is client
+
+    await http_pool.close_http_client()
+    assert client.is_closed
+    assert http_pool.get_http_client() is not client
+    await http_pool.close_http_client()
+
+
+def test_client_uses_settings():
+    """Tests that pool limits and timeouts come from the settings."""
+    settings = HTTPPoolSettings(max_connections=7, connect_timeout=3.0, http2=False)
+    client = http_pool.create_http_client(settings)
+
+    assert client.timeout.connect == 3.0
+    assert client._transport._pool._max_connections == 7
+
+
+@pytest.mark.asyncio
+async def test_pool_stats_without_connections():
+    """Tests that stats are reported before any request was made."""
+    await http_pool.close_http_client()
+    stats = http_pool.pool_stats()
+
+    assert stats["open"] == 0
+    assert stats["idle"] == 0
+    assert stats["max_connections"] > 0
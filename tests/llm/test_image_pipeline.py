@@ -0,0 +1,48 @@
+import base64
+import io
+
+from PIL import Image
+
+from app.config import ImageSettings
+from app.image_pipeline import image_dimensions, prepare_image, target_size
+from app.llm import TokenCounter
+
+
+def _encode(width: int, height: int, fmt: str, **kwargs) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), "white").save(buffer, format=fmt, **kwargs)
+    return buffer.getvalue()
+
+
+def test_image_dimensions_from_header():
+    """Dimensions are read from JPEG and PNG headers"""
+    assert image_dimensions(_encode(640, 480, "JPEG")) == (640, 480)
+    assert image_dimensions(_encode(33, 1200, "PNG")) == (33, 1200)
+    assert image_dimensions(b"not an image") is None
+
+
+def test_prepare_image_downscales_to_model_resolution():
+    """Tall screenshots are scaled so the short side fits the model's resolution"""
+    prepared = prepare_image(_encode(1280, 3200, "PNG"), ImageSettings())
+    assert prepared[:2] == b"\xff\xd8"
+    assert image_dimensions(prepared) == (768, 1920)
+
+
+def test_prepare_image_leaves_small_jpeg_unchanged():
+    """A JPEG already within the target size is returned as-is"""
+    original = _encode(300, 200, "JPEG", quality=90)
+    assert prepare_image(original, ImageSettings()) is original
+
+
+def test_target_size_respects_tile_budget():
+    """A tile budget shrinks the image until it covers at most that many tiles"""
+    width, height = target_size(1280, 3200, ImageSettings(max_tiles=4))
+    assert -(-width // 512) * -(-height // 512) <= 4
+
+
+def test_count_image_uses_header_dimensions():
+    """Image tokens are computed from the data URL's real dimensions"""
+    data = base64.b64encode(_encode(1024, 1024, "JPEG")).decode()
+    item = {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{data}"}}
+    # 1024x1024 scales to 768x768: four tiles
+    assert TokenCounter(None).count_image(item) == 85 + 4 * 170
@@ -0,0 +1,185 @@
+import asyncio
+
+import pytest
+from openai.types.chat import ChatCompletion
+
+from app.llm import LLM, TokenCounter
+from app.llm_batch import (
+    AdaptiveConcurrency,
+    BatchCheckpoint,
+    LocalBatchBackend,
+    read_batch_output,
+    write_batch_file,
+)
+from app.rate_limit import ProviderLimiter
+from app.singleflight import SingleFlight
+
+
+def completion(content: str) -> ChatCompletion:
+    return ChatCompletion.model_validate(
+        {
+            "id": "chatcmpl-test",
+            "object": "chat.completion",
+            "created": 0,
+            "model": "test",
+            "choices": [
+                {
+                    "index": 0,
+                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": content},
+                }
+            ],
+        }
+    )
+
+
+class WordTokenizer:
+    def encode(self, text: str) -> list:
+        return text.split()
+
+
+def make_llm() -> LLM:
+    llm = object.__new__(LLM)
+    llm.config_name = llm.model = "test"
+    llm.max_tokens, llm.temperature = 100, 0.0
+    llm.token_counter, llm.estimator = TokenCounter(WordTokenizer()), None
+    llm.max_input_tokens = None
+    llm.total_input_tokens = llm.total_completion_tokens = 0
+    llm.response_cache, llm.router = None, None
+    llm.coalesce_requests = True
+    llm.deterministic = False
+    llm.singleflight = SingleFlight()
+    llm.limiter = ProviderLimiter("test")
+    return llm
+
+
+def prompts(*texts: str) -> list:
+    return [[{"role": "user", "content": text}] for text in texts]
+
+
+async def echo(body: dict) -> ChatCompletion:
+    return completion(body["messages"][0]["content"].upper())
+
+
+@pytest.mark.asyncio
+async def test_adaptive_concurrency_backs_off():
+    """Tests that the window halves on congestion and grows back on success."""
+    window = AdaptiveConcurrency(max_concurrency=8)
+    await window.acquire()
+    await window.release(congested=True)
+    assert window.limit == 4
+
+    for _ in range(8):
+        await window.acquire()
+        await window.release()
+    assert 4 < window.limit <= 8
+
+
+def test_checkpoint_survives_restart(tmp_path):
+    """Tests that completed requests are reloaded and truncated lines ignored."""
+    path = tmp_path / "checkpoint.jsonl"
+    BatchCheckpoint(path).record("a", "first")
+    with path.open("a") as f:
+        f.write('{"key": "b", "cont')
+
+    assert BatchCheckpoint(path).completed == {"a": "first"}
+
+
+@pytest.mark.asyncio
+async def test_local_backend_round_trip(tmp_path):
+    """Tests that the local backend answers a batch file in provider format."""
+
+    async def complete(body: dict) -> ChatCompletion:
+        if body["messages"][0]["content"] == "fail":
+            raise ValueError("bad request")
+        return completion(body["messages"][0]["content"].upper())
+
+    input_path = tmp_path / "input.jsonl"
+    write_batch_file(
+        input_path,
+        {
+            f"request-{i}": {"messages": [{"role": "user", "content": text}]}
+            for i, text in enumerate(["hello", "fail"])
+        },
+    )
+    backend = LocalBatchBackend(complete)
+    batch_id = await backend.submit(input_path)
+    while await backend.status(batch_id) != "completed":
+        await asyncio.sleep(0.01)
+    output_path = tmp_path / "output.jsonl"
+    await backend.download(batch_id, output_path)
+
+    outputs = read_batch_output(output_path)
+    assert outputs["request-0"]["body"]["choices"][0]["message"]["content"] == "HELLO"
+    assert "bad request" in outputs["request-1"]["error"]
+
+
+@pytest.mark.asyncio
+async def test_ask_batch_keeps_input_order_and_resumes(tmp_path):
+    """Tests that results follow input order and checkpointed requests are skipped."""
+    llm = make_llm()
+    sent = []
+
+    async def send(params, stream, input_tokens=0):
+        text = params["messages"][0]["content"]
+        sent.append(text)
+        # Later requests finish first
+        await asyncio.sleep(0.01 * (3 - len(text)))
+        return completion(text.upper())
+
+    llm._send = send
+    checkpoint = tmp_path / "checkpoint.jsonl"
+    results = await llm.ask_batch(prompts("a", "bb", "ccc"), checkpoint_path=checkpoint)
+    assert [r.content for r in results] == ["A", "BB", "CCC"]
+
+    sent.clear()
+    results = await llm.ask_batch(
+        prompts("a", "bb", "ccc", "d"), checkpoint_path=checkpoint
+    )
+    assert sent == ["d"]
+    assert [r.content for r in results] == ["A", "BB", "CCC", "D"]
+    assert [r.from_checkpoint for r in results] == [True, True, True, False]
+
+
+class InterruptedDownload(LocalBatchBackend):
+    """Local backend whose first download dies halfway through the file"""
+
+    def __init__(self, complete):
+        super().__init__(complete)
+        self.submitted = 0
+
+    async def submit(self, input_path):
+        self.submitted += 1
+        return await super().submit(input_path)
+
+    async def download(self, batch_id, output_path):
+        data = self._output_path(batch_id).read_bytes()
+        output_path.write_bytes(data[: len(data) // 2])
+        raise ConnectionError("download interrupted")
+
+
+@pytest.mark.asyncio
+async def test_ask_batch_file_resumes_partial_output(tmp_path):
+    """Tests that a batch whose output download broke off is resumed, not resent."""
+    llm = make_llm()
+    completed = []
+
+    async def complete(body):
+        completed.append(body["messages"][0]["content"])
+        return await echo(body)
+
+    backend = InterruptedDownload(complete)
+    requests = prompts("one", "two", "three")
+    with pytest.raises(ConnectionError):
+        await llm.ask_batch_file(requests, tmp_path, backend, poll_interval=0.01)
+
+    # As after a restart: the backend has no record of the job in flight
+    restarted = LocalBatchBackend(complete)
+    results = await llm.ask_batch_file(
+        requests, tmp_path, restarted, poll_interval=0.01
+    )
+
+    assert [r.content for r in results] == ["ONE", "TWO", "THREE"]
+    assert backend.submitted == 1 and len(completed) == 3
+    output = (tmp_path / "batch_output.jsonl").read_text().splitlines()
+    assert len(output) == 3
@@ -0,0 +1,59 @@
+import pytest
+
+from app.llm_cache import ResponseCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ResponseCache(tmp_path / "responses.sqlite", max_size_bytes=1024)
+    yield cache
+    cache.close()
+
+
+def test_key_is_canonical():
+    """Tests that key order and transport options do not change the key."""
+    a = {"model": "m", "messages": [{"role": "user", "content": "hi"}], "timeout": 1}
+    b = {"messages": [{"content": "hi", "role": "user"}], "model": "m", "timeout": 9}
+    c = {"model": "m", "messages": [{"role": "user", "content": "hello"}]}
+
+    assert ResponseCache.make_key(a) == ResponseCache.make_key(b)
+    assert ResponseCache.make_key(a) != ResponseCache.make_key(c)
+
+
+def test_get_and_put(cache):
+    """Tests round-tripping a response and hit/miss accounting."""
+    assert cache.get("missing") is None
+
+    cache.put("key", {"choices": [{"message": {"content": "cached"}}]})
+    assert cache.get("key")["choices"][0]["message"]["content"] == "cached"
+
+    stats = cache.stats()
+    assert stats["entries"] == 1
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_lru_eviction(cache):
+    """Tests that least recently used entries are evicted beyond the size limit."""
+    payload = {"content": "x" * 300}
+    cache.put("a", payload)
+    cache.put("b", payload)
+    cache.get("a")  # "b" is now least recently used
+    cache.put("c", payload)
+    cache.put("d", payload)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.stats()["size_bytes"] <= cache.max_size_bytes
+
+
+def test_persists_across_instances(tmp_path):
+    """Tests that entries survive reopening the cache file."""
+    path = tmp_path / "responses.sqlite"
+    first = ResponseCache(path, max_size_bytes=1024)
+    first.put("key", {"content": "persisted"})
+    first.close()
+
+    second = ResponseCache(path, max_size_bytes=1024)
+    assert second.get("key") == {"content": "persisted"}
+    second.close()
@@ -0,0 +1,113 @@
+import asyncio
+
+import httpx
+import pytest
+from openai import APIConnectionError
+
+from app.config import LLMSettings
+from app.llm_router import Endpoint, EndpointRouter
+from app.rate_limit import ProviderLimiter
+
+
+class FakeCompletions:
+    def __init__(self, delay: float, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+        self.cancelled = 0
+
+    async def create(self, **params):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.fail:
+            raise APIConnectionError(request=httpx.Request("POST", "http://fake"))
+        return params["model"]
+
+
+def make_endpoint(
+    name: str, delay: float, fail: bool = False, max_retries: int = 0
+) -> Endpoint:
+    settings = LLMSettings(
+        model=f"model-{name}",
+        base_url=f"http://{name}",
+        api_key="key",
+        api_type="openai",
+        api_version="",
+    )
+    client = type("Client", (), {})()
+    client.chat = type("Chat", (), {})()
+    client.chat.completions = FakeCompletions(delay, fail)
+    limiter = ProviderLimiter(name, max_retries=max_retries, max_backoff=0.001)
+    return Endpoint(name, settings, client, limiter)
+
+
+@pytest.mark.asyncio
+async def test_routes_to_fastest_endpoint():
+    """Tests that calls go to the endpoint with the best recent latency."""
+    slow, fast = make_endpoint("slow", 0.03), make_endpoint("fast", 0.001)
+    router = EndpointRouter([slow, fast])
+    await router.request({"messages": []})
+    await router.request({"messages": []})
+
+    results = [await router.request({"messages": []}) for _ in range(5)]
+
+    assert results == ["model-fast"] * 5
+    assert router.stats()["endpoints"][0]["name"] == "fast"
+
+
+@pytest.mark.asyncio
+async def test_hedged_request_cancels_loser():
+    """Tests that a slow primary is hedged and the losing request is cancelled."""
+    slow, fast = make_endpoint("slow", 1.0), make_endpoint("fast", 0.01)
+    router = EndpointRouter([slow, fast], hedge_delay=0.02)
+
+    assert await router.request({"messages": []}) == "model-fast"
+    assert slow.client.chat.completions.cancelled == 1
+    assert fast.hedges_won == 1 and slow.hedges_lost == 1
+    assert router.stats()["hedged_requests"] == 1
+
+
+@pytest.mark.asyncio
+async def test_fails_over_on_connection_error():
+    """Tests that a retryable failure fails over to the next endpoint."""
+    broken, healthy = make_endpoint("broken", 0, fail=True), make_endpoint("ok", 0)
+    router = EndpointRouter([broken, healthy])
+
+    assert await router.request({"messages": []}) == "model-ok"
+    assert broken.stats()["failures"] == 1
+
+
+@pytest.mark.asyncio
+async def test_fails_over_after_capped_retries():
+    """Tests that a routed endpoint is retried only briefly before failing over."""
+    broken = make_endpoint("broken", 0, fail=True, max_retries=6)
+    healthy = make_endpoint("ok", 0, max_retries=6)
+    router = EndpointRouter([broken, healthy], failover_retries=1)
+
+    assert await router.request({"messages": []}) == "model-ok"
+    assert broken.client.chat.completions.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_tripped_endpoint_returns_after_recovery_timeout():
+    """Tests that an endpoint whose circuit opened is preferred again once it may recover."""
+    primary, backup = make_endpoint("primary", 0), make_endpoint("backup", 0.01)
+    router = EndpointRouter([primary, backup])
+    await router.request({"messages": []})
+    await router.request({"messages": []})
+    breaker = primary.limiter.breaker
+    breaker.recovery_timeout = 60
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+
+    assert router.ranked()[0] is backup
+    assert breaker.state == breaker.OPEN
+
+    breaker.recovery_timeout = 0
+    assert router.ranked()[0] is primary
+    assert await router.request({"messages": []}) == "model-primary"
+    assert breaker.state == breaker.CLOSED
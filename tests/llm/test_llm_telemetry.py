@@ -0,0 +1,51 @@
+import httpx
+import pytest
+
+from app.llm_telemetry import Telemetry, percentiles
+from app.rate_limit import ProviderLimiter
+
+
+def test_track_records_calls_and_errors():
+    """Tests that tracked calls land in the ring buffer, failures with their error."""
+    telemetry = Telemetry(buffer_size=2)
+    for _ in range(3):
+        with telemetry.track("ask", "model") as metrics:
+            metrics.completion_tokens = 10
+    with pytest.raises(ValueError):
+        with telemetry.track("ask_tool", "model"):
+            raise ValueError("empty response")
+
+    assert len(telemetry.calls) == 2
+    assert telemetry.calls[-1].error == "ValueError: empty response"
+    summary = telemetry.summary()
+    assert summary["all"]["errors"] == 1
+    assert summary["ask"]["completion_tokens"] == 10
+
+
+def test_percentiles():
+    """Tests nearest-rank percentiles over a sample."""
+    assert percentiles([float(i) for i in range(1, 101)]) == {
+        "p50": 51.0,
+        "p95": 96.0,
+        "p99": 100.0,
+    }
+    assert percentiles([])["p99"] is None
+
+
+@pytest.mark.asyncio
+async def test_limiter_attributes_retries_to_current_call():
+    """Tests that retries made by the provider limiter are counted on the call."""
+    limiter = ProviderLimiter("test", max_retries=2, max_backoff=0.01)
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise httpx.ReadTimeout("slow")
+        return "ok"
+
+    telemetry = Telemetry()
+    with telemetry.track("ask", "model") as metrics:
+        assert await limiter.call(flaky) == "ok"
+    assert metrics.retries == 1
+    assert metrics.latency is not None
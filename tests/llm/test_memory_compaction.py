@@ -0,0 +1,104 @@
+from app.memory_archive import MessageArchive
+from app.schema import Memory, Message
+
+
+def tool_turn(i: int, output: str) -> list:
+    call = {"id": f"call_{i}", "function": {"name": "bash", "arguments": "{}"}}
+    return [
+        Message(role="assistant", tool_calls=[call]),
+        Message.tool_message(output, name="bash", tool_call_id=f"call_{i}"),
+    ]
+
+
+def make_memory(budget: int) -> Memory:
+    return Memory(
+        token_counter=lambda message: len(message.content or "") // 4 + 4,
+        token_budget=budget,
+        keep_recent=4,
+    )
+
+
+def test_old_tool_outputs_elided_recent_kept():
+    """Tests that old tool outputs are elided while recent turns stay verbatim."""
+    memory = make_memory(budget=3000)
+    memory.add_message(Message.user_message("the task"))
+    for i in range(10):
+        memory.add_messages(tool_turn(i, f"line {i}\n" * 400))
+
+    assert memory.token_count <= 3000
+    assert memory.messages[0].content == "the task"
+    assert "elided" in memory.messages[2].content
+    assert memory.messages[-1].content == "line 9\n" * 400
+    assert memory.token_count == memory.recount_tokens()
+
+
+def test_dropped_turns_keep_tool_pairs_consistent():
+    """Tests that dropping old turns never leaves a tool result without its call."""
+    memory = make_memory(budget=200)
+    memory.add_message(Message.system_message("be brief"))
+    memory.add_message(Message.user_message("the task"))
+    for i in range(20):
+        memory.add_messages(tool_turn(i, f"result {i} " * 20))
+
+    assert memory.token_count <= 200
+    assert [m.content for m in memory.messages[:2]] == ["be brief", "the task"]
+    call_ids = {
+        call.id for message in memory.messages for call in message.tool_calls or []
+    }
+    results = [m.tool_call_id for m in memory.messages if m.role == "tool"]
+    assert results and all(result in call_ids for result in results)
+
+
+def test_image_retention_keeps_latest_images():
+    """Tests that only the latest images are kept and older ones become placeholders."""
+    memory = make_memory(budget=100_000)
+    memory.max_images = 2
+    for i in range(5):
+        memory.add_message(Message.user_message(f"shot {i}", base64_image="A" * 1000))
+
+    images = [m.base64_image for m in memory.messages]
+    assert images == [None, None, None, "A" * 1000, "A" * 1000]
+    assert memory.messages[0].content == f"shot 0\n{Memory.IMAGE_PLACEHOLDER}"
+    assert memory.token_count == memory.recount_tokens()
+
+    memory.max_images = None
+    memory.max_image_bytes = 1500
+    memory.add_message(Message.user_message("shot 5", base64_image="B" * 1000))
+    assert [bool(m.base64_image) for m in memory.messages] == [False] * 5 + [True]
+
+
+def test_evicted_messages_archived_and_list_trimmed_in_place(tmp_path):
+    """Tests that trimmed and elided messages are archived with their full content."""
+    archive = MessageArchive(tmp_path / "history.jsonl")
+    memory = make_memory(budget=3000)
+    memory.max_messages = 10
+    memory.on_evict = archive.append
+    messages = memory.messages
+    for i in range(10):
+        memory.add_messages(tool_turn(i, f"line {i}\n" * 400))
+
+    assert memory.messages is messages and len(messages) <= 10
+    assert [m.tool_call_id for m in archive.messages("trimmed", role="tool")] == [
+        f"call_{i}" for i in range(5)
+    ]
+    elided = archive.messages("elided")
+    assert elided and all("elided" not in m.content for m in elided)
+    assert archive.search("LINE 0")[0].content == "line 0\n" * 400
+
+
+def test_archive_keeps_image_hash_only_and_stops_at_size_limit(tmp_path):
+    """Tests that archived images are replaced by a hash and the log is capped."""
+    archive = MessageArchive(tmp_path / "history.jsonl", max_bytes=2000)
+    screenshot = Message.tool_message(
+        "page", name="browser_use", tool_call_id="t", base64_image="A" * 900
+    )
+    archive.append([screenshot], "image_removed")
+
+    (entry,) = archive.entries()
+    assert "base64_image" not in entry["message"]
+    assert entry["message"]["image_size"] == 900
+
+    for _ in range(20):
+        archive.append([Message.user_message("x" * 300)], "trimmed")
+    assert archive.full
+    assert archive.path.stat().st_size <= 2000
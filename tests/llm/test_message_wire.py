@@ -0,0 +1,25 @@
+from app.llm import LLM
+from app.schema import Message
+
+
+def test_wire_format_cached_and_invalidated():
+    """Tests that the wire format is built once and rebuilt after a field changes."""
+    message = Message.user_message("look", base64_image="aW1hZ2U=")
+
+    first = LLM.format_messages([message], supports_images=True)[0]
+    assert LLM.format_messages([message], supports_images=True)[0] is first
+    assert first["content"][1]["image_url"]["url"].endswith("aW1hZ2U=")
+    assert "base64_image" not in LLM.format_messages([message])[0]
+
+    message.content = "look again"
+    assert message.to_wire(True)["content"][0]["text"] == "look again"
+
+
+def test_format_messages_does_not_mutate_dicts():
+    """Tests that formatting a dict with an image leaves the input untouched."""
+    raw = {"role": "user", "content": "hi", "base64_image": "aW1hZ2U="}
+
+    formatted = LLM.format_messages([raw], supports_images=True)[0]
+
+    assert raw == {"role": "user", "content": "hi", "base64_image": "aW1hZ2U="}
+    assert formatted["content"][0] == {"type": "text", "text": "hi"}
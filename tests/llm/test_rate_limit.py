@@ -0,0 +1,92 @@
+import asyncio
+
+import httpx
+import pytest
+from openai import BadRequestError, RateLimitError
+
+from app.exceptions import CircuitOpenError
+from app.rate_limit import CircuitBreaker, ProviderLimiter, classify_error
+
+
+def status_error(cls, status: int, headers: dict = None):
+    request = httpx.Request("POST", "http://provider/v1/chat/completions")
+    response = httpx.Response(status, headers=headers or {}, request=request)
+    return cls("error", response=response, body=None)
+
+
+def test_classify_error():
+    """Tests that 429 is retryable with its Retry-After and 400 is not."""
+    assert classify_error(
+        status_error(RateLimitError, 429, {"retry-after-ms": "250"})
+    ) == (True, 0.25)
+    assert classify_error(status_error(BadRequestError, 400)) == (False, None)
+    assert classify_error(ValueError("bad")) == (False, None)
+
+
+def test_circuit_breaker_opens_and_recovers():
+    """Tests that the circuit opens after failures and half-opens after the timeout."""
+    breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=0)
+    breaker.record_failure()
+    breaker.check()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+    breaker.check()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.recovery_timeout = 60
+    breaker.record_failure()
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+
+@pytest.mark.asyncio
+async def test_limiter_retries_rate_limit_only():
+    """Tests that the limiter retries 429 after Retry-After but not a 400."""
+    limiter = ProviderLimiter("test", max_retries=3)
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise status_error(RateLimitError, 429, {"retry-after": "0"})
+        return "ok"
+
+    assert await limiter.call(flaky) == "ok"
+    assert limiter.stats()["rate_limited"] == 2
+    assert limiter.breaker.state == CircuitBreaker.CLOSED
+
+    async def invalid():
+        attempts.append(1)
+        raise status_error(BadRequestError, 400)
+
+    attempts.clear()
+    with pytest.raises(BadRequestError):
+        await limiter.call(invalid)
+    assert len(attempts) == 1
+
+
+@pytest.mark.asyncio
+async def test_half_open_circuit_lets_one_trial_through():
+    """Tests that other calls fail fast while the half-open trial is in flight."""
+    limiter = ProviderLimiter("test", failure_threshold=1, recovery_timeout=0)
+    limiter.breaker.record_failure()
+    trial_started = asyncio.Event()
+    finish_trial = asyncio.Event()
+
+    async def trial():
+        trial_started.set()
+        await finish_trial.wait()
+        return "ok"
+
+    task = asyncio.create_task(limiter.call(trial))
+    await trial_started.wait()
+    with pytest.raises(CircuitOpenError):
+        await limiter.call(trial)
+
+    finish_trial.set()
+    assert await task == "ok"
+    assert limiter.breaker.state == CircuitBreaker.CLOSED
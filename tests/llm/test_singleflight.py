@@ -0,0 +1,207 @@
+import asyncio
+
+import pytest
+from openai.types.chat import ChatCompletion
+
+from app import llm_telemetry
+from app.llm import LLM, TokenCounter
+from app.llm_telemetry import Telemetry
+from app.singleflight import SingleFlight
+from app.usage import UsageLedger
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_coalesced():
+    """Tests that concurrent identical calls share one upstream call."""
+    flight = SingleFlight()
+    upstream_calls = 0
+
+    async def fetch():
+        nonlocal upstream_calls
+        upstream_calls += 1
+        await asyncio.sleep(0.01)
+        return {"answer": 42}
+
+    results = await asyncio.gather(
+        *(flight.do("same", fetch, copy=dict) for _ in range(5))
+    )
+
+    assert upstream_calls == 1
+    assert all(result == {"answer": 42} for result in results)
+    assert len({id(result) for result in results}) == 5
+    assert flight.stats()["coalesced_calls"] == 4
+    assert flight.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_distinct_keys_not_coalesced():
+    """Tests that different keys run independently."""
+    flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0)
+        return object()
+
+    first, second = await asyncio.gather(flight.do("a", fetch), flight.do("b", fetch))
+
+    assert first is not second
+    assert flight.stats()["upstream_calls"] == 2
+
+
+@pytest.mark.asyncio
+async def test_errors_propagate_to_all_callers():
+    """Tests that an upstream failure is raised to every waiting caller."""
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream failed")
+
+    results = await asyncio.gather(
+        flight.do("k", fail), flight.do("k", fail), return_exceptions=True
+    )
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_others():
+    """Tests that cancelling the first caller keeps the shared call alive."""
+    flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    leader = asyncio.create_task(flight.do("k", fetch))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(flight.do("k", fetch))
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    assert await follower == "done"
+
+
+class WordTokenizer:
+    def encode(self, text: str) -> list:
+        return text.split()
+
+
+def make_llm() -> LLM:
+    llm = object.__new__(LLM)
+    llm.config_name = llm.model = "test"
+    llm.max_tokens, llm.temperature = 100, 0.0
+    llm.token_counter, llm.estimator = TokenCounter(WordTokenizer()), None
+    llm.max_input_tokens = None
+    llm.total_input_tokens = llm.total_completion_tokens = 0
+    llm.response_cache = None
+    llm.coalesce_requests = True
+    llm.deterministic = False
+    llm.singleflight = SingleFlight()
+    return llm
+
+
+def completion() -> ChatCompletion:
+    return ChatCompletion.model_validate(
+        {
+            "id": "chatcmpl-test",
+            "object": "chat.completion",
+            "created": 0,
+            "model": "test",
+            "choices": [
+                {
+                    "index": 0,
+                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": "answer"},
+                }
+            ],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+        }
+    )
+
+
+@pytest.mark.asyncio
+async def test_joined_flag_set_only_for_followers():
+    """Tests that only callers joining an in-flight call are reported as joined."""
+    flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.01)
+        return "done"
+
+    results = await asyncio.gather(
+        flight.do_shared("k", fetch),
+        flight.do_shared("k", fetch),
+        flight.do_shared("other", fetch),
+    )
+
+    assert [joined for _, joined in results] == [False, True, False]
+
+
+@pytest.mark.asyncio
+async def test_coalesced_requests_charged_once(monkeypatch):
+    """Tests that callers sharing one upstream call are charged for it once."""
+    llm = make_llm()
+    telemetry = Telemetry()
+    monkeypatch.setattr(llm_telemetry, "_telemetry", telemetry)
+
+    async def send(params, stream, input_tokens=0):
+        await asyncio.sleep(0.01)
+        return completion()
+
+    llm._send = send
+    with UsageLedger("run") as ledger:
+        answers = await asyncio.gather(
+            *(
+                llm.ask([{"role": "user", "content": "hi"}], stream=False)
+                for _ in range(3)
+            )
+        )
+
+    assert answers == ["answer"] * 3
+    assert (ledger.input_tokens, ledger.completion_tokens) == (10, 5)
+    assert llm.total_input_tokens == 10
+    assert sorted(call.coalesced for call in telemetry.calls) == [False, True, True]
+
+
+@pytest.mark.asyncio
+async def test_llm_coalesces_only_deterministic_requests():
+    """Tests that sampled requests each get their own upstream call."""
+    llm = make_llm()
+    upstream_calls = 0
+
+    async def send(params, stream, input_tokens=0):
+        nonlocal upstream_calls
+        upstream_calls += 1
+        await asyncio.sleep(0.01)
+        return object()
+
+    llm._send = send
+    for temperature, expected in ((0.0, 1), (0.7, 2)):
+        upstream_calls = 0
+        params = {"model": "m", "messages": [], "temperature": temperature}
+        await asyncio.gather(*(llm._create_completion(dict(params)) for _ in range(2)))
+        assert upstream_calls == expected
+
+
+@pytest.mark.asyncio
+async def test_llm_treats_missing_temperature_as_sampled():
+    """Tests that requests without temperature are neither cached nor coalesced by default."""
+    llm = make_llm()
+    upstream_calls = 0
+
+    async def send(params, stream, input_tokens=0):
+        nonlocal upstream_calls
+        upstream_calls += 1
+        await asyncio.sleep(0.01)
+        return object()
+
+    llm._send = send
+    params = {"model": "o3-mini", "messages": [], "max_completion_tokens": 10}
+    for deterministic, expected in ((False, 2), (True, 1)):
+        upstream_calls = 0
+        llm.deterministic = deterministic
+        await asyncio.gather(*(llm._create_completion(dict(params)) for _ in range(2)))
+        assert upstream_calls == expected
+    llm.deterministic, llm.response_cache = False, object()
+    assert not llm._is_cacheable(params)
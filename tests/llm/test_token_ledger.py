@@ -0,0 +1,61 @@
+import pytest
+
+from app.llm import TokenCounter
+from app.schema import Memory, Message
+
+
+class CountingTokenizer:
+    """Whitespace tokenizer that records how often it is invoked."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, text: str) -> list:
+        self.calls += 1
+        return text.split()
+
+
+@pytest.fixture
+def counter():
+    return TokenCounter(CountingTokenizer())
+
+
+def test_message_counted_once(counter):
+    """Tests that repeated counts of a message are served from the ledger."""
+    messages = [Message.user_message(f"message number {i}").to_dict() for i in range(5)]
+
+    first = counter.count_message_tokens(messages)
+    calls = counter.tokenizer.calls
+    second = counter.count_message_tokens(messages)
+
+    assert first == second
+    assert counter.tokenizer.calls == calls
+
+
+def test_ledger_invalidated_by_content(counter):
+    """Tests that changed content is re-counted."""
+    message = Message.user_message("short").to_dict()
+    before = counter.count_message(message)
+
+    message["content"] = "a much longer message body"
+    assert counter.count_message(message) == before + 4
+
+
+def test_memory_running_total(counter):
+    """Tests that Memory keeps its token total in sync with its messages."""
+    memory = Memory(
+        max_messages=3, token_counter=lambda m: counter.count_message(m.to_dict())
+    )
+    messages = [Message.user_message(f"{'word ' * i}") for i in range(1, 6)]
+    for message in messages:
+        memory.add_message(message)
+
+    expected = sum(counter.count_message(m.to_dict()) for m in messages[-3:])
+    assert len(memory.messages) == 3
+    assert memory.token_count == expected
+
+    memory.messages = messages[:1]
+    assert memory.token_count == counter.count_message(messages[0].to_dict())
+
+    memory.clear()
+    assert memory.token_count == 0
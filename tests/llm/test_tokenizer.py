@@ -0,0 +1,77 @@
+from app.llm import LLM, ApproximateTokenCounter, TokenCounter
+from app.schema import Message
+from app.tokenizer import DEFAULT_ENCODING, LazyTokenizer, get_tokenizer
+
+
+class CountingTokenizer:
+    """Whitespace tokenizer that records how often it is invoked."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, text: str) -> list:
+        self.calls += 1
+        return text.split()
+
+
+def make_llm(max_input_tokens=None) -> LLM:
+    llm = object.__new__(LLM)
+    llm.token_counter = TokenCounter(CountingTokenizer())
+    llm.estimator = ApproximateTokenCounter(chars_per_token=4.0)
+    llm.max_input_tokens = max_input_tokens
+    llm.total_input_tokens = 0
+    return llm
+
+
+def test_tokenizers_shared_and_lazy():
+    """Tests that models sharing an encoding share one tokenizer, loaded lazily."""
+    assert get_tokenizer("gpt-4") is get_tokenizer("gpt-3.5-turbo")
+    assert get_tokenizer("some-local-model").name == DEFAULT_ENCODING
+    assert not LazyTokenizer(DEFAULT_ENCODING).loaded
+
+
+def test_estimate_used_far_from_limit():
+    """Tests that pre-flight counts skip the tokenizer when far from the limit."""
+    llm = make_llm(max_input_tokens=100_000)
+    messages = [Message.user_message("word " * 200).to_dict()]
+    assert llm.count_input_tokens(messages) > 200
+    assert llm.token_counter.tokenizer.calls == 0
+
+
+def test_tool_schemas_estimated_with_approximate_tokens():
+    """Tests that tool schemas are estimated, not tokenized, by the estimator."""
+    llm = make_llm()
+    tools = [{"type": "function", "function": {"name": "terminate"}}]
+    assert llm.count_tool_tokens(tools) > 0
+    assert llm.token_counter.tokenizer.calls == 0
+
+
+def test_exact_count_near_limit_calibrates():
+    """Tests that near the limit the exact count is used and calibrates the ratio."""
+    llm = make_llm(max_input_tokens=250)
+    messages = [Message.user_message("word " * 200).to_dict()]
+    exact = llm.count_input_tokens(messages)
+
+    assert exact == llm.count_message_tokens(messages)
+    assert llm.token_counter.tokenizer.calls > 0
+    # 5 characters per whitespace token pulls the ratio up from 4
+    assert llm.estimator.chars_per_token > 4.0
+
+
+def test_prompt_count_from_running_total_matches_full_count():
+    """Tests that a memory's running total gives the same pre-flight count."""
+    llm = make_llm(max_input_tokens=100)
+    llm.model, llm.max_tokens, llm.temperature = "gpt-4o", 100, 0.0
+    llm.estimator = None
+    system = [Message.system_message("be brief")]
+    history = [Message.user_message("word " * 20), Message.assistant_message("ok")]
+
+    total = llm.count_prompt_tokens(sum(map(llm.count_message, history)), system)
+    full = llm.count_input_tokens(llm.format_messages(system + history))
+    assert total == full
+
+    # A stale total that looks over the limit is counted again before refusing
+    _, input_tokens = llm._prepare_tool_request(
+        history, system, 300, None, "auto", None, 0, input_tokens=500
+    )
+    assert input_tokens == full
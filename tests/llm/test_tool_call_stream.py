@@ -0,0 +1,132 @@
+import json
+
+import pytest
+from openai.types.chat import ChatCompletionChunk
+
+from app.llm import ToolCallStream
+
+
+def chunk(content=None, tool_calls=None) -> ChatCompletionChunk:
+    return ChatCompletionChunk.model_validate(
+        {
+            "id": "chunk",
+            "object": "chat.completion.chunk",
+            "created": 0,
+            "model": "test",
+            "choices": [
+                {
+                    "index": 0,
+                    "delta": {"content": content, "tool_calls": tool_calls},
+                    "finish_reason": None,
+                }
+            ],
+        }
+    )
+
+
+def tool_delta(index, arguments, call_id=None, name=None) -> dict:
+    delta = {"index": index, "function": {"arguments": arguments}}
+    if call_id:
+        delta["id"] = call_id
+        delta["type"] = "function"
+        delta["function"]["name"] = name
+    return delta
+
+
+class FakeStream:
+    """Async chunk iterator that records how far it was consumed."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.consumed = 0
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.consumed >= len(self.chunks):
+            raise StopAsyncIteration
+        self.consumed += 1
+        return self.chunks[self.consumed - 1]
+
+    async def close(self):
+        self.closed = True
+
+
+@pytest.mark.asyncio
+async def test_tool_calls_yielded_when_arguments_complete():
+    """Tests that each call is yielded as soon as its JSON arguments close."""
+    stream = FakeStream(
+        [
+            chunk(content="Let me check."),
+            chunk(tool_calls=[tool_delta(0, '{"query": ', "call_1", "web_search")]),
+            chunk(tool_calls=[tool_delta(0, '"weather"}')]),
+            chunk(tool_calls=[tool_delta(1, '{"code": "1+1"}', "call_2", "python")]),
+        ]
+    )
+    calls = ToolCallStream(stream)
+
+    seen = []
+    async for call in calls:
+        seen.append((call.id, stream.consumed))
+
+    assert seen == [("call_1", 3), ("call_2", 4)]
+    assert calls.content == "Let me check."
+    assert json.loads(calls.message.tool_calls[0].function.arguments) == {
+        "query": "weather"
+    }
+
+
+@pytest.mark.asyncio
+async def test_stream_closed_after_stop_tool():
+    """Tests that the stream is closed once the terminate call is complete."""
+    stream = FakeStream(
+        [
+            chunk(
+                tool_calls=[tool_delta(0, '{"status": "success"}', "t", "terminate")]
+            ),
+            chunk(content="never read"),
+        ]
+    )
+    calls = ToolCallStream(stream, stop_tool_names=["terminate"])
+
+    names = [call.function.name async for call in calls]
+
+    assert names == ["terminate"]
+    assert calls.stopped_early
+    assert stream.closed
+    assert stream.consumed == 1
+
+
+@pytest.mark.asyncio
+async def test_incomplete_arguments_flushed_at_end():
+    """Tests that calls with unparsable arguments are still yielded at the end."""
+    stream = FakeStream([chunk(tool_calls=[tool_delta(0, '{"a": ', "c", "tool")])])
+
+    calls = [call async for call in ToolCallStream(stream)]
+
+    assert len(calls) == 1
+    assert calls[0].function.arguments == '{"a": '
+
+
+@pytest.mark.asyncio
+async def test_usage_chunk_reported_on_finish():
+    """Tests that the final usage chunk is captured and handed to on_finish."""
+    usage_chunk = ChatCompletionChunk.model_validate(
+        {
+            "id": "chunk",
+            "object": "chat.completion.chunk",
+            "created": 0,
+            "model": "test",
+            "choices": [],
+            "usage": {"prompt_tokens": 7, "completion_tokens": 3, "total_tokens": 10},
+        }
+    )
+    finished = []
+    stream = ToolCallStream(
+        FakeStream([chunk(content="done"), usage_chunk]), on_finish=finished.append
+    )
+    assert [call async for call in stream] == []
+    assert finished == [stream]
+    assert stream.usage.completion_tokens == 3
@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from app.llm import LLM
+from app.usage import UsageLedger
+
+
+def make_llm(max_input_tokens=None) -> LLM:
+    llm = object.__new__(LLM)
+    llm.config_name = "default"
+    llm.max_input_tokens = max_input_tokens
+    llm.total_input_tokens = 0
+    llm.total_completion_tokens = 0
+    return llm
+
+
+@pytest.mark.asyncio
+async def test_concurrent_runs_keep_separate_ledgers():
+    """Tests that concurrent runs sharing an LLM are accounted and limited apart."""
+    llm = make_llm(max_input_tokens=100)
+
+    async def run(name: str, requests: int) -> UsageLedger:
+        async with UsageLedger(name) as ledger:
+            for _ in range(requests):
+                llm.update_token_count(30, 5)
+                await asyncio.sleep(0)
+        return ledger
+
+    busy, quiet = await asyncio.gather(run("busy", 3), run("quiet", 1))
+
+    assert (busy.input_tokens, busy.completion_tokens) == (90, 15)
+    assert (quiet.input_tokens, quiet.completion_tokens) == (30, 5)
+    assert llm.total_input_tokens == 120
+    with busy:
+        assert not llm.check_token_limit(20)
+    with quiet:
+        assert llm.check_token_limit(20)
+
+
+def test_nested_ledger_charges_and_is_limited_by_parent():
+    """Tests that a run inside a flow counts toward the flow and its limit."""
+    llm = make_llm()
+    with UsageLedger("flow", max_input_tokens=50) as flow:
+        llm.update_token_count(20)
+        with UsageLedger("agent") as agent:
+            llm.update_token_count(20)
+            assert llm.input_allowance() == (40, 50)
+            assert "Current: 40, Needed: 20, Max: 50" in llm.get_limit_error_message(20)
+
+    assert agent.summary()["llms"]["default"]["input_tokens"] == 20
+    assert flow.summary()["llms"]["default"] == {
+        "input_tokens": 40,
+        "completion_tokens": 0,
+        "requests": 2,
+    }
+
+
+def test_llm_limit_shared_by_nested_runs():
+    """Tests that nested runs do not each get the LLM's configured limit anew."""
+    llm = make_llm(max_input_tokens=1000)
+    with UsageLedger("flow"):
+        for _ in range(2):
+            with UsageLedger("agent"):
+                llm.update_token_count(450)
+        with UsageLedger("agent"):
+            assert llm.input_allowance() == (900, 1000)
+            assert not llm.check_token_limit(450)
@@ -0,0 +1,89 @@
+import asyncio
+import json
+from typing import Any
+
+import pytest
+
+from app.agent.toolcall import ToolCallAgent
+from app.schema import Function, ToolCall
+from app.tool import ToolCollection
+from app.tool.base import BaseTool
+
+
+class SleepTool(BaseTool):
+    name: str = "sleep"
+    description: str = "Sleep, then return the label"
+    parameters: dict = {"type": "object", "properties": {}}
+    concurrency_safe: bool = True
+    events: Any = None
+
+    def resource_key(self, resource=None, **kwargs):
+        return resource
+
+    async def execute(self, label: str, delay: float, resource=None) -> str:
+        self.events.append(("start", label))
+        await asyncio.sleep(delay)
+        self.events.append(("end", label))
+        return label
+
+
+class BarrierTool(SleepTool):
+    name: str = "barrier"
+    concurrency_safe: bool = False
+
+
+def call(i, name, **args):
+    return ToolCall(
+        id=f"call_{i}", function=Function(name=name, arguments=json.dumps(args))
+    )
+
+
+def make_agent(events):
+    tools = ToolCollection(SleepTool(events=events), BarrierTool(events=events))
+    agent = ToolCallAgent(available_tools=tools)
+    agent.memory.token_counter = lambda message: len(message.content or "") // 4
+    return agent
+
+
+@pytest.mark.asyncio
+async def test_safe_calls_overlap_and_results_keep_call_order():
+    """Tests that safe tools run together and results follow call order."""
+    events = []
+    agent = make_agent(events)
+    agent.tool_calls = [
+        call(0, "sleep", label="slow", delay=0.2),
+        call(1, "sleep", label="fast", delay=0.05),
+    ]
+
+    start = asyncio.get_running_loop().time()
+    await agent.act()
+    assert asyncio.get_running_loop().time() - start < 0.3
+
+    assert events[:2] == [("start", "slow"), ("start", "fast")]
+    assert [m.tool_call_id for m in agent.memory.messages] == ["call_0", "call_1"]
+
+
+@pytest.mark.asyncio
+async def test_shared_resources_and_unsafe_tools_serialize():
+    """Tests that calls on one resource and unsafe calls never overlap others."""
+    events = []
+    agent = make_agent(events)
+    agent.tool_calls = [
+        call(0, "sleep", label="a", delay=0.05, resource="page"),
+        call(1, "sleep", label="b", delay=0.01, resource="page"),
+        call(2, "barrier", label="c", delay=0.01),
+        call(3, "sleep", label="d", delay=0.01),
+    ]
+
+    await agent.act()
+
+    assert events == [
+        ("start", "a"),
+        ("end", "a"),
+        ("start", "b"),
+        ("end", "b"),
+        ("start", "c"),
+        ("end", "c"),
+        ("start", "d"),
+        ("end", "d"),
+    ]
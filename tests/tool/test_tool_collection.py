@@ -0,0 +1,34 @@
+from app.tool import Terminate, ToolCollection
+from app.tool.base import BaseTool
+
+
+class EchoTool(BaseTool):
+    name: str = "echo"
+    description: str = "Echo the input"
+    parameters: dict = {"type": "object", "properties": {"text": {"type": "string"}}}
+
+    async def execute(self, text: str = "") -> str:
+        return text
+
+
+def test_params_and_token_cost_cached_until_tools_change():
+    """Tests that params and their token cost are built once per tool set."""
+    counted = []
+
+    def count_tool_tokens(tools):
+        counted.append(len(tools))
+        return sum(len(str(tool)) for tool in tools)
+
+    tools = ToolCollection(Terminate())
+    first = tools.params_tokens(count_tool_tokens)
+    assert tools.params_tokens(count_tool_tokens) == first
+    assert tools.to_params() == tools.to_params()
+    assert counted == [1]
+
+    tools.add_tool(EchoTool())
+    assert [param["function"]["name"] for param in tools.to_params()] == [
+        "terminate",
+        "echo",
+    ]
+    assert tools.params_tokens(count_tool_tokens) > first
+    assert counted == [1, 2]